@@ -0,0 +1,77 @@
+# coding: utf-8
+
+import re
+import sys
+import timeit
+
+import fixtures
+
+from api import API
+
+# the regex extraction API used before html_parser.AtCoderHTMLParser
+CONTEST_PATTERN = r'(\d\d\d\d-\d\d-\d\d \d\d:\d\d:\d\d).*?<a href=\'/contests/([^\']+)\'>([^<]+)</a>' # noqa
+INPUT_PATTERN = r'<h3>Sample Input ([0-9]+)</h3><pre>(.+?)</pre>'
+OUTPUT_PATTERN = r'<h3>Sample Output ([0-9]+)</h3><pre>(.+?)</pre>'
+
+OPTION = re.MULTILINE | re.DOTALL
+
+
+def regex_read(body_binary):
+    body = body_binary.decode('utf-8').replace("\r", '')
+    lines = map(lambda x: x.strip(), body.split("\n"))
+    return "\n".join(filter(lambda x: x, lines))
+
+
+def regex_contests(body_binary):
+    pattern = re.compile(CONTEST_PATTERN, OPTION)
+    body = regex_read(body_binary)
+    return [matched.groups() for matched in pattern.finditer(body)]
+
+
+def regex_sample_cases(body_binary):
+    body = regex_read(body_binary)
+    inputs = re.compile(INPUT_PATTERN, OPTION).findall(body)
+    outputs = re.compile(OUTPUT_PATTERN, OPTION).findall(body)
+    return inputs + outputs
+
+
+def parser_contests(api, body_binary):
+    import io
+    return api.extract_contest_params_list(api.parse(io.BytesIO(body_binary)))
+
+
+def parser_sample_cases(api, body_binary):
+    import io
+    return api.extract_sample_cases(api.parse(io.BytesIO(body_binary)))
+
+
+def measure(function, number):
+    return min(timeit.repeat(function, number=number, repeat=3)) / number
+
+
+def main(sizes):
+    api = API()
+
+    print('%-24s %10s %12s %12s' % ('case', 'size', 'regex', 'parser'))
+
+    for size in sizes:
+        body = fixtures.archive_page(size).encode('utf-8')
+        assert len(regex_contests(body)) == len(parser_contests(api, body))
+
+        regex = measure(lambda: regex_contests(body), 5)
+        parser = measure(lambda: parser_contests(api, body), 5)
+        print('%-24s %10d %10.2fms %10.2fms' % (
+            'archive page', size, regex * 1000, parser * 1000))
+
+    for size in sizes:
+        body = fixtures.task_page(6, size).encode('utf-8')
+
+        regex = measure(lambda: regex_sample_cases(body), 5)
+        parser = measure(lambda: parser_sample_cases(api, body), 5)
+        print('%-24s %10d %10.2fms %10.2fms' % (
+            'task page (lines)', size, regex * 1000, parser * 1000))
+
+
+if __name__ == '__main__':
+    sizes = [int(x) for x in sys.argv[1:]] or [100, 1000, 10000]
+    main(sizes)
@@ -0,0 +1,127 @@
+# coding: utf-8
+
+import os
+import sys
+
+PLATFORM_DIR = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        '..', 'rplugin', 'python3', 'procon', 'atcoder')
+
+if PLATFORM_DIR not in sys.path:
+    sys.path.append(PLATFORM_DIR)
+
+
+# ==============================================================================
+#
+# synthetic AtCoder pages
+#
+# ==============================================================================
+def archive_page(contest_count, offset=0):
+    rows = []
+    for i in range(contest_count):
+        number = offset + contest_count - i
+        rows.append(
+            "<tr>\n"
+            "<td class='text-center'><a href='http://www.timeanddate.com/worldclock/fixedtime.html?iso=20190601T2100&p1=248' target='blank'><time class='fixtime fixtime-full'>2019-06-%02d 21:00:00+0900</time></a></td>\n"  # noqa
+            "<td><span class='user-blue'>&#9673;</span> <a href='/contests/abc%04d'>AtCoder Beginner Contest %d</a></td>\n"  # noqa
+            "<td class='text-center'>01:40</td>\n"
+            "<td class='text-center'> - 1199</td>\n"
+            "</tr>" % (i % 28 + 1, number, number))
+
+    pages = ''.join(
+            "<li><a href='/contests/archive?page=%d'>%d</a></li>" % (page, page)
+            for page in range(1, 11))
+
+    return (
+        "<!DOCTYPE html>\n<html>\n<head><title>Contest Archive</title></head>\n"
+        "<body>\n<ul class='pagination pagination-sm mt-0 mb-1'>%s</ul>\n"
+        "<div class='table-responsive'>\n<table class='table'>\n<tbody>\n"
+        "%s\n</tbody>\n</table>\n</div>\n</body>\n</html>\n"
+        % (pages, "\n".join(rows)))
+
+
+def task_page(sample_count, sample_lines, score=300):
+    sections = []
+    for index in range(1, sample_count + 1):
+        data = "\n".join(
+                ' '.join(str((index * line + column) % 1000000007)
+                         for column in range(10))
+                for line in range(sample_lines))
+
+        sections.append(
+            "<div class='part'>\n<section>\n<h3>Sample Input %d</h3><pre>%s\n</pre>\n"
+            "</section>\n</div>\n"
+            "<div class='part'>\n<section>\n<h3>Sample Output %d</h3><pre>%d\n</pre>\n"
+            "</section>\n</div>\n" % (index, data, index, index))
+
+    return (
+        "<!DOCTYPE html>\n<html>\n<body>\n<div id='task-statement'>\n"
+        "<span class='lang'>\n<span class='lang-ja'>\n"
+        "<p>配点 : <var>%d</var> 点</p>\n</span>\n"
+        "<span class='lang-en'>\n<p>Score : <var>%d</var> points</p>\n"
+        "%s</span>\n</span>\n</div>\n</body>\n</html>\n"
+        % (score, score, ''.join(sections)))
+
+
+# ==============================================================================
+#
+# synthetic root dirs
+#
+# ==============================================================================
+def make_root_dir(root_dir, contest_count, problem_count=6):
+    from store import Store
+
+    contests = []
+    problems = {}
+    for i in range(contest_count):
+        key = 'abc%04d' % i
+        contests.append({
+            'key': key,
+            'name': 'AtCoder Beginner Contest %d' % i,
+            'time': '2019-%02d-%02d 21:00:00' % (i % 12 + 1, i % 28 + 1)
+            })
+        problems[key] = [
+            {'key': chr(ord('a') + j), 'name': 'Problem %d' % j, 'score': 100 * (j + 1)}
+            for j in range(problem_count)
+            ]
+
+    store = Store('%s/procon.sqlite3' % root_dir)
+    store.set_meta('migrated_from_json', True)
+    store.save_contests(contests)
+    for key, params_list in problems.items():
+        store.save_problems(key, params_list)
+    store.close()
+
+    return root_dir
+
+
+def make_samples(contest_dir, problem_key, sample_count, sample_lines):
+    samples_dir = '%s/samples' % contest_dir
+    os.makedirs(samples_dir, exist_ok=True)
+
+    for index in range(1, sample_count + 1):
+        data = "\n".join(
+                ' '.join(str(index * line + column) for column in range(10))
+                for line in range(sample_lines))
+
+        for extension in ['in', 'out']:
+            path = '%s/%s.%d.%s' % (samples_dir, problem_key, index, extension)
+            with open(path, mode='w') as f:
+                f.write(data)
+                f.write("\n")
+
+
+ECHO_SOURCE = '''#include <bits/stdc++.h>
+int main() {
+    std::ios::sync_with_stdio(false);
+    std::string s;
+    while (std::getline(std::cin, s)) std::cout << s << '\\n';
+}
+'''
+
+
+def make_echo_source(contest_dir, problem_key):
+    source_path = '%s/%s.cpp' % (contest_dir, problem_key)
+    with open(source_path, mode='w') as f:
+        f.write(ECHO_SOURCE)
+    return source_path
@@ -0,0 +1,297 @@
+# coding: utf-8
+
+import io
+import os
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import contextlib
+import subprocess
+import tracemalloc
+
+import fixtures
+
+from api import API
+from atcoder import AtCoder
+from run_by_cpp import Runner
+
+
+# ==============================================================================
+#
+# benchmarks
+#
+# ==============================================================================
+class Benchmark(object):
+    # when set, the memory kept alive by the result of run() is reported
+    measures_memory = False
+
+    def __init__(self, name, sizes):
+        self.name = name
+        self.sizes = sizes
+
+    def setup(self, size, work_dir):
+        pass
+
+    def run(self):
+        raise NotImplementedError()
+
+
+class ParseContestList(Benchmark):
+    def __init__(self):
+        super().__init__('api.parse_html_to_contest_params_list', [50, 1000, 10000])
+
+    def setup(self, size, work_dir):
+        self.api = API()
+        self.body = fixtures.archive_page(size)
+
+    def run(self):
+        return self.api.parse_html_to_contest_params_list(self.body)
+
+
+class CreateSampleCases(Benchmark):
+    def __init__(self):
+        super().__init__('api.create_sample_cases', [10, 1000, 100000])
+
+    def setup(self, size, work_dir):
+        self.api = API()
+        self.body = fixtures.task_page(6, size)
+
+    def run(self):
+        return self.api.create_sample_cases(self.body)
+
+
+class LoadModel(Benchmark):
+    measures_memory = True
+
+    def __init__(self):
+        super().__init__('atcoder.load+problems', [100, 1000, 5000])
+
+    def setup(self, size, work_dir):
+        self.root_dir = fixtures.make_root_dir('%s/root' % work_dir, size)
+
+    def run(self):
+        atcoder = AtCoder(self.root_dir).load()
+        return atcoder.problems()
+
+
+class LookupModel(Benchmark):
+    def __init__(self):
+        super().__init__('atcoder.find_contest+find_problem', [100, 1000, 5000])
+
+    def setup(self, size, work_dir):
+        root_dir = fixtures.make_root_dir('%s/root' % work_dir, size)
+        self.atcoder = AtCoder(root_dir).load()
+
+        # a thousand lookups spread over the archive, a few of them misses
+        self.keys = [('abc%04d' % (i * size // 1000), 'abcdefg'[i % 7]) for i in range(1000)]
+
+    def run(self):
+        found = 0
+        for contest_key, problem_key in self.keys:
+            contest = self.atcoder.find_contest(contest_key)
+            if contest and contest.find_problem(problem_key):
+                found += 1
+        return found
+
+
+class IterateProblems(Benchmark):
+    def __init__(self):
+        super().__init__('atcoder.problems', [100, 1000, 5000])
+
+    def setup(self, size, work_dir):
+        root_dir = fixtures.make_root_dir('%s/root' % work_dir, size)
+        self.atcoder = AtCoder(root_dir).load()
+
+    def run(self):
+        return self.atcoder.problems()
+
+
+class LoadSampleCases(Benchmark):
+    def __init__(self):
+        super().__init__('problem.load_sample_case_from_cache', [10, 10000, 100000])
+
+    def setup(self, size, work_dir):
+        root_dir = fixtures.make_root_dir('%s/root' % work_dir, 1)
+        self.atcoder = AtCoder(root_dir).load()
+        self.problem = self.atcoder.contests[0].problems[0]
+        fixtures.make_samples(
+                self.problem.contest.root_dir(), self.problem.problem_key(), 6, size)
+
+    def run(self):
+        return self.problem.load_sample_case_from_cache()
+
+
+class RunnerCycle(Benchmark):
+    def __init__(self):
+        super().__init__('run_by_cpp.runner(compile+run+diff)', [10, 10000, 200000])
+
+    def setup(self, size, work_dir):
+        root_dir = fixtures.make_root_dir('%s/root' % work_dir, 1)
+        atcoder = AtCoder(root_dir).load()
+        problem = atcoder.contests[0].problems[0]
+
+        contest_dir = problem.contest.root_dir()
+        os.makedirs(contest_dir, exist_ok=True)
+        fixtures.make_samples(contest_dir, problem.problem_key(), 6, size)
+
+        source_path = fixtures.make_echo_source(contest_dir, problem.problem_key())
+        self.runner = Runner(source_path, atcoder=atcoder)
+
+        # the first compile (and precompiled header) is not part of the cycle
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.runner.execute(-1)
+
+    def run(self):
+        self.runner.execute(-1)
+
+
+BENCHMARKS = [
+    ParseContestList,
+    CreateSampleCases,
+    LoadModel,
+    LookupModel,
+    IterateProblems,
+    LoadSampleCases,
+    RunnerCycle,
+]
+
+
+# ==============================================================================
+#
+# runner
+#
+# ==============================================================================
+def measure(benchmark, repeat):
+    timings = []
+
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            started_at = time.perf_counter()
+            benchmark.run()
+            timings.append(time.perf_counter() - started_at)
+
+    return timings
+
+
+def measure_memory(benchmark):
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = benchmark.run()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    del result
+    return retained, peak
+
+
+def git_revision():
+    try:
+        process = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        return process.stdout.decode('utf-8').strip()
+    except OSError:
+        return None
+
+
+def run_benchmarks(names, repeat, quick):
+    results = []
+
+    for benchmark_class in BENCHMARKS:
+        benchmark = benchmark_class()
+        if names and not any(name in benchmark.name for name in names):
+            continue
+
+        if isinstance(benchmark, RunnerCycle) and not shutil.which('g++'):
+            print('skip %s: g++ not found' % benchmark.name)
+            continue
+
+        sizes = benchmark.sizes[0:1] if quick else benchmark.sizes
+        for size in sizes:
+            with tempfile.TemporaryDirectory() as work_dir:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    benchmark.setup(size, work_dir)
+
+                timings = measure(benchmark, repeat)
+
+                if benchmark.measures_memory:
+                    retained, peak = measure_memory(benchmark)
+
+            result = {
+                'name': benchmark.name,
+                'size': size,
+                'min': min(timings),
+                'median': sorted(timings)[len(timings) // 2],
+                'timings': timings
+            }
+
+            line = '%-44s %8d %10.2fms %10.2fms' % (
+                result['name'], size, result['min'] * 1000, result['median'] * 1000)
+
+            if benchmark.measures_memory:
+                result['retained'] = retained
+                result['peak'] = peak
+                line += '   retained %.1fMB, peak %.1fMB' % (retained / 2 ** 20, peak / 2 ** 20)
+
+            results.append(result)
+            print(line, flush=True)
+
+    return results
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, mode='r') as f:
+        baseline = json.load(f)
+
+    before = {(x['name'], x['size']): x for x in baseline['results']}
+
+    print('')
+    print('compared with %s (%s)' % (baseline_path, baseline.get('revision')))
+    for result in results:
+        old = before.get((result['name'], result['size']))
+        if old:
+            line = '%-44s %8d %8.2fx' % (
+                result['name'], result['size'], old['min'] / result['min'])
+
+            if 'retained' in old and 'retained' in result:
+                line += '   memory %.2fx' % (result['retained'] / old['retained'])
+
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('names', nargs='*')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--quick', action='store_true')
+    parser.add_argument('--output', default=None)
+    parser.add_argument('--compare', default=None)
+    args = parser.parse_args()
+
+    print('%-44s %8s %12s %12s' % ('benchmark', 'size', 'min', 'median'))
+    results = run_benchmarks(args.names, args.repeat, args.quick)
+
+    report = {
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'created_at': time.time(),
+        'results': results
+    }
+
+    if args.output:
+        with open(args.output, mode='w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
@@ -8,6 +8,13 @@ let g:loaded_procon_nvim = 1
 " ------------------------------------------------------------------------------
 let s:procon_default_root_dir = $HOME . '/.procon'
 let s:procon_default_platform = 'atcoder'
+let s:procon_default_test_jobs = 1
+let s:procon_default_test_fail_fast = 0
+let s:procon_default_cxxflags = ''
+let s:procon_default_tolerance = 0
+let s:procon_default_use_quickrun = 0
+let s:procon_default_python = 'python3'
+let s:procon_default_language_ids = {}
 
 " ------------------------------------------------------------------------------
 "  function
@@ -22,6 +29,41 @@ function! procon#platform()
   return s:procon_default_platform
 endfunction
 
+function! procon#test_jobs()
+  if has_key(s:, 'procon_test_jobs') | return s:procon_test_jobs | endif
+  return s:procon_default_test_jobs
+endfunction
+
+function! procon#test_fail_fast()
+  if has_key(s:, 'procon_test_fail_fast') | return s:procon_test_fail_fast | endif
+  return s:procon_default_test_fail_fast
+endfunction
+
+function! procon#cxxflags()
+  if has_key(s:, 'procon_cxxflags') | return s:procon_cxxflags | endif
+  return s:procon_default_cxxflags
+endfunction
+
+function! procon#tolerance()
+  if has_key(s:, 'procon_tolerance') | return s:procon_tolerance | endif
+  return s:procon_default_tolerance
+endfunction
+
+function! procon#use_quickrun()
+  if has_key(s:, 'procon_use_quickrun') | return s:procon_use_quickrun | endif
+  return s:procon_default_use_quickrun
+endfunction
+
+function! procon#python()
+  if has_key(s:, 'procon_python') | return s:procon_python | endif
+  return s:procon_default_python
+endfunction
+
+function! procon#language_ids()
+  if has_key(s:, 'procon_language_ids') | return s:procon_language_ids | endif
+  return s:procon_default_language_ids
+endfunction
+
 function! procon#set_root_dir(dir)
   let! s:procon_root_dir = a:dir
 endfunction
@@ -30,6 +72,35 @@ function! procon#set_platform(platform)
   let! s:procon_platform = a:platform
 endfunction
 
+function! procon#set_test_jobs(jobs)
+  let! s:procon_test_jobs = a:jobs
+endfunction
+
+function! procon#set_test_fail_fast(fail_fast)
+  let! s:procon_test_fail_fast = a:fail_fast
+endfunction
+
+function! procon#set_cxxflags(flags)
+  let! s:procon_cxxflags = a:flags
+endfunction
+
+function! procon#set_tolerance(tolerance)
+  let! s:procon_tolerance = a:tolerance
+endfunction
+
+function! procon#set_use_quickrun(use_quickrun)
+  let! s:procon_use_quickrun = a:use_quickrun
+endfunction
+
+function! procon#set_python(python)
+  let! s:procon_python = a:python
+endfunction
+
+" e.g. {'cpp': 5001, 'py': 5078}; unset extensions use the built-in ids
+function! procon#set_language_ids(ids)
+  let! s:procon_language_ids = a:ids
+endfunction
+
 function! procon#update_contest_list()
   execute ProUpdateContestList
 endfunction
@@ -38,6 +109,10 @@ function! procon#join_contest(contest_key)
   call ProJoinContest(a:contest_key)
 endfunction
 
+function! procon#prewarm(contest_key)
+  call ProPrewarm(a:contest_key)
+endfunction
+
 function! procon#test()
   if expand('%:p') !~ procon#root_dir() | return | endif
   execute 'ProTest'
@@ -6,6 +6,7 @@
 
 from denite.base.source import Base
 from procon.atcoder.atcoder import AtCoder
+from procon.gatherer import Gatherer
 
 CONTEST_LIST_HIGHLIGHT_SYNTAX = [
     {'name': 'Time', 'link': 'PreProc',  're': r'\[.\{-}\] '},
@@ -29,15 +30,42 @@ class Source(Base):
                 'highlight default link {}_{} {}'.format(
                     self.syntax_name, syn['name'], syn['link']))
 
+    def on_init(self, context):
+        context['__gatherer'] = None
+
     def gather_candidates(self, context):
+        if context['__gatherer']:
+            return self.gather_async_candidates(context)
+
         root_dir = self.vim.call('procon#root_dir')
 
+        # the cached list as it is; the website is only asked when nothing is
+        # cached yet, :ProUpdateContestList refreshes it on purpose
         atcoder = AtCoder(root_dir)
-        atcoder.update()
+        contests = atcoder.load_contests_from_cache()
+        if contests:
+            return list(map(lambda x: self.calc_candidate(x), contests))
+
+        gatherer = Gatherer(self.update_contests, root_dir)
+        context['__gatherer'] = gatherer.start()
+        context['is_async'] = True
+
+        return []
 
-        contests = atcoder.contests
+    def gather_async_candidates(self, context):
+        gatherer = context['__gatherer']
+
+        candidates = gatherer.drain()
+        if gatherer.is_done():
+            context['is_async'] = False
+
+        return candidates
+
+    def update_contests(self, emit, root_dir):
+        atcoder = AtCoder(root_dir)
+        atcoder.update()
 
-        return list(map(lambda x: self.calc_candidate(x), contests))
+        emit(list(map(lambda x: self.calc_candidate(x), atcoder.contests)))
 
     def calc_candidate(self, contest):
         name = contest.key()
@@ -6,6 +6,9 @@
 
 from denite.base.source import Base
 from procon.atcoder.atcoder import AtCoder
+from procon.gatherer import Gatherer
+
+BATCH_SIZE = 1000
 
 CONTEST_LIST_HIGHLIGHT_SYNTAX = [
     {'name': 'Time', 'link': 'PreProc',  're': r'\[.\{-}\] '},
@@ -29,15 +32,39 @@ class Source(Base):
                 'highlight default link {}_{} {}'.format(
                     self.syntax_name, syn['name'], syn['link']))
 
+    def on_init(self, context):
+        context['__gatherer'] = None
+
     def gather_candidates(self, context):
-        root_dir = self.vim.call("procon#root_dir")
+        if not context['__gatherer']:
+            root_dir = self.vim.call("procon#root_dir")
+
+            gatherer = Gatherer(self.load_problems, root_dir)
+            context['__gatherer'] = gatherer.start()
+            context['is_async'] = True
+
+        gatherer = context['__gatherer']
 
+        # wait a little for the first batch, so small archives show at once
+        candidates = gatherer.drain(timeout=0.05)
+        if gatherer.is_done():
+            context['is_async'] = False
+
+        return candidates
+
+    def load_problems(self, emit, root_dir):
         atcoder = AtCoder(root_dir)
         atcoder.load()
 
-        problems = atcoder.problems()
+        candidates = []
+        for contest in atcoder.contests:
+            candidates.extend(map(lambda x: self.calc_candidate_from(x), contest.problems))
+
+            if len(candidates) >= BATCH_SIZE:
+                emit(candidates)
+                candidates = []
 
-        return list(map(lambda x: self.calc_candidate_from(x), problems))
+        emit(candidates)
 
     def calc_candidate_from(self, problem):
         contest = problem.contest_key()
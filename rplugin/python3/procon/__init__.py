@@ -1,11 +1,21 @@
 import pynvim
 import os
+import shlex
+
+from procon.engine import Engine
 
 
 @pynvim.plugin
 class Procon(object):
     def __init__(self, nvim):
         self.nvim = nvim
+        self._engine = None
+        self.watches = {}
+
+    def engine(self):
+        if self._engine is None:
+            self._engine = Engine(self.nvim)
+        return self._engine
 
     def echom(self, args):
         self.nvim.command('echom "[PRO] {}"'.format(args))
@@ -16,6 +26,32 @@ class Procon(object):
     def get_platform_from_nvim(self):
         return self.nvim.call('procon#platform')
 
+    def get_test_jobs_from_nvim(self):
+        return self.nvim.call('procon#test_jobs')
+
+    def get_test_fail_fast_from_nvim(self):
+        return self.nvim.call('procon#test_fail_fast')
+
+    def get_cxxflags_from_nvim(self):
+        return self.nvim.call('procon#cxxflags')
+
+    # split the way the quickrun scripts split --cxxflags, so quoted flags
+    # mean the same on both paths
+    def cxxflags(self):
+        return shlex.split(self.get_cxxflags_from_nvim())
+
+    def get_tolerance_from_nvim(self):
+        return self.nvim.call('procon#tolerance')
+
+    def get_python_from_nvim(self):
+        return self.nvim.call('procon#python')
+
+    def get_language_ids_from_nvim(self):
+        return self.nvim.call('procon#language_ids')
+
+    def get_use_quickrun_from_nvim(self):
+        return self.nvim.call('procon#use_quickrun')
+
     def root_dir(self):
         root_dir = self.get_root_dir_from_nvim()
         platform = self.get_platform_from_nvim()
@@ -44,9 +80,19 @@ class Procon(object):
 
     @pynvim.command('ProUpdateContestList')
     def update_contest_list(self):
+        if not self.get_use_quickrun_from_nvim():
+            self.engine().submit('procon', self.run_update_contest_list,
+                                 self.get_platform_from_nvim(), self.root_dir())
+            return
+
         script_path = self.script_path('update_contest_list.py')
         self.quickrun(script_path, '[quickrun]', [self.root_dir()])
 
+    def run_update_contest_list(self, platform, root_dir):
+        engine = self.engine()
+        module = engine.platform_module(platform, 'update_contest_list')
+        module.update_contest_list(engine.atcoder(root_dir))
+
     @pynvim.command('ProTest', nargs='*')
     def test(self, args):
         source_path = self.nvim.call('expand', '%:p')
@@ -60,18 +106,273 @@ class Procon(object):
 
         index = args[0] if len(args) != 0 else -1
 
-        self.quickrun(script_path, 'testrun', [source_path, index])
+        if not self.get_use_quickrun_from_nvim():
+            self.engine().submit('testrun', self.run_test,
+                                 self.get_platform_from_nvim(), source_path,
+                                 extension, int(index), self.test_options())
+            return
+
+        options = ['--jobs', self.get_test_jobs_from_nvim()]
+        if self.get_test_fail_fast_from_nvim():
+            options.append('--fail-fast')
+
+        self.quickrun(script_path, 'testrun', [source_path, index] + options + self.quickrun_options())
+
+    # the flags every quickrun script takes, as test_options() passes them
+    # to the engine
+    def quickrun_options(self):
+        options = []
+
+        cxxflags = self.get_cxxflags_from_nvim()
+        if cxxflags:
+            options.append("--cxxflags='%s'" % cxxflags)
+
+        tolerance = self.get_tolerance_from_nvim()
+        if tolerance:
+            options.extend(['--abs-tol', tolerance, '--rel-tol', tolerance])
+
+        options.extend(['--python', self.get_python_from_nvim()])
+
+        return options
+
+    def test_options(self):
+        tolerance = float(self.get_tolerance_from_nvim())
+
+        return {
+            'jobs': int(self.get_test_jobs_from_nvim()),
+            'fail_fast': bool(self.get_test_fail_fast_from_nvim()),
+            'flags': self.cxxflags(),
+            'abs_tol': tolerance,
+            'rel_tol': tolerance,
+            'python': self.get_python_from_nvim()
+        }
+
+    def run_test(self, platform, source_path, extension, index, options):
+        engine = self.engine()
+        module = engine.platform_module(platform, 'run_by_%s' % extension)
+
+        root_dir = os.path.dirname(os.path.dirname(source_path))
+        runner = module.Runner(source_path, atcoder=engine.atcoder(root_dir), **options)
+        runner.execute(index)
+
+    @pynvim.command('ProTestView', nargs='+')
+    def test_view(self, args):
+        source_path = self.nvim.call('expand', '%:p')
+
+        if not self.root_dir() in source_path:
+            return
+
+        extensions = os.path.basename(source_path).split('.')
+        extension = extensions[len(extensions) - 1]
+
+        index = int(args[0])
+        line = int(args[1]) if len(args) > 1 else 1
+
+        if not self.get_use_quickrun_from_nvim():
+            self.engine().submit('testrun', self.run_test_view,
+                                 self.get_platform_from_nvim(), source_path,
+                                 extension, index, line)
+            return
+
+        script_path = self.script_path('run_by_%s.py' % extension)
+        self.quickrun(script_path, 'testrun', [source_path, index, '--view', line])
+
+    def run_test_view(self, platform, source_path, extension, index, line):
+        engine = self.engine()
+        module = engine.platform_module(platform, 'run_by_%s' % extension)
+
+        root_dir = os.path.dirname(os.path.dirname(source_path))
+        runner = module.Runner(source_path, atcoder=engine.atcoder(root_dir))
+        runner.view(index, line)
+
+    @pynvim.command('ProStress', nargs='*')
+    def stress(self, args):
+        source_path = self.nvim.call('expand', '%:p')
+
+        if not self.root_dir() in source_path:
+            return
+
+        iterations = int(args[0]) if len(args) != 0 else 1000
+        # every core by default; failing fast is what a stress test does
+        options = self.test_options()
+        options['jobs'] = 0
+        del options['fail_fast']
+
+        if not self.get_use_quickrun_from_nvim():
+            self.engine().submit('testrun', self.run_stress,
+                                 self.get_platform_from_nvim(), source_path,
+                                 iterations, options)
+            return
+
+        script_path = self.script_path('stress_test.py')
+        self.quickrun(script_path, 'testrun', [source_path, '--iterations', iterations] + self.quickrun_options())
+
+    def run_stress(self, platform, source_path, iterations, options):
+        engine = self.engine()
+        module = engine.platform_module(platform, 'stress_test')
+
+        root_dir = os.path.dirname(os.path.dirname(source_path))
+        stress_test = module.StressTest(source_path, iterations=iterations,
+                                        atcoder=engine.atcoder(root_dir), **options)
+        stress_test.execute()
+
+    # every problem of the buffer's contest that has a source, in one batch
+    @pynvim.command('ProTestAll', nargs=0)
+    def test_all(self):
+        source_path = self.nvim.call('expand', '%:p')
+
+        if not self.root_dir() in source_path:
+            return
+
+        contest_dir = os.path.dirname(source_path)
+        # one pool shared by every compile and run, so all cores by default
+        options = self.test_options()
+        options['jobs'] = 0
+        del options['fail_fast']
+
+        if not self.get_use_quickrun_from_nvim():
+            self.engine().submit('testrun', self.run_test_all,
+                                 self.get_platform_from_nvim(), contest_dir, options)
+            return
+
+        script_path = self.script_path('test_all.py')
+        self.quickrun(script_path, 'testrun', [contest_dir] + self.quickrun_options())
+
+    def run_test_all(self, platform, contest_dir, options):
+        engine = self.engine()
+        module = engine.platform_module(platform, 'test_all')
+
+        root_dir = os.path.dirname(contest_dir)
+        test_all = module.TestAll(contest_dir, atcoder=engine.atcoder(root_dir), **options)
+        test_all.execute()
+
+    # retests a problem whenever its source is saved, until :ProWatchStop
+    @pynvim.command('ProWatch', nargs=0)
+    def watch(self):
+        source_path = self.nvim.call('expand', '%:p')
+
+        if not self.root_dir() in source_path:
+            return
+
+        # a watch never returns; under quickrun it would hold the editor
+        # with nothing left to stop it
+        if self.get_use_quickrun_from_nvim():
+            self.echom('ProWatch needs the in-process engine (procon#use_quickrun is on)')
+            return
+
+        contest_dir = os.path.dirname(source_path)
+        if contest_dir in self.watches:
+            self.echom('already watching %s' % os.path.basename(contest_dir))
+            return
+
+        options = self.test_options()
+        del options['fail_fast']
+
+        # registered here on the main thread, so a second :ProWatch or a
+        # :ProWatchStop sees it before the job starts
+        module = self.engine().platform_module(self.get_platform_from_nvim(), 'watch')
+        watch = module.Watch(contest_dir, dispatch=self.dispatch_watch_cycle, **options)
+        self.watches[contest_dir] = watch
+
+        # the loop gets a thread of its own; only its cycles use the pool
+        self.engine().spawn('testrun', self.run_watch, watch, contest_dir)
+
+    def run_watch(self, watch, contest_dir):
+        try:
+            watch.atcoder = self.engine().atcoder(os.path.dirname(contest_dir))
+            watch.run()
+        finally:
+            self.watches.pop(contest_dir, None)
+
+    # every cycle is a job of its own, so its results replace the last ones
+    # in the result buffer; the buffer is opened on the main thread
+    def dispatch_watch_cycle(self, cycle):
+        self.nvim.async_call(self.engine().submit, 'testrun', cycle.execute)
+
+    @pynvim.command('ProWatchStop', nargs=0)
+    def watch_stop(self):
+        for watch in list(self.watches.values()):
+            watch.stop()
 
     @pynvim.function('ProJoinContest')
     def join_contest(self, args):
         contest_root = '%s/%s' % (self.root_dir(), args[0])
 
+        if not self.get_use_quickrun_from_nvim():
+            self.engine().submit('procon', self.run_join_contest,
+                                 self.get_platform_from_nvim(), self.root_dir(),
+                                 args[0])
+            return
+
         script_path = self.script_path('join_contest.py')
         self.quickrun(script_path, '[quickrun]', [contest_root])
 
         # self.echom('cd "{}"'.format(contest_root))
         # self.nvim.commannd('cd "{}"'.format(contest_root))
 
+    def run_join_contest(self, platform, root_dir, contest_key):
+        engine = self.engine()
+        module = engine.platform_module(platform, 'join_contest')
+        module.join_contest(engine.atcoder(root_dir), contest_key)
+
+    @pynvim.command('ProLogin', nargs='?')
+    def login(self, args):
+        username = args[0] if len(args) != 0 else self.nvim.call('input', 'username: ')
+        password = self.nvim.call('inputsecret', 'password: ')
+
+        if not username or not password:
+            return
+
+        self.engine().submit('procon', self.run_login,
+                             self.get_platform_from_nvim(), self.root_dir(),
+                             username, password)
+
+    def run_login(self, platform, root_dir, username, password):
+        engine = self.engine()
+        module = engine.platform_module(platform, 'submission')
+        module.login(engine.atcoder(root_dir), username, password)
+
+    @pynvim.command('ProSubmit', nargs=0)
+    def submit(self):
+        source_path = self.nvim.call('expand', '%:p')
+
+        if not self.root_dir() in source_path:
+            return
+
+        extension = os.path.splitext(source_path)[1][1:]
+        options = {
+            'python': self.get_python_from_nvim(),
+            'language_id': self.get_language_ids_from_nvim().get(extension)
+        }
+
+        self.engine().submit('procon', self.run_submit,
+                             self.get_platform_from_nvim(), self.root_dir(),
+                             source_path, options)
+
+    def run_submit(self, platform, root_dir, source_path, options):
+        engine = self.engine()
+        module = engine.platform_module(platform, 'submission')
+        module.submit(engine.atcoder(root_dir), source_path, options)
+
+    # sleeps until the contest starts, then fetches everything at once
+    @pynvim.function('ProPrewarm')
+    def prewarm(self, args):
+        # it sleeps until the start; under quickrun that would hold the
+        # editor, prewarm.py can run in a terminal instead
+        if self.get_use_quickrun_from_nvim():
+            self.echom('ProPrewarm needs the in-process engine (procon#use_quickrun is on)')
+            return
+
+        # hours of waiting would pin a pool worker; it gets its own thread
+        self.engine().spawn('procon', self.run_prewarm,
+                            self.get_platform_from_nvim(), self.root_dir(),
+                            args[0], self.cxxflags())
+
+    def run_prewarm(self, platform, root_dir, contest_key, flags):
+        engine = self.engine()
+        module = engine.platform_module(platform, 'prewarm')
+        module.prewarm(engine.atcoder(root_dir), contest_key, flags)
+
 
 if __name__ == '__main__':
     import sys
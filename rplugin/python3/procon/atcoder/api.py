@@ -2,17 +2,29 @@
 
 import traceback
 
+import urllib.error
 import urllib.parse
-import urllib.request
 
-import os
 import re
-import random
-import time
+import html
+import json
 
-CONTEST_PATTERN = r'(\d\d\d\d-\d\d-\d\d \d\d:\d\d:\d\d).*?<a href=\'/contests/([^\']+)\'>([^<]+)</a>' # noqa
-INPUT_PATTERN = r'<h3>Sample Input ([0-9]+)</h3><pre>(.+?)</pre>'
-OUTPUT_PATTERN = r'<h3>Sample Output ([0-9]+)</h3><pre>(.+?)</pre>'
+from http_session import Session
+from rate_limiter import RateLimiter
+from html_parser import AtCoderHTMLParser
+from tracing import span
+
+DEFAULT_RATE = 1.0
+DEFAULT_BURST = 2
+
+STATUS_LABEL_PATTERN = re.compile(r'<span[^>]*class=["\'][^"\']*label[^>]*>([^<]*)</span>')
+STATUS_TIME_PATTERN = re.compile(r'>\s*(\d+)\s*ms\s*<')
+STATUS_MEMORY_PATTERN = re.compile(r'>\s*(\d+)\s*KB\s*<')
+
+CSRF_TOKEN_PATTERNS = [
+    re.compile(r'name=["\']csrf_token["\'][^>]*?value=["\']([^"\']+)["\']'),
+    re.compile(r'csrfToken\s*=\s*["\']([^"\']+)["\']'),
+]
 
 
 # ==============================================================================
@@ -21,41 +33,62 @@ OUTPUT_PATTERN = r'<h3>Sample Output ([0-9]+)</h3><pre>(.+?)</pre>'
 #
 # ==============================================================================
 class API(object):
-    def __init__(self):
-        self.base_url = 'https://atcoder.jp'
+    def __init__(self, base_url='https://atcoder.jp', session=None,
+                 rate=DEFAULT_RATE, burst=DEFAULT_BURST, cache=None):
+        self.base_url = base_url
+        self.session = session if session else Session()
+        self.rate_limiter = RateLimiter(rate, burst)
+        self.cache = cache
+
+    def open(self, url, method='GET', body=None, headers={}, use_cache=True, follow_redirects=True):
+        with span('http.open', {'url': url}):
+            return self.open_impl(url, method, body, headers, use_cache, follow_redirects)
+
+    def open_impl(self, url, method, body, headers, use_cache, follow_redirects):
+        cache = self.cache if use_cache else None
+        is_cacheable = cache and method == 'GET' and cache.is_cacheable(url)
+
+        entry = cache.lookup(url) if is_cacheable else None
+        if entry and (cache.offline or cache.is_fresh(entry)):
+            print('cache >> %s' % url, flush=True)
+            return cache.response(entry)
+
+        if cache and cache.offline:
+            raise urllib.error.URLError('offline, not cached: %s' % url)
 
-        option = re.MULTILINE | re.DOTALL
-        self.contest_list_pattern = re.compile(CONTEST_PATTERN, option)
-        self.sample_input_pattern = re.compile(INPUT_PATTERN, option)
-        self.sample_output_pattern = re.compile(OUTPUT_PATTERN, option)
+        if entry:
+            headers = dict(headers, **cache.validators(entry))
 
-        self.problem_score_pattern = re.compile(r'<p>.*?配点.*?(\d+).*?</p>')
+        with span('http.rate_limit'):
+            self.rate_limiter.acquire()
 
-        self.accessing_count = 0
-        self.sleeping_count = 1
+        with span('http.request'):
+            res = self.session.request(url, method, body, headers, follow_redirects)
+        print('open >> %s (%s)' % (url, res.summary()), flush=True)
 
-    def open(self, url):
-        self.sleep_random()
-        print('open >> ' + url, flush=True)
-        req = urllib.request.Request(url)
-        return urllib.request.urlopen(req)
+        if entry and res.status == 304:
+            cache.refresh(url)
+            return cache.response(entry)
 
-    def sleep_random(self):
-        self.accessing_count += 1
+        if res.status >= 400:
+            raise urllib.error.HTTPError(
+                    url, res.status, res.reason, res.headers, None)
 
-        if self.accessing_count <= self.sleeping_count:
-            return
+        # a redirected page (e.g. tasks before the contest starts) is not
+        # the page we asked for, so it must not be cached under this url
+        if is_cacheable and res.status == 200 and res.url == url:
+            with span('cache.store'):
+                cache.store(url, res.headers, res.body.getvalue())
 
-        sleeping_time_span = 1.0 + random.random()
-        # print('Sleep: %s' % str(sleeping_time_span))
+        return res
 
-        time.sleep(sleeping_time_span)
-        self.sleeping_count = self.sleeping_count + 1
+    def parse(self, res):
+        with span('parse.html'):
+            return AtCoderHTMLParser().feed_stream(res)
 
-    def read(self, body_binary):
-        body = body_binary.decode('utf-8').replace("\r", '')
-        lines = map(lambda x: x.strip(), body.split("\n"))
-        return "\n".join(filter(lambda x: x, lines))
+    def parse_html(self, body):
+        with span('parse.html'):
+            return AtCoderHTMLParser().feed_text(body)
 
     def get_contest_params_list(self, page=0):
         postfix = '/archive?page=' + str(page) if page != 0 else ''
@@ -64,55 +97,67 @@ class API(object):
         params_list = []
         try:
             with self.open(url) as res:
-                body = self.read(res.read())
-                params_list = self.parse_html_to_contest_params_list(body)
+                parser = self.parse(res)
+                params_list = self.extract_contest_params_list(parser)
         except Exception as exception:
             print(exception)
             traceback.print_exc()
 
         return params_list
 
+    def get_contest_archive_page(self, page):
+        url = '%s/contests/archive?page=%d' % (self.base_url, page)
+
+        archive_page = {'page': page, 'contests': [], 'last_page': 0}
+        try:
+            with self.open(url) as res:
+                parser = self.parse(res)
+                archive_page['contests'] = self.extract_contest_params_list(parser)
+                archive_page['last_page'] = parser.last_page
+        except Exception as exception:
+            print(exception)
+            traceback.print_exc()
+
+        return archive_page
+
     def parse_html_to_contest_params_list(self, body):
-        pattern = self.contest_list_pattern
-        matches = [matched for matched in pattern.finditer(body)]
-
-        params_list = [
-                {
-                  'time': matched.group(1),
-                  'key':  matched.group(2),
-                  'name': matched.group(3)
-                }
-                for matched in matches
-            ]
+        return self.extract_contest_params_list(self.parse_html(body))
 
+    def extract_contest_params_list(self, parser):
+        params_list = parser.contests
         params_list = filter(lambda x: 'archive' not in x['key'], params_list)
         params_list = filter(lambda x: 'practice' not in x['key'], params_list)
-        return params_list
+        return list(params_list)
 
     def get_task_url(self, contest_key):
         return '%s/contests/%s/tasks' % (self.base_url, contest_key)
 
     def get_problem_params_list(self, contest_key):
-        url = self.get_task_url(contest_key)
-
-        key = '/contests/%s/tasks/%s' % (contest_key, contest_key)
-        s = '<a href=\'%s_(.+?)\'>(.+?)</a>' % key
-        pattern = re.compile(s, re.MULTILINE | re.DOTALL)
-
-        params = {}
+        params_list = []
 
         try:
-            with self.open(url) as res:
-                body = self.read(res.read())
-                for matched in pattern.finditer(body):
-                    key = matched.group(1).strip()
-                    name = matched.group(2).strip()
-                    params[key] = name
+            params_list = self.fetch_problem_params_list(contest_key)
         except Exception as exception:
             print(exception)
             traceback.print_exc()
 
-        return [{'key': key, 'name': name} for key, name in params.items()]
+        return params_list
+
+    def fetch_problem_params_list(self, contest_key, use_cache=True):
+        url = self.get_task_url(contest_key)
+
+        with self.open(url, use_cache=use_cache) as res:
+            parser = self.parse(res)
+            return self.extract_problem_params_list(parser, contest_key)
+
+    def extract_problem_params_list(self, parser, contest_key):
+        prefix = '%s_' % contest_key
+
+        return [
+                {'key': key[len(prefix):], 'name': name}
+                for key, name in parser.tasks.items()
+                if key.startswith(prefix) and len(key) > len(prefix)
+            ]
 
     def get_sample_cases(self, contest_key, problem_key):
         url = self.get_task_url(contest_key)
@@ -122,8 +167,7 @@ class API(object):
 
         try:
             with self.open(url) as res:
-                body = self.read(res.read())
-                sample_cases = self.create_sample_cases(body)
+                sample_cases = self.extract_sample_cases(self.parse(res))
         except Exception as exception:
             print(exception)
             traceback.print_exc()
@@ -131,45 +175,22 @@ class API(object):
         return sample_cases
 
     def create_sample_cases(self, body):
-        sample_case_params_dict = {}
-
-        def add(key, matched):
-            index = int(matched.group(1).strip())
-            data = matched.group(2).strip()
-
-            if index not in sample_case_params_dict:
-                sample_case_params_dict[index] = {'index': index}
-
-            sample_case_params_dict[index][key] = data
-
-        for matched in self.sample_input_pattern.finditer(body):
-            add('input', matched)
+        return self.extract_sample_cases(self.parse_html(body))
 
-        for matched in self.sample_output_pattern.finditer(body):
-            add('output', matched)
-
-        return [params for params in sample_case_params_dict.values()]
-
-    def get_problem_info(self, contest_key, problem_key):
-        url = self.get_task_url(contest_key)
-        url = '%s/%s_%s' % (url, contest_key, problem_key)
-
-        info = {}
-
-        try:
-            with self.open(url) as res:
-                info = self.create_problem_info(self.read(res.read()))
-        except Exception as exception:
-            print(exception)
-            traceback.print_exc()
-
-        return info
+    def extract_sample_cases(self, parser):
+        return [
+                params for params in parser.sample_cases.values()
+                if 'input' in params and 'output' in params
+            ]
 
     def create_problem_info(self, body):
-        matched = self.problem_score_pattern.search(body)
+        return self.extract_problem_info(self.parse_html(body))
 
+    def extract_problem_info(self, parser):
         info = {}
-        info['score'] = int(matched.group(1))
+
+        if parser.score is not None:
+            info['score'] = parser.score
 
         return info
 
@@ -182,75 +203,82 @@ class API(object):
 
         try:
             with self.open(url) as res:
-                body = self.read(res.read())
+                parser = self.parse(res)
 
-                info = self.create_problem_info(body)
-                sample_cases = self.create_sample_cases(body)
+                info = self.extract_problem_info(parser)
+                sample_cases = self.extract_sample_cases(parser)
         except Exception as exception:
             print(exception)
             traceback.print_exc()
 
         return {'info': info, 'sample_cases': sample_cases}
 
-    def create_submit_params(self, source_path):
-        data = ''
-        with open(source_path) as f:
-            data = f.read()
+    def get_login_url(self):
+        return '%s/login' % self.base_url
 
-        problem_key = os.path.basename(source_path).split('.')[0]
-        contest_key = os.path.basename(os.path.dirname(source_path))
+    def get_submit_url(self, contest_key):
+        return '%s/contests/%s/submit' % (self.base_url, contest_key)
 
-        token = self.get_csrf_token(contest_key)
+    def extract_csrf_token(self, body_binary):
+        body = body_binary.decode('utf-8', 'replace')
 
-        params = {
-            'data.TaskScreenName': ('%s_%s' % (contest_key, problem_key)),
-            'data.LanguageId': 3003,
-            'sourceCode': data,
-            'csrf_token': token
-        }
+        for pattern in CSRF_TOKEN_PATTERNS:
+            matched = pattern.search(body)
+            if matched:
+                return html.unescape(matched.group(1))
 
-        return params
+        return None
 
-    def get_csrf_token(self, contest_key):
-        pattern = re.compile(r'.*csrf_token.*value=\'(.+)\'.*')
+    def get_submissions_url(self, contest_key):
+        return '%s/contests/%s/submissions/me' % (self.base_url, contest_key)
 
-        url = '%s/contests/%s/submit' % (self.base_url, contest_key)
-        with self.open(url) as res:
-            body = self.read(res.read())
-            lines = body.split("\n")
+    # the list is newest first, so the first link is the latest submission
+    def get_latest_submission_id(self, contest_key, task_screen_name):
+        query = urllib.parse.urlencode({'f.Task': task_screen_name})
+        url = '%s?%s' % (self.get_submissions_url(contest_key), query)
 
-            matches = map(lambda x:  pattern.search(x), lines)
-            matches = filter(lambda x: x, matches)
+        with self.open(url, use_cache=False) as res:
+            body = res.read().decode('utf-8', 'replace')
 
-            for matched in matches:
-                return matched.group(1)
+        pattern = r'/contests/%s/submissions/(\d+)' % re.escape(contest_key)
+        matched = re.search(pattern, body)
+        return int(matched.group(1)) if matched else None
 
-        raise Exception('ERROR')
+    # one request for any number of submissions of a contest; the judge
+    # also suggests the next poll interval (ms)
+    def get_submission_statuses(self, contest_key, submission_ids):
+        query = urllib.parse.urlencode([('sids[]', sid) for sid in submission_ids])
+        url = '%s/status/json?%s' % (self.get_submissions_url(contest_key), query)
 
-    def submit(self, source_path):
-        print(source_path)
+        with self.open(url, use_cache=False) as res:
+            data = json.loads(res.read().decode('utf-8'))
 
-        contest_dir = os.path.dirname(source_path)
-        contest_key = os.path.basename(contest_dir)
+        statuses = {
+                int(sid): self.extract_submission_status(entry)
+                for sid, entry in (data.get('Result') or {}).items()
+            }
+        interval = data.get('Interval')
 
-        url = '%s/contests/%s/submit' % (self.base_url, contest_key)
-        params = self.create_submit_params(source_path)
+        return statuses, interval / 1000.0 if interval else None
 
-        print(url, flush=True)
-        print(params, flush=True)
+    def extract_submission_status(self, entry):
+        body = entry.get('Html', '')
 
-        self.sleep_random()
-        print('open >> ' + url, flush=True)
+        label = STATUS_LABEL_PATTERN.search(body)
+        time = STATUS_TIME_PATTERN.search(body)
+        memory = STATUS_MEMORY_PATTERN.search(body)
 
-        encoded_params = urllib.parse.urlencode(params)
-        req = urllib.request.Request('{}?{}'.format(url, encoded_params))
-        with urllib.request.urlopen(req) as res:
-            body = self.read(res.read())
-            print(body)
+        return {
+            'status': ' '.join(label.group(1).split()) if label else '',
+            'time': int(time.group(1)) if time else None,
+            'memory': int(memory.group(1)) if memory else None,
+            'score': entry.get('Score')
+        }
 
+    # forms are posted once and not followed: the redirect itself tells
+    # whether the post went through (see submission.py)
+    def post_form(self, url, params):
+        body = urllib.parse.urlencode(params).encode('utf-8')
+        headers = {'Content-Type': 'application/x-www-form-urlencoded'}
+        return self.open(url, 'POST', body, headers, use_cache=False, follow_redirects=False)
 
-# ------------------------------------------------------------------------------
-if __name__ == '__main__':
-    source_path = os.path.expanduser('~/.procon/atcoder/abc128/a.cpp')
-    api = API()
-    # api.submit(source_path)
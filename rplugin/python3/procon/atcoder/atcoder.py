@@ -4,16 +4,29 @@ import traceback
 
 import os
 import sys
-import json
-import glob
+import hashlib
+import datetime
+import itertools
 
-import functools
-import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 if not os.path.dirname(__file__) in sys.path:
     sys.path.append(os.path.dirname(__file__))
 
-from api import API
+from api import API, DEFAULT_RATE, DEFAULT_BURST
+from http_session import Session, load_cookie_jar
+from comparator import Comparator
+from response_cache import ResponseCache
+from store import Store
+from scratch import scratch_dir
+from languages import all_extensions
+from tracing import span
+
+HASH_CHUNK_SIZE = 1 << 20
+
+# contest times on the site are in JST and carry no offset
+CONTEST_TIMEZONE = datetime.timezone(datetime.timedelta(hours=9))
+CONTEST_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
 
 
 # ==============================================================================
@@ -22,6 +35,8 @@ from api import API
 #
 # ==============================================================================
 class SampleCase(object):
+    __slots__ = ['problem', 'params']
+
     def __init__(self, problem, params):
         self.problem = problem
         self.params = params
@@ -29,12 +44,21 @@ class SampleCase(object):
     def index(self):
         return int(self.params['index'])
 
+    # cases loaded from the manifest read their files on first use
     def input_data(self):
+        if 'input' not in self.params:
+            self.params['input'] = self.read_file(self.input_file_path())
         return self.params['input']
 
     def output_data(self):
+        if 'output' not in self.params:
+            self.params['output'] = self.read_file(self.output_file_path())
         return self.params['output']
 
+    def read_file(self, file_path):
+        with open(file_path, mode='r') as f:
+            return f.read()
+
     def input_file_path(self):
         return self.input_file_path_static(self.problem, self.index())
 
@@ -42,7 +66,7 @@ class SampleCase(object):
         return self.output_file_path_static(self.problem, self.index())
 
     def runner_file_path(self):
-        directory = self.problem.contest.tmp_dir()
+        directory = self.problem.contest.scratch_dir()
 
         problem_key = self.problem.problem_key()
         filename = '%s.%s.txt' % (problem_key, str(self.index()))
@@ -60,6 +84,10 @@ class SampleCase(object):
         return self.inspect()
 
     def save(self):
+        with span('sample.save', {'index': self.index()}):
+            self.save_files()
+
+    def save_files(self):
         input_file_path = self.input_file_path()
         output_file_path = self.output_file_path()
 
@@ -96,11 +124,15 @@ class SampleCase(object):
 
         return ''
 
-    def diff(self):
+    def diff(self, comparator=None):
+        return self.compare(comparator)['ok']
+
+    def compare(self, comparator=None):
+        comparator = comparator if comparator else Comparator()
+
         lhs = self.runner_file_path()
         rhs = self.output_file_path()
-        process = subprocess.run(['diff', lhs, rhs], stdout=subprocess.DEVNULL)
-        return process.returncode == 0
+        return comparator.compare_files(lhs, rhs)
 
     @classmethod
     def base_dir(self, problem):
@@ -116,42 +148,64 @@ class SampleCase(object):
         directory = self.base_dir(problem)
         return '%s/%s.%d.out' % (directory, problem.problem_key(), index)
 
+    # {index: {'in': stat, 'out': stat}} from a single directory listing
     @classmethod
-    def glob_input_files(self, problem):
+    def scan_files(self, problem):
         directory = self.base_dir(problem)
-        return glob.glob('%s/%s.*.in' % (directory, problem.problem_key()))
+        prefix = '%s.' % problem.problem_key()
 
-    @classmethod
-    def glob_output_files(self, problem):
-        directory = self.base_dir(problem)
-        return glob.glob('%s/%s.*.out' % (directory, problem.problem_key()))
+        try:
+            entries = list(os.scandir(directory))
+        except FileNotFoundError:
+            return {}
+
+        files = {}
+        for entry in entries:
+            if not entry.name.startswith(prefix):
+                continue
+
+            index, _, kind = entry.name[len(prefix):].partition('.')
+            if kind in ['in', 'out'] and index.isdigit():
+                files.setdefault(int(index), {})[kind] = entry.stat()
+
+        return files
 
     @classmethod
-    def load(self, problem, index):
-        input_file_path = self.input_file_path_static(problem, index)
-        output_file_path = self.output_file_path_static(problem, index)
+    def is_fresh(self, sample, stats):
+        if sample is None:
+            return False
 
-        if not(os.path.exists(input_file_path)):
-            return None
+        for field, kind in [('input', 'in'), ('output', 'out')]:
+            if sample['%s_size' % field] != stats[kind].st_size:
+                return False
+            if sample['%s_mtime' % field] != stats[kind].st_mtime_ns:
+                return False
 
-        if not(os.path.exists(output_file_path)):
-            return None
+        return True
 
-        params = {'index': index}
+    @classmethod
+    def manifest_entry(self, problem, index, stats):
+        sample = {'index': index}
 
-        try:
-            with open(input_file_path, mode='r') as f:
-                params['input'] = f.read()
+        paths = {
+            'input': self.input_file_path_static(problem, index),
+            'output': self.output_file_path_static(problem, index)
+        }
 
-            with open(output_file_path, mode='r') as f:
-                params['output'] = f.read()
+        for field, kind in [('input', 'in'), ('output', 'out')]:
+            sample['%s_size' % field] = stats[kind].st_size
+            sample['%s_mtime' % field] = stats[kind].st_mtime_ns
+            sample['%s_hash' % field] = self.file_hash(paths[field])
 
-            return SampleCase(problem, params)
-        except Exception as exception:
-            print(exception)
-            traceback.print_exc()
+        return sample
 
-        return None
+    @classmethod
+    def file_hash(self, file_path):
+        sha = hashlib.sha1()
+        with open(file_path, mode='rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                sha.update(chunk)
+        return sha.hexdigest()
 
     @classmethod
     def create_sample_cases_from_website(self, problem):
@@ -167,17 +221,44 @@ class SampleCase(object):
 #
 # ==============================================================================
 class Code(object):
+    __slots__ = ['problem']
+
     def __init__(self, problem, params):
         self.problem = problem
-        self.params = {}
 
+    # the first existing source in registry order, a new .cpp otherwise
     def source_path(self):
         contest_dir = self.problem.contest.root_dir()
-        return '%s/%s.cpp' % (contest_dir, self.problem.problem_key())
+        problem_key = self.problem.problem_key()
+
+        for extension in all_extensions():
+            source_path = '%s/%s.%s' % (contest_dir, problem_key, extension)
+            if os.path.exists(source_path):
+                return source_path
+
+        return '%s/%s.cpp' % (contest_dir, problem_key)
+
+    # the first non-empty source in registry order; an empty a.cpp left by
+    # the template does not hide the a.py next to it
+    def solution_path(self):
+        contest_dir = self.problem.contest.root_dir()
+        problem_key = self.problem.problem_key()
+
+        for extension in all_extensions():
+            source_path = '%s/%s.%s' % (contest_dir, problem_key, extension)
+            if os.path.exists(source_path) and os.path.getsize(source_path) > 0:
+                return source_path
+
+        return None
 
-    def binary_path(self):
+    def binary_path(self, source_path=None):
         tmpdir = self.problem.contest.tmp_dir()
-        return '%s/%s.out' % (tmpdir, self.problem.problem_key())
+        source_path = source_path if source_path else self.source_path()
+
+        extension = os.path.splitext(source_path)[1]
+        if extension == '.cpp':
+            return '%s/%s.out' % (tmpdir, self.problem.problem_key())
+        return '%s/%s%s.out' % (tmpdir, self.problem.problem_key(), extension)
 
     def __repr__(self):
         source_path = self.source_path()
@@ -185,12 +266,26 @@ class Code(object):
         basename = os.path.basename(source_path)
         return 'Code({}: {})'.format(dirname, basename)
 
+    # <root_dir>/template.<ext>, when there is one
+    def template_path(self, source_path=None):
+        source_path = source_path if source_path else self.source_path()
+        extension = os.path.splitext(source_path)[1]
+        return '%s/template%s' % (self.problem.contest.atcoder.root_dir(), extension)
+
     def update(self):
         source_path = self.source_path()
 
         if not os.path.exists(source_path):
+            os.makedirs(os.path.dirname(source_path), exist_ok=True)
+
+            template_path = self.template_path(source_path)
+            template = ''
+            if os.path.exists(template_path):
+                with open(template_path, mode='r') as f:
+                    template = f.read()
+
             with open(source_path, mode='w') as f:
-                f.write('')
+                f.write(template)
 
 
 # ==============================================================================
@@ -199,12 +294,19 @@ class Code(object):
 #
 # ==============================================================================
 class Problem(object):
+    __slots__ = ['contest', 'params', 'sample_cases']
+
     def __init__(self, contest, params):
         self.contest = contest
         self.params = params
 
         self.sample_cases = []
-        self.code = Code(self, {})
+
+    # code is derived from the problem alone, so it is not kept around for
+    # every problem of the archive
+    @property
+    def code(self):
+        return Code(self, {})
 
     def api(self):
         return self.contest.api()
@@ -237,14 +339,25 @@ class Problem(object):
         self.update_sample_case()
 
     def update_info_and_sample_cases(self):
+        self.commit_info_and_sample_cases(self.fetch_info_and_sample_cases())
+
+    def fetch_info_and_sample_cases(self):
         contest_key = self.contest_key()
         problem_key = self.problem_key()
 
         api = self.api()
-        res = api.get_problem_info_and_sample_cases(contest_key, problem_key)
+        with span('problem.fetch', {'problem': problem_key}):
+            return api.get_problem_info_and_sample_cases(contest_key, problem_key)
 
+    def commit_info_and_sample_cases(self, res):
         self.params.update(res['info'])
-        self.sample_cases = res['sample_cases']
+        self.sample_cases = [
+                SampleCase(self, params) for params in res['sample_cases']]
+
+        for sample_case in self.sample_cases:
+            sample_case.save()
+
+        self.save_sample_metadata()
 
     def update_sample_case(self, is_force=False):
         self.sample_cases = self.load_sample_case_from_cache()
@@ -258,25 +371,88 @@ class Problem(object):
         for sample_case in sample_cases:
             sample_case.save()
 
+        self.sample_cases = sample_cases
+        self.save_sample_metadata()
+
         return sample_cases
 
+    def save_sample_metadata(self):
+        self.update_sample_manifest()
+
+    # the manifest lives in the store; loading lists the samples directory
+    # and compares sizes and mtimes, so only changed files are hashed and
+    # no sample data is read until a case needs it
     def load_sample_case_from_cache(self):
-        input_files = SampleCase.glob_input_files(self)
-        output_files = SampleCase.glob_output_files(self)
+        with span('sample.manifest', {'problem': self.problem_key()}):
+            manifest = self.update_sample_manifest()
 
-        length = max(len(input_files), len(output_files))
-        indexes = range(1, length + 1)
+        return [SampleCase(self, sample) for sample in manifest]
 
-        sample_cases = [SampleCase.load(self, index) for index in indexes]
-        return list(filter(lambda x: x, sample_cases))
+    def update_sample_manifest(self):
+        contest_key = self.contest_key()
+        problem_key = self.problem_key()
+        store = self.contest.store()
+
+        previous = {}
+        try:
+            samples = store.load_samples(contest_key, problem_key)
+            previous = {sample['index']: sample for sample in samples}
+        except Exception as exception:
+            print(exception)
+            traceback.print_exc()
+
+        manifest = []
+        changed = []
+
+        for index, stats in sorted(SampleCase.scan_files(self).items()):
+            if 'in' not in stats or 'out' not in stats:
+                kind = 'output' if 'in' in stats else 'input'
+                print('sample %s/%d has no %s file' % (problem_key, index, kind))
+                continue
+
+            sample = previous.get(index)
+            if not SampleCase.is_fresh(sample, stats):
+                sample = SampleCase.manifest_entry(self, index, stats)
+                changed.append(sample)
+
+            manifest.append(sample)
+
+        indexes = set(sample['index'] for sample in manifest)
+        removed = sorted(index for index in previous if index not in indexes)
+
+        if changed or removed:
+            try:
+                store.save_samples(contest_key, problem_key, changed)
+                store.delete_samples(contest_key, problem_key, removed)
+            except Exception as exception:
+                print(exception)
+                traceback.print_exc()
+
+        return manifest
 
     @classmethod
-    def create_problems_from_website(self, contest):
-        params_list = contest.api().get_problem_params_list(contest.key())
+    def create_problems_from_website(self, contest, params_list=None):
+        if params_list is None:
+            params_list = contest.api().get_problem_params_list(contest.key())
         problems = [Problem(contest, params) for params in params_list]
 
-        for problem in problems:
-            problem.update_info_and_sample_cases()
+        # pages are fetched concurrently (the API rate limiter keeps them
+        # polite) and committed one by one as they arrive.
+        max_workers = contest.atcoder.fetch_workers()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                    executor.submit(problem.fetch_info_and_sample_cases): problem
+                    for problem in problems
+                    }
+
+            for future in as_completed(futures):
+                problem = futures[future]
+
+                try:
+                    problem.commit_info_and_sample_cases(future.result())
+                except Exception as exception:
+                    print(exception)
+                    traceback.print_exc()
 
         return problems
 
@@ -287,6 +463,8 @@ class Problem(object):
 #
 # ==============================================================================
 class Contest(object):
+    __slots__ = ['atcoder', 'params', '_problems', 'problem_index', 'sample_cases']
+
     def __init__(self, atcoder, params):
         self.atcoder = atcoder
         self.params = params
@@ -294,6 +472,17 @@ class Contest(object):
         self.problems = []
         self.sample_cases = []
 
+    @property
+    def problems(self):
+        return self._problems
+
+    # the key index is built on the first lookup; most contests of the
+    # archive are only ever listed
+    @problems.setter
+    def problems(self, problems):
+        self._problems = problems
+        self.problem_index = None
+
     def api(self):
         return self.atcoder.api
 
@@ -306,14 +495,22 @@ class Contest(object):
     def time(self):
         return self.params['time']
 
+    # the start as a unix time, None for contests not in the list
+    def start_time(self):
+        if not self.params.get('time'):
+            return None
+
+        started_at = datetime.datetime.strptime(self.time(), CONTEST_TIME_FORMAT)
+        return started_at.replace(tzinfo=CONTEST_TIMEZONE).timestamp()
+
     def root_dir(self):
         return '%s/%s' % (self.atcoder.root_dir(), self.key())
 
     def tmp_dir(self):
         return '%s/tmp' % self.root_dir()
 
-    def problem_list_path(self):
-        return '%s/problems.json' % self.root_dir()
+    def scratch_dir(self):
+        return scratch_dir(self.atcoder.root_dir(), self.key(), self.tmp_dir())
 
     def inspect(self):
         return 'Contest(%s)' % self.key()
@@ -339,36 +536,30 @@ class Contest(object):
     def update_problems_from_website(self):
         return Problem.create_problems_from_website(self)
 
+    def store(self):
+        return self.atcoder.store
+
     def save(self):
-        json_data = json.dumps([problem.params for problem in self.problems])
+        params_list = [problem.params for problem in self.problems]
 
         try:
             os.makedirs(self.root_dir(), exist_ok=True)
-            with open(self.problem_list_path(), mode='w') as f:
-                f.write(json_data)
+            self.store().save_problems(self.key(), params_list)
         except Exception as exception:
             print(exception)
             traceback.print_exc()
 
     def load_problems_from_cache(self):
-        if not os.path.exists(self.problem_list_path()):
-            return []
-
-        problem_params_list = []
-        try:
-            with open(self.problem_list_path(), mode='r') as f:
-                problem_params_list = json.load(f)
-        except Exception as exception:
-            print(exception)
-            traceback.print_exc()
+        self.atcoder.migrate()
 
+        problem_params_list = self.store().load_problems(self.key())
         return [Problem(self, params) for params in problem_params_list]
 
     def find_problem(self, key):
-        compare = (lambda x: x.problem_key() == key)
-        problems = list(filter(compare, self.problems))
+        if self.problem_index is None:
+            self.problem_index = {problem.problem_key(): problem for problem in self.problems}
 
-        return problems[0] if len(problems) != 0 else None
+        return self.problem_index.get(key)
 
 
 # ==============================================================================
@@ -378,13 +569,42 @@ class Contest(object):
 # ==============================================================================
 class AtCoder(object):
     def __init__(self, root_dir, params={}):
-        self.api = API()
+        self.params = params
         self._root_dir = root_dir
         self.contests = []
 
+        self.store = Store(self.store_path())
+        self.is_migrated = False
+
+        offline = os.environ.get('PROCON_OFFLINE', '') not in ['', '0']
+        cache = ResponseCache(self.response_cache_dir(),
+                              offline=self.params.get('offline', offline))
+
+        # one session for every request, so a login covers all of them
+        session = Session(cookie_jar=load_cookie_jar(self.cookie_path()))
+
+        self.api = API(rate=self.params.get('rate', DEFAULT_RATE),
+                       burst=self.params.get('burst', DEFAULT_BURST),
+                       session=session, cache=cache)
+
+    def fetch_workers(self):
+        return self.params.get('fetch_workers', 4)
+
+    @property
+    def contests(self):
+        return self._contests
+
+    @contests.setter
+    def contests(self, contests):
+        self._contests = contests
+        self.contest_index = {contest.key(): contest for contest in contests}
+
     def find_contest(self, key):
-        contests = list(filter(lambda x: x.key() == key, self.contests))
-        return contests[0] if len(contests) != 0 else None
+        return self.contest_index.get(key)
+
+    def find_problem(self, contest_key, problem_key):
+        contest = self.find_contest(contest_key)
+        return contest.find_problem(problem_key) if contest else None
 
     def find_or_create_contest(self, key):
         contest = self.find_contest(key)
@@ -393,24 +613,54 @@ class AtCoder(object):
     def root_dir(self):
         return self._root_dir
 
-    def contests_cache_path(self):
-        return '%s/contests.json' % self.root_dir()
+    def store_path(self):
+        return '%s/procon.sqlite3' % self.root_dir()
+
+    def response_cache_dir(self):
+        return '%s/.cache/http' % self.root_dir()
+
+    def cookie_path(self):
+        return '%s/cookies.txt' % self.root_dir()
 
     def set_root_dir(self, root_dir):
         self._root_dir = root_dir
 
+        self.store.close()
+        self.store = Store(self.store_path())
+        self.is_migrated = False
+
+    def migrate(self):
+        if self.is_migrated:
+            return
+
+        try:
+            self.store.migrate_from_json(self.root_dir())
+        except Exception as exception:
+            print(exception)
+            traceback.print_exc()
+
+        self.is_migrated = True
+
     def problems(self):
-        problems_list = map(lambda contest: contest.problems, self.contests)
-        return functools.reduce(lambda a, b: a + b, problems_list)
+        return list(self.iter_problems())
+
+    def iter_problems(self):
+        return itertools.chain.from_iterable(
+                contest.problems for contest in self.contests)
 
     def load(self):
-        self.contests = self.load_contests_from_cache()
+        with span('model.load'):
+            return self.load_impl()
 
+    def load_impl(self):
         sorter = (lambda x: x.time())
-        self.contests = sorted(self.contests, key=sorter, reverse=True)
+        self.contests = sorted(self.load_contests_from_cache(), key=sorter, reverse=True)
 
+        # one query for every problem instead of one per contest
+        problem_params_lists = self.store.load_all_problems()
         for contest in self.contests:
-            contest.load()
+            params_list = problem_params_lists.get(contest.key(), [])
+            contest.problems = [Problem(contest, params) for params in params_list]
 
         return self
 
@@ -424,11 +674,11 @@ class AtCoder(object):
             print(contest.inspect())
 
     def load_contests_from_cache(self):
+        self.migrate()
+
         try:
-            if os.path.exists(self.contests_cache_path()):
-                with open(self.contests_cache_path(), mode='r') as f:
-                    parameterSet = json.load(f)
-                    return [Contest(self, params) for params in parameterSet]
+            params_list = self.store.load_contests()
+            return [Contest(self, params) for params in params_list]
         except Exception as exception:
             print(exception)
             traceback.print_exc()
@@ -441,24 +691,95 @@ class AtCoder(object):
 
     def update_contests_from_website(self, index):
         contests = self.load_cache_from_website(index)
+        contests = self.merge_contests(self.contests, contests)
 
-        sorter = (lambda x: x.time())
-        contests = sorted(contests, key=sorter, reverse=True)
-        json_data = json.dumps([contest.params for contest in contests])
+        self.save_contests(contests)
+        return contests
 
-        cache_path = self.contests_cache_path()
+    def sync_contests_from_website(self):
+        with span('contest.sync'):
+            return self.sync_contests_from_website_impl()
+
+    def sync_contests_from_website_impl(self):
+        contests = self.load_contests_from_cache()
+        known_keys = set(contest.key() for contest in contests)
+        is_complete = self.load_archive_state().get('complete', False)
+
+        # the archive is newest first, so a page with a known contest means
+        # the rest is known too, but only once the whole archive has been
+        # crawled at least once
+        def is_known(archive_page):
+            keys = [params['key'] for params in archive_page['contests']]
+            return is_complete and any(key in known_keys for key in keys)
+
+        # a full crawl fetches pages in parallel; an update usually ends on
+        # page 1 or 2, so it goes a page at a time and stops at the first
+        # known one
+        window = 1 if is_complete else self.fetch_workers()
+
+        params_list = list(self.api.get_contest_params_list())
+
+        archive_pages = [self.api.get_contest_archive_page(1)]
+        last_page = archive_pages[0]['last_page']
+        is_stopped = is_known(archive_pages[0])
+        is_failed = len(archive_pages[0]['contests']) == 0
+
+        page = 2
+        with ThreadPoolExecutor(max_workers=self.fetch_workers()) as executor:
+            while not is_stopped and not is_failed and page <= last_page:
+                pages = range(page, min(page + window, last_page + 1))
+                page = pages.stop
+
+                fetcher = self.api.get_contest_archive_page
+                for archive_page in executor.map(fetcher, pages):
+                    if len(archive_page['contests']) == 0:
+                        is_failed = True
+                        break
+
+                    archive_pages.append(archive_page)
+                    if is_known(archive_page):
+                        is_stopped = True
+                        break
+
+        for archive_page in archive_pages:
+            params_list.extend(archive_page['contests'])
+
+        fetched = [Contest(self, params) for params in params_list]
+        self.contests = self.merge_contests(contests, fetched)
+        self.save_contests(self.contests)
+
+        if not is_failed:
+            self.save_archive_state({'complete': True, 'last_page': last_page})
+
+        print('sync: %d pages, %d contests' % (
+            len(archive_pages), len(self.contests)))
+        return self.contests
+
+    def merge_contests(self, contests, fetched_contests):
+        merged = {contest.key(): contest for contest in contests}
+
+        for contest in fetched_contests:
+            if contest.key() in merged:
+                merged[contest.key()].params.update(contest.params)
+            else:
+                merged[contest.key()] = contest
 
+        sorter = (lambda x: x.time())
+        return sorted(merged.values(), key=sorter, reverse=True)
+
+    def save_contests(self, contests):
         try:
-            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
-            print('write ' + cache_path)
-            with open(cache_path, mode='w') as f:
-                f.write(json_data)
+            print('write %d contests to %s' % (len(contests), self.store_path()))
+            self.store.save_contests([contest.params for contest in contests])
         except Exception as exception:
             print(exception)
             traceback.print_exc()
 
-        return contests
+    def load_archive_state(self):
+        return self.store.get_meta('archive_state', {})
 
+    def save_archive_state(self, state):
+        self.store.set_meta('archive_state', state)
 
 if __name__ == '__main__':
     root_dir = os.path.expandvars('$HOME/.procon/atcoder')
@@ -0,0 +1,227 @@
+# coding: utf-8
+
+import io
+import re
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+CHUNK_SIZE = 1 << 16
+NUMPY_THRESHOLD = 1 << 12
+
+TOKEN_PATTERN = re.compile(rb'\S+')
+
+
+# ==============================================================================
+#
+# token stream
+#
+# ==============================================================================
+def read_token_batches(f, chunk_size=CHUNK_SIZE):
+    carry = b''
+
+    while True:
+        chunk = f.read(chunk_size)
+
+        if not chunk:
+            if carry:
+                yield [carry]
+            return
+
+        chunk = carry + chunk
+        tokens = chunk.split()
+
+        # a token touching the end of the chunk may continue in the next one
+        carry = b''
+        if tokens and not chunk[-1:].isspace():
+            carry = tokens.pop()
+
+        if tokens:
+            yield tokens
+
+
+class TokenStream(object):
+    def __init__(self, batches):
+        self.batches = batches
+        self.tokens = []
+        self.position = 0
+
+    def peek(self):
+        while self.position >= len(self.tokens):
+            self.tokens = next(self.batches, None)
+            self.position = 0
+
+            if self.tokens is None:
+                self.tokens = []
+                return []
+
+        return self.tokens[self.position:]
+
+    def consume(self, count):
+        self.position += count
+
+
+# ==============================================================================
+#
+# Comparator
+#
+# ==============================================================================
+class Comparator(object):
+    def __init__(self, abs_tol=0.0, rel_tol=0.0):
+        self.abs_tol = abs_tol
+        self.rel_tol = rel_tol
+
+    def has_tolerance(self):
+        return self.abs_tol > 0.0 or self.rel_tol > 0.0
+
+    def compare_files(self, actual_path, expected_path):
+        with open(actual_path, mode='rb') as actual:
+            with open(expected_path, mode='rb') as expected:
+                result = self.compare_streams(actual, expected)
+
+        if not result['ok']:
+            path = actual_path if result['actual'] is not None else expected_path
+            with open(path, mode='rb') as f:
+                result.update(self.locate(f, result['index']))
+
+        return result
+
+    def compare_bytes(self, actual_data, expected_data):
+        actual = io.BytesIO(actual_data)
+        expected = io.BytesIO(expected_data)
+        result = self.compare_streams(actual, expected)
+
+        if not result['ok']:
+            data = actual_data if result['actual'] is not None else expected_data
+            result.update(self.locate(io.BytesIO(data), result['index']))
+
+        return result
+
+    def compare_streams(self, actual, expected):
+        lhs = TokenStream(read_token_batches(actual))
+        rhs = TokenStream(read_token_batches(expected))
+
+        offset = 0
+
+        while True:
+            lhs_tokens = lhs.peek()
+            rhs_tokens = rhs.peek()
+
+            if not lhs_tokens or not rhs_tokens:
+                if not lhs_tokens and not rhs_tokens:
+                    return {'ok': True}
+
+                actual_token = lhs_tokens[0] if lhs_tokens else None
+                expected_token = rhs_tokens[0] if rhs_tokens else None
+                return self.mismatch(offset, actual_token, expected_token)
+
+            count = min(len(lhs_tokens), len(rhs_tokens))
+            lhs_tokens = lhs_tokens[0:count]
+            rhs_tokens = rhs_tokens[0:count]
+
+            index = self.find_mismatch(lhs_tokens, rhs_tokens)
+            if index >= 0:
+                return self.mismatch(
+                        offset + index, lhs_tokens[index], rhs_tokens[index])
+
+            lhs.consume(count)
+            rhs.consume(count)
+            offset += count
+
+    def mismatch(self, index, actual_token, expected_token):
+        decode = (lambda x: x.decode('utf-8', 'replace') if x else None)
+
+        return {
+            'ok': False,
+            'index': index,
+            'actual': decode(actual_token),
+            'expected': decode(expected_token)
+            }
+
+    def find_mismatch(self, lhs_tokens, rhs_tokens):
+        if lhs_tokens == rhs_tokens:
+            return -1
+
+        if self.has_tolerance() and numpy and len(lhs_tokens) >= NUMPY_THRESHOLD:
+            index = self.find_mismatch_vectorized(lhs_tokens, rhs_tokens)
+            if index is not None:
+                return index
+
+        for index, (lhs, rhs) in enumerate(zip(lhs_tokens, rhs_tokens)):
+            if lhs != rhs and not self.is_close(lhs, rhs):
+                return index
+
+        return -1
+
+    def find_mismatch_vectorized(self, lhs_tokens, rhs_tokens):
+        try:
+            lhs = numpy.array(lhs_tokens).astype(numpy.float64)
+            rhs = numpy.array(rhs_tokens).astype(numpy.float64)
+        except ValueError:
+            # not every token is a number, let the scalar path decide
+            return None
+
+        tolerance = numpy.maximum(self.abs_tol, self.rel_tol * numpy.abs(rhs))
+        is_close = numpy.abs(lhs - rhs) <= tolerance
+
+        # tokens which are equal as text (e.g. 'nan', 'inf') are always accepted
+        is_bad = ~is_close
+        for index in numpy.flatnonzero(is_bad):
+            if lhs_tokens[index] != rhs_tokens[index]:
+                return int(index)
+
+        return -1
+
+    def is_close(self, lhs, rhs):
+        if not self.has_tolerance():
+            return False
+
+        try:
+            lhs = float(lhs)
+            rhs = float(rhs)
+        except ValueError:
+            return False
+
+        return abs(lhs - rhs) <= max(self.abs_tol, self.rel_tol * abs(rhs))
+
+    def locate(self, f, index):
+        line = 1
+        line_start = 0
+        offset = 0
+        count = 0
+        carry = b''
+
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            data = carry + chunk
+            base = offset - len(carry)
+
+            end = len(data)
+            if chunk and data and not data[-1:].isspace():
+                # keep an unfinished token for the next round
+                last = data.rfind(b' ')
+                last = max(last, data.rfind(b'\n'), data.rfind(b'\t'))
+                end = last + 1
+
+            for matched in TOKEN_PATTERN.finditer(data, 0, end):
+                if count == index:
+                    newlines = data.count(b'\n', 0, matched.start())
+                    if newlines:
+                        line += newlines
+                        line_start = base + data.rfind(b'\n', 0, matched.start()) + 1
+                    column = base + matched.start() - line_start + 1
+                    return {'line': line, 'column': column}
+                count += 1
+
+            newlines = data.count(b'\n', 0, end)
+            if newlines:
+                line += newlines
+                line_start = base + data.rfind(b'\n', 0, end) + 1
+
+            if not chunk:
+                return {'line': line, 'column': base + end - line_start + 1}
+
+            carry = data[end:]
+            offset += len(chunk)
@@ -0,0 +1,225 @@
+# coding: utf-8
+
+import os
+import time
+import signal
+import hashlib
+import tempfile
+import threading
+import subprocess
+
+from concurrent.futures import CancelledError
+
+PCH_HEADER = 'bits/stdc++.h'
+
+# ==============================================================================
+#
+# CompileError
+#
+# ==============================================================================
+# the compiler's diagnostics travel with the error, so they show up wherever
+# it is printed instead of on the plugin host's stderr
+class CompileError(subprocess.CalledProcessError):
+    def __str__(self):
+        message = super().__str__()
+        if self.stderr:
+            message += '\n' + self.stderr.decode('utf-8', 'replace').rstrip()
+        return message
+
+
+# runners of a batch build the same header at once; one build per path
+PCH_LOCKS = {}
+PCH_LOCKS_LOCK = threading.Lock()
+
+
+def pch_lock(pch_path):
+    with PCH_LOCKS_LOCK:
+        if pch_path not in PCH_LOCKS:
+            PCH_LOCKS[pch_path] = threading.Lock()
+        return PCH_LOCKS[pch_path]
+
+
+# ==============================================================================
+#
+# CompileCache
+#
+# ==============================================================================
+class CompileCache(object):
+    def __init__(self, pch_root_dir, compiler='g++', flags=[]):
+        self.pch_root_dir = pch_root_dir
+        self.compiler = compiler
+        self.flags = list(flags)
+
+        self._compiler_version = None
+
+        self.lock = threading.Lock()
+        self.processes = set()
+        self.is_cancelled = False
+
+    def compiler_version(self):
+        if self._compiler_version is None:
+            command = [self.compiler, '--version']
+            process = subprocess.run(command, stdout=subprocess.PIPE)
+            self._compiler_version = process.stdout.decode('utf-8')
+
+        return self._compiler_version
+
+    def profile_key(self):
+        sha = hashlib.sha256()
+        sha.update(self.compiler.encode('utf-8'))
+        sha.update(self.compiler_version().encode('utf-8'))
+        sha.update("\0".join(self.flags).encode('utf-8'))
+        return sha.hexdigest()
+
+    def source_key(self, source_path):
+        sha = hashlib.sha256()
+        sha.update(self.profile_key().encode('utf-8'))
+
+        with open(source_path, mode='rb') as f:
+            sha.update(f.read())
+
+        return sha.hexdigest()
+
+    def key_path(self, binary_path):
+        return '%s.key' % binary_path
+
+    def read_key(self, binary_path):
+        try:
+            with open(self.key_path(binary_path), mode='r') as f:
+                return f.read().strip()
+        except OSError:
+            return None
+
+    def write_key(self, binary_path, key):
+        with open(self.key_path(binary_path), mode='w') as f:
+            f.write(key)
+
+    def is_hit(self, key, binary_path):
+        if not os.path.exists(binary_path):
+            return False
+        return self.read_key(binary_path) == key
+
+    def pch_dir(self):
+        return '%s/%s' % (self.pch_root_dir, self.profile_key()[0:16])
+
+    def pch_path(self):
+        return '%s/%s.gch' % (self.pch_dir(), PCH_HEADER)
+
+    def prepare_pch(self):
+        pch_path = self.pch_path()
+        if os.path.exists(pch_path):
+            return False
+
+        with pch_lock(pch_path):
+            if os.path.exists(pch_path):
+                return False
+            return self.build_pch(pch_path)
+
+    # the header is built under a unique name and renamed into place, so
+    # another process never sees (and gcc never loads) a partial gch
+    def build_pch(self, pch_path):
+        pch_dir = self.pch_dir()
+        os.makedirs(os.path.dirname(pch_path), exist_ok=True)
+
+        # gcc looks for '<dir>/bits/stdc++.h.gch' in every include directory
+        # before the header itself, so '-I <pch_dir>' is enough to pick it up.
+        wrapper_path = '%s/pch.h' % pch_dir
+        fd, tmp_wrapper_path = tempfile.mkstemp(dir=pch_dir, suffix='.h')
+        with os.fdopen(fd, mode='w') as f:
+            f.write('#include <%s>\n' % PCH_HEADER)
+        os.chmod(tmp_wrapper_path, 0o644)
+        os.replace(tmp_wrapper_path, wrapper_path)
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(pch_path), suffix='.gch.tmp')
+        os.close(fd)
+
+        try:
+            command = [self.compiler] + self.flags
+            command.extend(['-x', 'c++-header', wrapper_path, '-o', tmp_path])
+
+            # a failed header only costs speed, the compile goes on without it
+            process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            if process.returncode != 0:
+                return False
+
+            # mkstemp creates the file private to us
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, pch_path)
+            return True
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def uses_pch(self, source_path):
+        with open(source_path, mode='rb') as f:
+            return ('<%s>' % PCH_HEADER).encode('utf-8') in f.read()
+
+    def compile(self, source_path, binary_path):
+        started_at = time.time()
+        key = self.source_key(source_path)
+
+        if self.is_hit(key, binary_path):
+            return {'hit': True, 'pch': False, 'elapsed_time': 0.0}
+
+        os.makedirs(os.path.dirname(binary_path), exist_ok=True)
+        if os.path.exists(self.key_path(binary_path)):
+            os.remove(self.key_path(binary_path))
+
+        command = [self.compiler] + self.flags
+
+        use_pch = self.uses_pch(source_path)
+        if use_pch:
+            self.prepare_pch()
+            use_pch = os.path.exists(self.pch_path())
+
+        if use_pch:
+            command.extend(['-I', self.pch_dir()])
+
+        command.extend([source_path, '-o', binary_path])
+        messages = self.run_compiler(command)
+
+        self.write_key(binary_path, key)
+
+        elapsed_time = time.time() - started_at
+        return {'hit': False, 'pch': use_pch, 'elapsed_time': elapsed_time, 'messages': messages}
+
+    # like subprocess.run(check=True), but cancel() can kill the compiler;
+    # the driver gets a group of its own, so cc1plus and ld go with it.
+    # returns the warnings, errors are raised as CompileError
+    def run_compiler(self, command):
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                   start_new_session=True)
+
+        with self.lock:
+            self.processes.add(process)
+            if self.is_cancelled:
+                self.kill(process)
+
+        try:
+            stdout, stderr = process.communicate()
+        finally:
+            with self.lock:
+                self.processes.discard(process)
+
+        if self.is_cancelled:
+            raise CancelledError('compile cancelled: %s' % command[-3])
+        if process.returncode != 0:
+            raise CompileError(process.returncode, command, output=stdout, stderr=stderr)
+
+        return stderr.decode('utf-8', 'replace')
+
+    # a newer save makes the compile in flight worthless; the key file is
+    # already gone, so a killed compile is never taken for a cache hit
+    def cancel(self):
+        with self.lock:
+            self.is_cancelled = True
+            for process in self.processes:
+                self.kill(process)
+
+    # the driver is not reaped while it is in self.processes, so its pgid
+    # is still ours
+    def kill(self, process):
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
@@ -0,0 +1,404 @@
+# coding: utf-8
+
+import os
+import time
+import select
+import signal
+import resource
+import tempfile
+import threading
+
+DEFAULT_TIME_LIMIT = 2.0
+DEFAULT_MEMORY_LIMIT = 1024 * 1024 * 1024
+DEFAULT_OUTPUT_LIMIT = 64 * 1024 * 1024
+
+STDERR_LIMIT = 4096
+PIPE_CHUNK_SIZE = 1 << 16
+
+# messages a program prints when an allocation fails under RLIMIT_AS
+OUT_OF_MEMORY_MESSAGES = [b'bad_alloc', b'MemoryError', b'memory allocation of']
+
+
+def has_sanitizer(flags):
+    return any(flag.startswith('-fsanitize') for flag in flags)
+
+
+# ==============================================================================
+#
+# Executor
+#
+# ==============================================================================
+class Executor(object):
+    def __init__(self, time_limit=DEFAULT_TIME_LIMIT,
+                 memory_limit=DEFAULT_MEMORY_LIMIT,
+                 output_limit=DEFAULT_OUTPUT_LIMIT,
+                 limit_address_space=True):
+        self.time_limit = time_limit
+        self.memory_limit = memory_limit
+        self.output_limit = output_limit
+
+        # sanitizers reserve terabytes of shadow memory up front, so their
+        # builds can not run under RLIMIT_AS (see has_sanitizer)
+        self.limit_address_space = limit_address_space
+
+        # process groups still running, so cancel() can kill them
+        self.lock = threading.Lock()
+        self.running = set()
+        self.is_cancelled = False
+
+    def wall_limit(self):
+        # cpu time decides TLE; the wall clock only catches programs that
+        # sleep or block on input, so it can be generous
+        return self.time_limit * 2 + 1.0
+
+    def cpu_limit(self):
+        return int(self.time_limit) + 1
+
+    def address_space_limit(self):
+        # peak rss is compared against the memory limit afterwards; the
+        # address space limit is a safety net against runaway allocation
+        return self.memory_limit * 2
+
+    # target, when given, runs in the forked child instead of exec; the
+    # interpreter pool uses it to run a script in a warm interpreter
+    def execute(self, argv, input_path, output_path, target=None):
+        input_fd = os.open(input_path, os.O_RDONLY)
+        output_fd = os.open(output_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        stderr_file = tempfile.TemporaryFile()
+
+        try:
+            baseline_rss = self.resident_size()
+            started_at = time.perf_counter()
+            pid = self.spawn(argv, input_fd, output_fd, stderr_file.fileno(), target)
+            killed, status, rusage = self.wait(pid, self.wall_limit())
+            wall_time = time.perf_counter() - started_at
+
+            output_size = os.fstat(output_fd).st_size
+            stderr = self.read_stderr(stderr_file)
+        finally:
+            os.close(input_fd)
+            os.close(output_fd)
+            stderr_file.close()
+
+        return self.make_result(wall_time, killed, status, rusage, baseline_rss, output_size, stderr)
+
+    # stdin is written from a bytes-like object (an mmap works without a
+    # copy) and stdout is collected in memory, so no file is touched
+    def execute_piped(self, argv, input_data):
+        stdin_read_fd, stdin_write_fd = os.pipe()
+        stdout_read_fd, stdout_write_fd = os.pipe()
+        stderr_file = tempfile.TemporaryFile()
+
+        try:
+            baseline_rss = self.resident_size()
+            started_at = time.perf_counter()
+            pid = self.spawn(argv, stdin_read_fd, stdout_write_fd, stderr_file.fileno())
+        except BaseException:
+            for fd in [stdin_read_fd, stdin_write_fd, stdout_read_fd, stdout_write_fd]:
+                os.close(fd)
+            stderr_file.close()
+            raise
+
+        os.close(stdin_read_fd)
+        os.close(stdout_write_fd)
+
+        try:
+            deadline = started_at + self.wall_limit()
+            output, output_size = self.communicate(pid, input_data, stdin_write_fd, stdout_read_fd, deadline)
+            killed, status, rusage = self.wait(pid, max(0.0, deadline - time.perf_counter()))
+            wall_time = time.perf_counter() - started_at
+
+            stderr = self.read_stderr(stderr_file)
+        finally:
+            stderr_file.close()
+
+        result = self.make_result(wall_time, killed, status, rusage, baseline_rss, output_size, stderr)
+        result['output'] = output
+
+        return result
+
+    def communicate(self, pid, input_data, stdin_fd, stdout_fd, deadline):
+        view = memoryview(input_data)
+        position = 0
+
+        chunks = []
+        output_size = 0
+        is_over = False
+
+        os.set_blocking(stdin_fd, False)
+
+        poller = select.poll()
+        poller.register(stdout_fd, select.POLLIN)
+        if len(view) > 0:
+            poller.register(stdin_fd, select.POLLOUT)
+        else:
+            os.close(stdin_fd)
+            stdin_fd = None
+
+        try:
+            while stdout_fd is not None:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+
+                for fd, event in poller.poll(remaining * 1000):
+                    if fd == stdout_fd:
+                        chunk = os.read(stdout_fd, PIPE_CHUNK_SIZE)
+                        if not chunk:
+                            poller.unregister(stdout_fd)
+                            os.close(stdout_fd)
+                            stdout_fd = None
+                            continue
+
+                        output_size += len(chunk)
+                        if output_size > self.output_limit:
+                            is_over = True
+                            self.kill_group(pid)
+                            break
+                        chunks.append(chunk)
+
+                    elif fd == stdin_fd:
+                        try:
+                            if event & select.POLLOUT:
+                                position += os.write(stdin_fd, view[position:position + PIPE_CHUNK_SIZE])
+                            is_done = position >= len(view) or not event & select.POLLOUT
+                        except BrokenPipeError:
+                            # the program stopped reading its input
+                            is_done = True
+
+                        if is_done:
+                            poller.unregister(stdin_fd)
+                            os.close(stdin_fd)
+                            stdin_fd = None
+
+                if is_over:
+                    break
+        finally:
+            for fd in [stdin_fd, stdout_fd]:
+                if fd is not None:
+                    os.close(fd)
+            view.release()
+
+        # output_size counts the bytes dropped past the limit as well
+        return (b''.join(chunks), output_size)
+
+    def read_stderr(self, stderr_file):
+        stderr_file.seek(0)
+        return stderr_file.read(STDERR_LIMIT)
+
+    def make_result(self, wall_time, killed, status, rusage, baseline_rss, output_size, stderr):
+        result = {
+            'wall_time': wall_time,
+            'cpu_time': rusage.ru_utime + rusage.ru_stime,
+            'max_rss': rusage.ru_maxrss * 1024,
+            'baseline_rss': baseline_rss,
+            'output_size': output_size,
+            'exit_code': os.WEXITSTATUS(status) if os.WIFEXITED(status) else None,
+            'signal': os.WTERMSIG(status) if os.WIFSIGNALED(status) else None,
+            'killed': killed,
+            'stderr': stderr.decode('utf-8', 'replace')
+        }
+        result['status'] = self.verdict(result)
+
+        return result
+
+    # the editor host runs many threads, and a forked copy of it may hang on
+    # a lock held by one of them before it gets to exec; posix_spawn runs
+    # no python in the child, and the limits are set on it from outside
+    def spawn(self, argv, input_fd, output_fd, stderr_fd, target=None):
+        if target is not None:
+            return self.fork(input_fd, output_fd, stderr_fd, target)
+
+        pid = os.posix_spawn(argv[0], argv, os.environ,
+                             file_actions=[(os.POSIX_SPAWN_DUP2, input_fd, 0),
+                                           (os.POSIX_SPAWN_DUP2, output_fd, 1),
+                                           (os.POSIX_SPAWN_DUP2, stderr_fd, 2)],
+                             setpgroup=0,
+                             # python ignores these, and ignored signals survive exec
+                             setsigdef=(signal.SIGPIPE, signal.SIGXFSZ))
+
+        # the program starts a few microseconds before its limits; cpu time
+        # used until then still counts against RLIMIT_CPU
+        for limit, value in self.limits():
+            try:
+                resource.prlimit(pid, limit, value)
+            except (ProcessLookupError, AttributeError):
+                pass
+
+        self.register(pid)
+        return pid
+
+    def limits(self):
+        limits = [
+            (resource.RLIMIT_CPU, (self.cpu_limit(), self.cpu_limit() + 1)),
+            (resource.RLIMIT_FSIZE, (self.output_limit,) * 2),
+            (resource.RLIMIT_CORE, (0, 0))
+        ]
+
+        if self.limit_address_space:
+            limits.append((resource.RLIMIT_AS, (self.address_space_limit(),) * 2))
+
+        return limits
+
+    # the fork server (fork_server.py) is single threaded, so it may fork a
+    # warm interpreter and run the solution in it without exec
+    def fork(self, input_fd, output_fd, stderr_fd, target):
+        pid = os.fork()
+        if pid != 0:
+            # both sides set the group, so it exists before register() can
+            # signal it
+            try:
+                os.setpgid(pid, pid)
+            except OSError:
+                pass
+
+            self.register(pid)
+            return pid
+
+        try:
+            os.setpgid(0, 0)
+
+            os.dup2(input_fd, 0)
+            os.dup2(output_fd, 1)
+            os.dup2(stderr_fd, 2)
+
+            signal.signal(signal.SIGPIPE, signal.SIG_DFL)
+            signal.signal(signal.SIGXFSZ, signal.SIG_DFL)
+
+            for limit, value in self.limits():
+                resource.setrlimit(limit, value)
+
+            os._exit(target())
+        except BaseException as exception:
+            os.write(2, ('fork failed: %s\n' % exception).encode('utf-8'))
+        finally:
+            os._exit(127)
+
+    def wait(self, pid, timeout):
+        try:
+            pidfd = os.pidfd_open(pid)
+        except (AttributeError, OSError):
+            return self.wait_with_timer(pid, timeout)
+
+        try:
+            # the pidfd turns readable when the program exits, so the wall
+            # clock limit needs no extra thread
+            poller = select.poll()
+            poller.register(pidfd, select.POLLIN)
+            killed = not poller.poll(timeout * 1000)
+        finally:
+            os.close(pidfd)
+
+        return self.reap(pid, killed)
+
+    def wait_with_timer(self, pid, timeout):
+        lock = threading.Lock()
+        state = {'done': False, 'killed': False}
+
+        def kill():
+            with lock:
+                if not state['done']:
+                    state['killed'] = True
+                    self.kill_group(pid)
+
+        timer = threading.Timer(timeout, kill)
+        timer.daemon = True
+        timer.start()
+
+        # without waitid (some pypy builds) the child is reaped directly
+        if not hasattr(os, 'waitid'):
+            _, status, rusage = os.wait4(pid, 0)
+            self.unregister(pid)
+            with lock:
+                state['done'] = True
+            timer.cancel()
+            return (state['killed'], status, rusage)
+
+        try:
+            # wait without reaping, so the pid (and the process group) can
+            # not be reused while the timer signals it
+            os.waitid(os.P_PID, pid, os.WEXITED | os.WNOWAIT)
+            with lock:
+                state['done'] = True
+            timer.cancel()
+        finally:
+            result = self.reap(pid, False)
+
+        return (state['killed'],) + result[1:]
+
+    def reap(self, pid, killed):
+        # the group leader is not reaped yet, so its pgid is still ours;
+        # this kills it on timeout and children it left behind otherwise
+        self.unregister(pid)
+        self.kill_group(pid)
+
+        _, status, rusage = os.wait4(pid, 0)
+        return (killed, status, rusage)
+
+    # linux folds the peak rss of the forked copy of this process into the
+    # child's ru_maxrss at exec, so a peak below this size is not measurable
+    def resident_size(self):
+        try:
+            with open('/proc/self/statm', mode='r') as f:
+                return int(f.read().split()[1]) * resource.getpagesize()
+        except (OSError, ValueError, IndexError):
+            return 0
+
+    def is_rss_measured(self, result):
+        return result['max_rss'] > result['baseline_rss'] * 1.05
+
+    def register(self, pid):
+        with self.lock:
+            self.running.add(pid)
+            if self.is_cancelled:
+                self.kill_group(pid)
+
+    # called before the group leader is reaped, so cancel() never signals
+    # a pgid that may have been reused
+    def unregister(self, pid):
+        with self.lock:
+            self.running.discard(pid)
+
+    # kills every program started by this executor and any started later;
+    # a watch drops a run this way when a newer save arrives
+    def cancel(self):
+        with self.lock:
+            self.is_cancelled = True
+            for pid in self.running:
+                self.kill_group(pid)
+
+    def kill_group(self, pid):
+        try:
+            os.killpg(pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+    def verdict(self, result):
+        if result['max_rss'] > self.memory_limit:
+            return 'MLE'
+        if result['killed'] or result['signal'] == signal.SIGXCPU:
+            return 'TLE'
+        if result['cpu_time'] > self.time_limit:
+            return 'TLE'
+        if result['signal'] == signal.SIGXFSZ or result['output_size'] > self.output_limit:
+            return 'OLE'
+
+        if result['signal'] is not None or result['exit_code'] != 0:
+            stderr = result['stderr'].encode('utf-8')
+            if any(message in stderr for message in OUT_OF_MEMORY_MESSAGES):
+                return 'MLE'
+            return 'RE'
+
+        return 'OK'
+
+    def describe(self, result):
+        if result['signal'] is not None:
+            try:
+                return signal.Signals(result['signal']).name
+            except ValueError:
+                return 'signal %d' % result['signal']
+
+        if result['exit_code']:
+            return 'exit %d' % result['exit_code']
+
+        return ''
@@ -0,0 +1,101 @@
+# coding: utf-8
+
+# Runs inside the interpreter that judges python solutions (python3, pypy3,
+# ...).  It preloads the usual modules once, then forks a child per request
+# that runs the solution with runpy, so neither interpreter startup nor
+# these imports are paid per case or counted against the solution.
+#
+# protocol: one json request per line on stdin, one json result per line
+# on stdout.
+
+import os
+import sys
+import json
+import runpy
+import traceback
+import importlib
+
+from executor import Executor
+
+PRELOAD_MODULES = [
+    'math', 'itertools', 'collections', 'heapq', 'bisect', 'functools',
+    're', 'string', 'random', 'decimal', 'fractions', 'copy', 'operator',
+    'typing', 'array', 'statistics', 'numpy', 'sortedcontainers',
+]
+
+
+def preload():
+    for name in PRELOAD_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+
+
+def run_solution(source_path):
+    sys.argv = [source_path]
+    sys.stdin = open(0, mode='r', closefd=False)
+    sys.stdout = open(1, mode='w', closefd=False)
+    sys.stderr = open(2, mode='w', closefd=False)
+
+    code = 0
+    try:
+        runpy.run_path(source_path, run_name='__main__')
+    except SystemExit as exception:
+        if isinstance(exception.code, int):
+            code = exception.code
+        elif exception.code is not None:
+            print(exception.code, file=sys.stderr)
+            code = 1
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+
+    try:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    except BaseException:
+        code = code or 1
+
+    return code
+
+
+def serve(request):
+    executor = Executor(time_limit=request['time_limit'],
+                       memory_limit=request['memory_limit'],
+                       output_limit=request['output_limit'])
+
+    source_path = request['source_path']
+    result = executor.execute([sys.executable, source_path],
+                              request['input_path'], request['output_path'],
+                              target=lambda: run_solution(source_path))
+    return result
+
+
+def main():
+    # the control channel moves off fds 0/1, which belong to the solutions
+    control_in = os.fdopen(os.dup(0), mode='rb')
+    control_out = os.fdopen(os.dup(1), mode='wb')
+
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    os.close(devnull)
+
+    preload()
+
+    control_out.write(b'{"ready": true}\n')
+    control_out.flush()
+
+    for line in control_in:
+        try:
+            result = serve(json.loads(line.decode('utf-8')))
+        except Exception as exception:
+            result = {'error': '%s: %s' % (type(exception).__name__, exception)}
+
+        control_out.write(json.dumps(result).encode('utf-8') + b'\n')
+        control_out.flush()
+
+
+if __name__ == '__main__':
+    main()
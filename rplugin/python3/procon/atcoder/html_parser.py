@@ -0,0 +1,158 @@
+# coding: utf-8
+
+import re
+import codecs
+import html.parser
+
+CHUNK_SIZE = 1 << 16
+
+TIME_PATTERN = re.compile(r'(\d\d\d\d-\d\d-\d\d \d\d:\d\d:\d\d)')
+CONTEST_HREF_PATTERN = re.compile(r'^/contests/([^/?#]+)$')
+ARCHIVE_HREF_PATTERN = re.compile(r'^/contests/archive\?(?:.*&)?page=(\d+)')
+TASK_HREF_PATTERN = re.compile(r'^/contests/([^/?#]+)/tasks/([^/?#]+)$')
+SAMPLE_PATTERN = re.compile(r'(Sample Input|Sample Output|入力例|出力例)\s*([0-9]+)')
+SCORE_PATTERN = re.compile(r'配点.*?(\d+)', re.DOTALL)
+
+SAMPLE_KEYS = {
+    'Sample Input': 'input',
+    'Sample Output': 'output',
+    '入力例': 'input',
+    '出力例': 'output',
+}
+
+
+# ==============================================================================
+#
+# AtCoderHTMLParser
+#
+# ==============================================================================
+class AtCoderHTMLParser(html.parser.HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+
+        self.contests = []
+        self.tasks = {}
+        self.sample_cases = {}
+        self.score = None
+        self.last_page = 0
+
+        self.pending_time = None
+        self.pending_sample = None
+
+        # (kind, payload) of the element whose text is being collected
+        self.capture = None
+        self.texts = []
+
+        # the text since the last tag; a streamed page hands it over in pieces
+        self.text_run = ''
+
+    def start_capture(self, kind, payload=None):
+        self.capture = (kind, payload)
+        self.texts = []
+
+    def finish_capture(self):
+        text = ''.join(self.texts)
+        self.capture = None
+        self.texts = []
+        return text
+
+    def handle_starttag(self, tag, attrs):
+        self.text_run = ''
+
+        if self.capture and self.capture[0] == 'pre':
+            return
+
+        if tag == 'a':
+            href = dict(attrs).get('href') or ''
+
+            matched = TASK_HREF_PATTERN.match(href)
+            if matched:
+                self.start_capture('task', matched.group(2))
+                return
+
+            matched = ARCHIVE_HREF_PATTERN.match(href)
+            if matched:
+                self.last_page = max(self.last_page, int(matched.group(1)))
+                return
+
+            matched = CONTEST_HREF_PATTERN.match(href)
+            if matched and self.pending_time:
+                self.start_capture('contest', matched.group(1))
+                return
+
+        elif tag == 'h3':
+            self.start_capture('h3')
+
+        elif tag == 'pre' and self.pending_sample:
+            self.start_capture('pre', self.pending_sample)
+            self.pending_sample = None
+
+        elif tag == 'p' and self.score is None and not self.capture:
+            self.start_capture('p')
+
+    def handle_endtag(self, tag):
+        self.text_run = ''
+
+        if not self.capture:
+            return
+
+        kind, payload = self.capture
+
+        if tag == 'a' and kind == 'task':
+            self.tasks[payload] = self.finish_capture().strip()
+
+        elif tag == 'a' and kind == 'contest':
+            self.contests.append({
+                'time': self.pending_time,
+                'key': payload,
+                'name': self.finish_capture().strip()
+                })
+            self.pending_time = None
+
+        elif tag == 'h3' and kind == 'h3':
+            matched = SAMPLE_PATTERN.search(self.finish_capture())
+            if matched:
+                key = SAMPLE_KEYS[matched.group(1)]
+                self.pending_sample = (key, int(matched.group(2)))
+
+        elif tag == 'pre' and kind == 'pre':
+            key, index = payload
+            data = self.finish_capture().replace("\r", '').strip("\n")
+
+            if index not in self.sample_cases:
+                self.sample_cases[index] = {'index': index}
+            self.sample_cases[index][key] = data
+
+        elif tag == 'p' and kind == 'p':
+            matched = SCORE_PATTERN.search(self.finish_capture())
+            if matched:
+                self.score = int(matched.group(1))
+
+    def handle_data(self, data):
+        if self.capture:
+            self.texts.append(data)
+            if self.capture[0] in ['contest', 'task', 'pre']:
+                return
+
+        self.text_run += data
+        matched = TIME_PATTERN.search(self.text_run)
+        if matched:
+            self.pending_time = matched.group(1)
+
+    def feed_stream(self, stream, chunk_size=CHUNK_SIZE):
+        decoder = codecs.getincrementaldecoder('utf-8')('replace')
+
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            self.feed(decoder.decode(chunk))
+
+        self.feed(decoder.decode(b'', final=True))
+        self.close()
+        return self
+
+    def feed_text(self, body):
+        self.feed(body)
+        self.close()
+        return self
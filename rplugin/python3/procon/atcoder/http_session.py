@@ -0,0 +1,259 @@
+# coding: utf-8
+
+import io
+import os
+import ssl
+import time
+import zlib
+import threading
+import collections
+
+import http.client
+import http.cookiejar
+import urllib.parse
+import urllib.request
+
+MAX_REDIRECTS = 5
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+USER_AGENT = 'procon.nvim'
+
+RETRYABLE_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.CannotSendRequest,
+    http.client.BadStatusLine,
+    ConnectionResetError,
+    BrokenPipeError,
+)
+
+# a request that may have reached the server is only sent again when
+# repeating it is harmless; a submission must never go out twice
+IDEMPOTENT_METHODS = ('GET', 'HEAD')
+
+
+# ==============================================================================
+#
+# Response
+#
+# ==============================================================================
+class Response(object):
+    def __init__(self, url, status, reason, headers, body, stats):
+        self.url = url
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.stats = stats
+
+        self.body = io.BytesIO(body)
+
+    def read(self, size=-1):
+        return self.body.read(size)
+
+    def info(self):
+        return self.headers
+
+    def getcode(self):
+        return self.status
+
+    def summary(self):
+        return '%d %.1fKiB %.2fs%s' % (
+                self.status,
+                self.stats['bytes'] / 1024.0,
+                self.stats['elapsed_time'],
+                '' if self.stats['reused'] else ' new')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.body.close()
+
+
+# ==============================================================================
+#
+# ConnectionPool
+#
+# ==============================================================================
+class ConnectionPool(object):
+    def __init__(self, timeout=30):
+        self.timeout = timeout
+        self.idle_connections = collections.defaultdict(list)
+        self.lock = threading.Lock()
+        self.ssl_context = ssl.create_default_context()
+
+    def acquire(self, scheme, netloc):
+        with self.lock:
+            connections = self.idle_connections[(scheme, netloc)]
+            if connections:
+                return connections.pop(), True
+
+        return self.connect(scheme, netloc), False
+
+    def connect(self, scheme, netloc):
+        if scheme == 'https':
+            return http.client.HTTPSConnection(
+                    netloc, timeout=self.timeout, context=self.ssl_context)
+
+        return http.client.HTTPConnection(netloc, timeout=self.timeout)
+
+    def release(self, scheme, netloc, connection):
+        with self.lock:
+            self.idle_connections[(scheme, netloc)].append(connection)
+
+    def close(self):
+        with self.lock:
+            for connections in self.idle_connections.values():
+                for connection in connections:
+                    connection.close()
+            self.idle_connections.clear()
+
+
+# ==============================================================================
+#
+# Session
+#
+# ==============================================================================
+class Session(object):
+    def __init__(self, cookie_jar=None, timeout=30):
+        self.pool = ConnectionPool(timeout)
+        self.cookie_jar = cookie_jar if cookie_jar is not None else http.cookiejar.CookieJar()
+
+        self.lock = threading.Lock()
+        self.history = collections.deque(maxlen=256)
+        self.request_count = 0
+        self.total_bytes = 0
+        self.total_elapsed_time = 0.0
+
+    def close(self):
+        self.pool.close()
+
+    # a file backed jar (see load_cookie_jar) keeps the login across runs
+    def save_cookies(self):
+        filename = getattr(self.cookie_jar, 'filename', None)
+        if not filename:
+            return
+
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        self.cookie_jar.save(ignore_discard=True)
+        os.chmod(filename, 0o600)
+
+    def request(self, url, method='GET', body=None, headers={}, follow_redirects=True):
+        for _ in range(MAX_REDIRECTS + 1):
+            response = self.request_once(url, method, body, headers)
+
+            location = response.headers.get('Location')
+            if not follow_redirects or response.status not in REDIRECT_STATUSES or not location:
+                return response
+
+            url = urllib.parse.urljoin(url, location)
+            if response.status in (301, 302, 303):
+                method, body = 'GET', None
+
+        return response
+
+    def request_once(self, url, method, body, headers):
+        parts = urllib.parse.urlsplit(url)
+        path = parts.path if parts.path else '/'
+        path = '%s?%s' % (path, parts.query) if parts.query else path
+
+        # the cookie jar only speaks urllib.request.Request
+        cookie_request = urllib.request.Request(url, method=method)
+        self.cookie_jar.add_cookie_header(cookie_request)
+
+        request_headers = {
+            'User-Agent': USER_AGENT,
+            'Accept-Encoding': 'gzip, deflate',
+            'Connection': 'keep-alive'
+        }
+        request_headers.update(headers)
+        request_headers.update(cookie_request.unredirected_hdrs)
+
+        started_at = time.time()
+        connection, reused = self.pool.acquire(parts.scheme, parts.netloc)
+
+        state = {'sent': False}
+
+        def exchange(connection):
+            state['sent'] = False
+            connection.request(method, path, body=body, headers=request_headers)
+            state['sent'] = True
+
+            res = connection.getresponse()
+            return res, res.read()
+
+        try:
+            try:
+                res, raw_body = exchange(connection)
+            except RETRYABLE_ERRORS:
+                if not reused or (state['sent'] and method.upper() not in IDEMPOTENT_METHODS):
+                    raise
+
+                # the server dropped an idle keep-alive connection, retry on a new one
+                connection.close()
+                connection = self.pool.connect(parts.scheme, parts.netloc)
+                reused = False
+                res, raw_body = exchange(connection)
+        except Exception:
+            connection.close()
+            raise
+
+        if res.will_close:
+            connection.close()
+        else:
+            self.pool.release(parts.scheme, parts.netloc, connection)
+
+        self.cookie_jar.extract_cookies(res, cookie_request)
+        body = self.decode(raw_body, res.getheader('Content-Encoding', ''))
+
+        stats = {
+            'url': url,
+            'status': res.status,
+            'bytes': len(raw_body),
+            'decoded_bytes': len(body),
+            'elapsed_time': time.time() - started_at,
+            'reused': reused
+        }
+        self.record(stats)
+
+        return Response(url, res.status, res.reason, res.msg, body, stats)
+
+    def decode(self, raw_body, encoding):
+        encoding = encoding.strip().lower()
+
+        if encoding == 'gzip':
+            return zlib.decompress(raw_body, 16 + zlib.MAX_WBITS)
+
+        if encoding == 'deflate':
+            try:
+                return zlib.decompress(raw_body)
+            except zlib.error:
+                # some servers send a raw deflate stream without zlib header
+                return zlib.decompress(raw_body, -zlib.MAX_WBITS)
+
+        return raw_body
+
+    def record(self, stats):
+        with self.lock:
+            self.history.append(stats)
+            self.request_count += 1
+            self.total_bytes += stats['bytes']
+            self.total_elapsed_time += stats['elapsed_time']
+
+    def summary(self):
+        with self.lock:
+            return {
+                'request_count': self.request_count,
+                'total_bytes': self.total_bytes,
+                'total_elapsed_time': self.total_elapsed_time
+            }
+
+
+def load_cookie_jar(path):
+    cookie_jar = http.cookiejar.LWPCookieJar(path)
+
+    if os.path.exists(path):
+        try:
+            cookie_jar.load(ignore_discard=True)
+        except (OSError, http.cookiejar.LoadError) as exception:
+            print(exception)
+
+    return cookie_jar
@@ -0,0 +1,162 @@
+# coding: utf-8
+
+import os
+import json
+import queue
+import atexit
+import threading
+import subprocess
+
+FORK_SERVER_PATH = '%s/fork_server.py' % os.path.dirname(os.path.abspath(__file__))
+
+
+# ==============================================================================
+#
+# ForkServer
+#
+# ==============================================================================
+class ForkServer(object):
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+        self.process = None
+        self.is_ready = False
+
+    def start(self):
+        self.process = subprocess.Popen(
+                [self.interpreter, FORK_SERVER_PATH],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        return self
+
+    def wait_ready(self):
+        if not self.is_ready:
+            self.read()
+            self.is_ready = True
+
+    def read(self):
+        line = self.process.stdout.readline()
+        if not line:
+            raise EOFError('fork server (%s) exited' % self.interpreter)
+        return json.loads(line.decode('utf-8'))
+
+    def request(self, params):
+        self.wait_ready()
+
+        self.process.stdin.write(json.dumps(params).encode('utf-8') + b'\n')
+        self.process.stdin.flush()
+
+        result = self.read()
+        if 'error' in result:
+            raise Exception(result['error'])
+
+        return result
+
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def close(self):
+        if self.process is None:
+            return
+
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=1)
+        except Exception:
+            self.process.kill()
+            self.process.wait()
+
+        self.process = None
+
+
+# ==============================================================================
+#
+# InterpreterPool
+#
+# ==============================================================================
+class InterpreterPool(object):
+    def __init__(self, interpreter, size=1):
+        self.interpreter = interpreter
+        self.size = size
+
+        self.lock = threading.Lock()
+        self.servers = []
+        self.idle = queue.Queue()
+
+    def start(self):
+        with self.lock:
+            while len(self.servers) < self.size:
+                server = ForkServer(self.interpreter).start()
+                self.servers.append(server)
+                self.idle.put(server)
+
+        return self
+
+    def resize(self, size):
+        self.size = max(self.size, size)
+
+    def acquire(self):
+        self.start()
+        server = self.idle.get()
+
+        if not server.is_alive():
+            server.close()
+            server.is_ready = False
+            server.start()
+
+        return server
+
+    def release(self, server):
+        self.idle.put(server)
+
+    def execute(self, executor, source_path, input_path, output_path):
+        params = {
+            'source_path': source_path,
+            'input_path': input_path,
+            'output_path': output_path,
+            'time_limit': executor.time_limit,
+            'memory_limit': executor.memory_limit,
+            'output_limit': executor.output_limit
+        }
+
+        server = self.acquire()
+        try:
+            try:
+                return server.request(params)
+            except (EOFError, BrokenPipeError):
+                # the server died (e.g. killed from outside); one retry
+                server.close()
+                server.is_ready = False
+                server.start()
+                return server.request(params)
+        finally:
+            self.release(server)
+
+    def close(self):
+        with self.lock:
+            for server in self.servers:
+                server.close()
+            self.servers = []
+            self.idle = queue.Queue()
+
+
+POOLS = {}
+POOLS_LOCK = threading.Lock()
+
+
+# pools outlive a single :ProTest inside the editor, so the interpreters
+# stay warm between runs
+def get_pool(interpreter, size=1):
+    with POOLS_LOCK:
+        if interpreter not in POOLS:
+            POOLS[interpreter] = InterpreterPool(interpreter, size)
+        POOLS[interpreter].resize(size)
+        return POOLS[interpreter]
+
+
+def close_pools():
+    with POOLS_LOCK:
+        for pool in POOLS.values():
+            pool.close()
+        POOLS.clear()
+
+
+atexit.register(close_pools)
@@ -6,18 +6,10 @@ import os
 
 from atcoder import AtCoder
 
-if __name__ == '__main__':
-    if len(sys.argv) <= 1:
-        raise Exception('please, input contest_root to args!')
+import tracing
 
-    contest_root = sys.argv[1]
-    contest_key = os.path.basename(contest_root)
-
-    print(contest_root)
-
-    root_dir = os.path.dirname(contest_root)
-    atcoder = AtCoder(root_dir)
 
+def join_contest(atcoder, contest_key):
     contest = atcoder.find_or_create_contest(contest_key)
 
     if contest:
@@ -30,3 +22,20 @@ if __name__ == '__main__':
             traceback.print_exc()
 
     print('Done')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) <= 1:
+        raise Exception('please, input contest_root to args!')
+
+    contest_root = sys.argv[1]
+    contest_key = os.path.basename(contest_root)
+
+    print(contest_root)
+
+    root_dir = os.path.dirname(contest_root)
+    atcoder = AtCoder(root_dir)
+
+    join_contest(atcoder, contest_key)
+
+    tracing.finish('join_contest')
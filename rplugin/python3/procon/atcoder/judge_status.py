@@ -0,0 +1,228 @@
+# coding: utf-8
+
+import traceback
+import threading
+import time
+
+from tracing import span
+
+WAITING_STATUSES = ['WJ', 'WR', '']
+
+# fast while the submission waits in the queue, slower while its cases
+# are judged; the judge's own suggestion is a lower bound
+WAITING_INTERVAL = 1.0
+JUDGING_INTERVAL = 1.5
+JUDGING_BACKOFF = 1.5
+MAX_INTERVAL = 5.0
+ERROR_INTERVAL = 5.0
+
+# a poll failing this many times in a row (logged out, offline, a changed
+# page) will not recover by itself
+MAX_ERRORS = 5
+
+# submissions of a contest due this close together share one request
+COALESCE_WINDOW = 1.0
+
+TRACK_TIMEOUT = 20 * 60
+
+
+def is_judging(status):
+    return '/' in status
+
+
+def is_finished(status):
+    return status not in WAITING_STATUSES and not is_judging(status)
+
+
+def format_status(entry):
+    text = entry['status'] or 'WJ'
+
+    if entry['time'] is not None:
+        text += ' %d ms' % entry['time']
+    if entry['memory'] is not None:
+        text += ' %d KB' % entry['memory']
+    if is_finished(entry['status']) and entry['score'] is not None:
+        text += ' (score %s)' % entry['score']
+
+    return text
+
+
+# ==============================================================================
+#
+# StatusTracker
+#
+# ==============================================================================
+class StatusTracker(object):
+    def __init__(self, api):
+        self.api = api
+
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.is_running = False
+
+    def add(self, contest_key, task_screen_name, submission_id):
+        now = time.time()
+
+        with self.lock:
+            self.pending[submission_id] = {
+                'id': submission_id,
+                'contest_key': contest_key,
+                'task': task_screen_name,
+                'status': None,
+                'time': None,
+                'memory': None,
+                'score': None,
+                'errors': 0,
+                'interval': WAITING_INTERVAL,
+                'next_poll_at': now,
+                'started_at': now
+            }
+
+        print('track: %s #%d' % (task_screen_name, submission_id), flush=True)
+
+    # the first caller polls for everyone; submissions added while it runs
+    # join the same loop, so one session serves all of them
+    def run(self):
+        with self.lock:
+            if self.is_running:
+                return False
+            self.is_running = True
+
+        try:
+            while self.step():
+                pass
+        except BaseException:
+            with self.lock:
+                self.is_running = False
+            raise
+
+        return True
+
+    # the loop stops under the same lock add() takes, so a submission is
+    # never left behind by a loop that is just exiting
+    def step(self):
+        with self.lock:
+            if not self.pending:
+                self.is_running = False
+                return False
+
+            now = time.time()
+            entries = list(self.pending.values())
+            wait = min(entry['next_poll_at'] for entry in entries) - now
+
+        if wait > 0:
+            time.sleep(wait)
+            return True
+
+        due_contests = set(entry['contest_key'] for entry in entries if entry['next_poll_at'] <= now)
+
+        contests = {}
+        for entry in entries:
+            if entry['contest_key'] in due_contests and entry['next_poll_at'] <= now + COALESCE_WINDOW:
+                contests.setdefault(entry['contest_key'], []).append(entry)
+
+        for contest_key, entries in contests.items():
+            with span('judge.poll', {'contest': contest_key, 'count': len(entries)}):
+                self.poll(contest_key, entries)
+
+        return True
+
+    def poll(self, contest_key, entries):
+        now = time.time()
+
+        try:
+            ids = [entry['id'] for entry in entries]
+            statuses, suggested = self.api.get_submission_statuses(contest_key, ids)
+        except Exception as exception:
+            print(exception)
+            traceback.print_exc()
+
+            for entry in entries:
+                entry['errors'] += 1
+                if entry['errors'] >= MAX_ERRORS:
+                    print('track: %s #%d gave up after %d failed polls' % (entry['task'], entry['id'], entry['errors']))
+                    self.finish(entry)
+                elif not self.give_up_on_timeout(entry, now):
+                    entry['next_poll_at'] = now + ERROR_INTERVAL
+            return
+
+        for entry in entries:
+            entry['errors'] = 0
+
+            status = statuses.get(entry['id'])
+            if status:
+                self.update(entry, status)
+
+            if status and is_finished(status['status']):
+                self.finish(entry)
+            elif not self.give_up_on_timeout(entry, now):
+                entry['interval'] = self.next_interval(entry, suggested)
+                entry['next_poll_at'] = now + entry['interval']
+
+    def give_up_on_timeout(self, entry, now):
+        if now - entry['started_at'] <= TRACK_TIMEOUT:
+            return False
+
+        print('track: %s #%d gave up after %ds' % (entry['task'], entry['id'], TRACK_TIMEOUT))
+        self.finish(entry)
+        return True
+
+    def update(self, entry, status):
+        keys = ['status', 'time', 'memory', 'score']
+        if all(entry[key] == status[key] for key in keys):
+            return
+
+        for key in keys:
+            entry[key] = status[key]
+
+        elapsed_time = time.time() - entry['started_at']
+        print('%s #%d: %s ... %.1fs' % (entry['task'], entry['id'], format_status(entry), elapsed_time), flush=True)
+
+    def next_interval(self, entry, suggested):
+        if is_judging(entry['status'] or ''):
+            if entry['interval'] < JUDGING_INTERVAL:
+                interval = JUDGING_INTERVAL
+            else:
+                interval = min(entry['interval'] * JUDGING_BACKOFF, MAX_INTERVAL)
+        else:
+            interval = WAITING_INTERVAL
+
+        return max(interval, suggested or 0.0)
+
+    def finish(self, entry):
+        with self.lock:
+            self.pending.pop(entry['id'], None)
+
+
+TRACKERS = {}
+TRACKERS_LOCK = threading.Lock()
+
+
+# one tracker per model, so every submission shares its session and the
+# api's rate limiter caps all polls together
+def get_tracker(atcoder):
+    with TRACKERS_LOCK:
+        key = atcoder.root_dir()
+        if key not in TRACKERS:
+            TRACKERS[key] = StatusTracker(atcoder.api)
+        return TRACKERS[key]
+
+
+def track(atcoder, contest_key, task_screen_name, submission_id=None):
+    tracker = get_tracker(atcoder)
+
+    try:
+        if submission_id is None:
+            submission_id = atcoder.api.get_latest_submission_id(contest_key, task_screen_name)
+    except Exception as exception:
+        print(exception)
+        traceback.print_exc()
+
+    if submission_id is None:
+        print('track: no submission found for %s' % task_screen_name)
+        return
+
+    tracker.add(contest_key, task_screen_name, submission_id)
+
+    if not tracker.run():
+        print('track: joined the running tracker')
@@ -0,0 +1,197 @@
+# coding: utf-8
+
+import os
+import time
+import shutil
+import hashlib
+import subprocess
+
+from compile_cache import CompileCache, CompileError
+from interpreter_pool import get_pool
+
+DEFAULT_PYTHON = 'python3'
+
+# compiled by the selected interpreter itself, so pypy or another python
+# version judges the syntax; nothing is written next to the source
+SYNTAX_CHECK = '''import sys, traceback
+path = sys.argv[1]
+try:
+    compile(open(path, 'rb').read(), path, 'exec')
+except SyntaxError as exception:
+    sys.stderr.write(''.join(traceback.format_exception_only(type(exception), exception)))
+    sys.exit(1)
+'''
+
+
+# ==============================================================================
+#
+# Language
+#
+# ==============================================================================
+class Language(object):
+    name = None
+    extensions = []
+    language_id = None
+
+    def __init__(self, root_dir, options={}):
+        self.root_dir = root_dir
+        self.options = options
+
+    # the judge's id for this language; options override the default
+    def submit_language_id(self):
+        return self.options.get('language_id') or self.language_id
+
+    def build(self, source_path, binary_path):
+        raise NotImplementedError()
+
+    # argv of a fresh process, for callers that cannot use a warm pool
+    def command(self, source_path, binary_path):
+        return [binary_path]
+
+    def execute(self, executor, source_path, binary_path, input_path, output_path):
+        argv = self.command(source_path, binary_path)
+        return executor.execute(argv, input_path, output_path)
+
+    # stops a build in flight; languages without a compiler have nothing to stop
+    def cancel(self):
+        pass
+
+
+# ==============================================================================
+#
+# compiled languages
+#
+# ==============================================================================
+class CppLanguage(Language):
+    name = 'C++'
+    extensions = ['cpp', 'cc', 'cxx']
+    language_id = 5001
+
+    def __init__(self, root_dir, options={}):
+        super().__init__(root_dir, options)
+        self.compile_cache = CompileCache('%s/.pch' % root_dir, flags=options.get('flags', []))
+
+    def build(self, source_path, binary_path):
+        return self.compile_cache.compile(source_path, binary_path)
+
+    def cancel(self):
+        self.compile_cache.cancel()
+
+
+class RustLanguage(Language):
+    name = 'Rust'
+    extensions = ['rs']
+    language_id = 5054
+
+    def __init__(self, root_dir, options={}):
+        super().__init__(root_dir, options)
+        flags = ['-O', '--edition=2021'] + options.get('rustflags', [])
+        self.compile_cache = CompileCache('%s/.pch' % root_dir, compiler='rustc', flags=flags)
+
+    def build(self, source_path, binary_path):
+        return self.compile_cache.compile(source_path, binary_path)
+
+    def cancel(self):
+        self.compile_cache.cancel()
+
+
+# ==============================================================================
+#
+# interpreted languages
+#
+# ==============================================================================
+class PythonLanguage(Language):
+    name = 'Python'
+    extensions = ['py']
+    language_id = 5055
+    pypy_language_id = 5078
+
+    def interpreter(self):
+        return self.options.get('python') or DEFAULT_PYTHON
+
+    def submit_language_id(self):
+        if self.options.get('language_id'):
+            return self.options['language_id']
+        if 'pypy' in os.path.basename(self.interpreter()):
+            return self.pypy_language_id
+        return self.language_id
+
+    def key_path(self, binary_path):
+        return '%s.key' % binary_path
+
+    def source_key(self, source_path):
+        sha = hashlib.sha256()
+        sha.update(self.interpreter().encode('utf-8'))
+        with open(source_path, mode='rb') as f:
+            sha.update(f.read())
+        return sha.hexdigest()
+
+    # there is nothing to build; a syntax check stands in for the compile
+    # step and starts the interpreter pool while the user reads the result
+    def build(self, source_path, binary_path):
+        started_at = time.time()
+        get_pool(self.interpreter(), self.options.get('jobs', 1)).start()
+
+        key = self.source_key(source_path)
+        key_path = self.key_path(binary_path)
+
+        if os.path.exists(key_path):
+            with open(key_path, mode='r') as f:
+                if f.read().strip() == key:
+                    return {'hit': True, 'pch': False, 'elapsed_time': 0.0}
+
+        self.check_syntax(source_path)
+
+        os.makedirs(os.path.dirname(key_path), exist_ok=True)
+        with open(key_path, mode='w') as f:
+            f.write(key)
+
+        elapsed_time = time.time() - started_at
+        return {'hit': False, 'pch': False, 'elapsed_time': elapsed_time}
+
+    def check_syntax(self, source_path):
+        command = self.command(source_path, None)
+
+        process = subprocess.run(command[:1] + ['-c', SYNTAX_CHECK] + command[1:],
+                                 stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if process.returncode != 0:
+            raise CompileError(process.returncode, command, output=process.stdout, stderr=process.stderr)
+
+    def command(self, source_path, binary_path):
+        interpreter = self.interpreter()
+        return [shutil.which(interpreter) or interpreter, source_path]
+
+    def execute(self, executor, source_path, binary_path, input_path, output_path):
+        pool = get_pool(self.interpreter(), self.options.get('jobs', 1))
+        return pool.execute(executor, source_path, input_path, output_path)
+
+
+# ==============================================================================
+#
+# registry
+#
+# ==============================================================================
+LANGUAGES = [CppLanguage, RustLanguage, PythonLanguage]
+
+
+def extension_of(source_path):
+    return os.path.splitext(source_path)[1][1:]
+
+
+def find_language(source_path):
+    extension = extension_of(source_path)
+    for language in LANGUAGES:
+        if extension in language.extensions:
+            return language
+    return None
+
+
+def create_language(source_path, root_dir, options={}):
+    language = find_language(source_path)
+    if language is None:
+        raise Exception('unsupported language: %s' % source_path)
+    return language(root_dir, options)
+
+
+def all_extensions():
+    return [extension for language in LANGUAGES for extension in language.extensions]
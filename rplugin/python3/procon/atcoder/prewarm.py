@@ -0,0 +1,160 @@
+# coding: utf-8
+
+import traceback
+import urllib.error
+import argparse
+import shlex
+import time
+import os
+
+from atcoder import AtCoder, Problem
+from languages import create_language
+from tracing import span
+
+import tracing
+
+# wake a little early; the first polls are cheap next to a late start
+LEAD_TIME = 2.0
+
+POLL_INTERVAL = 0.5
+POLL_BACKOFF = 1.5
+POLL_MAX_INTERVAL = 5.0
+POLL_TIMEOUT = 15 * 60
+
+COUNTDOWN_INTERVAL = 60
+
+# compiled when there is no template.cpp, so the compiler and the
+# precompiled header are warm either way
+WARMUP_SOURCE = '''#include <bits/stdc++.h>
+int main() {}
+'''
+
+
+# ==============================================================================
+#
+# Prewarm
+#
+# ==============================================================================
+class Prewarm(object):
+    def __init__(self, atcoder, contest_key, flags=[], lead_time=LEAD_TIME, timeout=POLL_TIMEOUT):
+        self.atcoder = atcoder
+        self.contest_key = contest_key
+        self.flags = flags
+        self.lead_time = lead_time
+        self.timeout = timeout
+
+    def execute(self):
+        contest = self.atcoder.find_or_create_contest(self.contest_key)
+        print(contest.inspect(), flush=True)
+
+        self.wait_until_start(contest)
+
+        with span('prewarm.poll'):
+            params_list = self.poll_tasks(contest)
+
+        if not params_list:
+            print('prewarm: tasks did not open within %ds' % self.timeout)
+            return None
+
+        opened_at = time.time()
+
+        with span('prewarm.fetch'):
+            contest.problems = Problem.create_problems_from_website(contest, params_list)
+            contest.save()
+
+        for problem in contest.problems:
+            print(problem.inspect())
+            problem.code.update()
+
+        with span('prewarm.compile'):
+            self.compile_template(contest)
+
+        print('prewarm: %d problems ready in %.1fs' % (
+            len(contest.problems), time.time() - opened_at))
+        return contest
+
+    def wait_until_start(self, contest):
+        start_time = contest.start_time()
+        if start_time is None:
+            print('prewarm: start time unknown, polling now')
+            return
+
+        print('prewarm: starts at %s' % contest.time(), flush=True)
+
+        while True:
+            remaining = start_time - self.lead_time - time.time()
+            if remaining <= 0:
+                return
+
+            if remaining > COUNTDOWN_INTERVAL:
+                print('prewarm: %dm %02ds to go' % divmod(int(remaining), 60), flush=True)
+
+            time.sleep(min(remaining, COUNTDOWN_INTERVAL))
+
+    # before the start the tasks page redirects or answers 404; it is read
+    # past the response cache so a closed page is never served again
+    def poll_tasks(self, contest):
+        api = contest.api()
+        deadline = time.time() + self.timeout
+        interval = POLL_INTERVAL
+
+        while time.time() < deadline:
+            try:
+                params_list = api.fetch_problem_params_list(contest.key(), use_cache=False)
+                if params_list:
+                    return params_list
+                print('prewarm: tasks not open yet', flush=True)
+            except urllib.error.HTTPError as exception:
+                print('prewarm: tasks not open yet (%d)' % exception.code, flush=True)
+            except Exception as exception:
+                print(exception)
+                traceback.print_exc()
+
+            time.sleep(interval)
+            interval = min(interval * POLL_BACKOFF, POLL_MAX_INTERVAL)
+
+        return []
+
+    def compile_template(self, contest):
+        root_dir = self.atcoder.root_dir()
+        source_path = '%s/template.cpp' % root_dir
+
+        if not os.path.exists(source_path):
+            source_path = '%s/warmup.cpp' % contest.tmp_dir()
+            os.makedirs(os.path.dirname(source_path), exist_ok=True)
+            with open(source_path, mode='w') as f:
+                f.write(WARMUP_SOURCE)
+
+        binary_path = '%s/template.out' % contest.tmp_dir()
+        language = create_language(source_path, root_dir, {'flags': self.flags})
+
+        try:
+            result = language.build(source_path, binary_path)
+            status = 'cache hit' if result['hit'] else 'cache miss'
+            status = status + ', pch' if result['pch'] else status
+            print('compile: {} ... {:.02f}s'.format(status, result['elapsed_time']))
+        except Exception as exception:
+            print(exception)
+            traceback.print_exc()
+
+
+def prewarm(atcoder, contest_key, flags=[]):
+    Prewarm(atcoder, contest_key, flags=flags).execute()
+    print('Done')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('contest_root')
+    parser.add_argument('--cxxflags', default='')
+    parser.add_argument('--timeout', type=int, default=POLL_TIMEOUT)
+    args = parser.parse_args()
+
+    contest_root = args.contest_root.rstrip('/')
+    contest_key = os.path.basename(contest_root)
+    root_dir = os.path.dirname(contest_root)
+
+    atcoder = AtCoder(root_dir).load()
+    Prewarm(atcoder, contest_key, flags=shlex.split(args.cxxflags), timeout=args.timeout).execute()
+
+    tracing.finish('prewarm')
@@ -0,0 +1,45 @@
+# coding: utf-8
+
+import time
+import threading
+
+
+# ==============================================================================
+#
+# RateLimiter
+#
+# ==============================================================================
+class RateLimiter(object):
+    def __init__(self, rate=1.0, burst=1):
+        self.rate = float(rate)
+        self.burst = max(1, burst)
+
+        self.tokens = float(self.burst)
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def refill(self, now):
+        elapsed_time = now - self.updated_at
+        self.tokens = min(self.burst, self.tokens + elapsed_time * self.rate)
+        self.updated_at = now
+
+    def try_acquire(self):
+        with self.lock:
+            self.refill(time.monotonic())
+
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return 0.0
+
+            return (1.0 - self.tokens) / self.rate
+
+    def acquire(self):
+        waited_time = 0.0
+
+        while True:
+            waiting_time = self.try_acquire()
+            if waiting_time <= 0.0:
+                return waited_time
+
+            time.sleep(waiting_time)
+            waited_time += waiting_time
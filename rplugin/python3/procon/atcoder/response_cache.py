@@ -0,0 +1,264 @@
+# coding: utf-8
+
+import traceback
+
+import os
+import re
+import json
+import time
+import fcntl
+import atexit
+import weakref
+import hashlib
+import threading
+import http.client
+import urllib.parse
+
+from http_session import Response
+
+# (path pattern, ttl in seconds). None never expires, unmatched urls are not
+# cached at all (e.g. the submit page, whose csrf token must be fresh).
+DEFAULT_TTL_RULES = [
+    (r'^/contests/[^/]+/tasks/[^/]+$', None),
+    (r'^/contests/[^/]+/tasks$', 24 * 60 * 60),
+    (r'^/contests/archive$', 60 * 60),
+    (r'^/contests/?$', 10 * 60),
+]
+
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+
+# stores of a fetch burst (a contest's task pages) share one index write
+FLUSH_DELAY = 1.0
+
+# a model is built per gather in the editor; the set does not keep the
+# caches of dropped models alive until exit
+CACHES = weakref.WeakSet()
+
+
+def flush_all():
+    for cache in list(CACHES):
+        cache.flush()
+
+
+atexit.register(flush_all)
+
+
+# ==============================================================================
+#
+# ResponseCache
+#
+# ==============================================================================
+class ResponseCache(object):
+    def __init__(self, cache_dir, ttl_rules=DEFAULT_TTL_RULES,
+                 max_size=DEFAULT_MAX_SIZE, offline=False):
+        self.cache_dir = cache_dir
+        self.ttl_rules = [(re.compile(pattern), ttl) for pattern, ttl in ttl_rules]
+        self.max_size = max_size
+        self.offline = offline
+
+        self.lock = threading.Lock()
+        self.entries = None
+        self.removed = set()
+        self.is_dirty = False
+        self.flush_timer = None
+
+        CACHES.add(self)
+
+    def index_path(self):
+        return '%s/index.json' % self.cache_dir
+
+    def lock_path(self):
+        return '%s/index.lock' % self.cache_dir
+
+    def body_path(self, key):
+        return '%s/%s/%s' % (self.cache_dir, key[0:2], key)
+
+    def key(self, url):
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+    def find_rule(self, url):
+        path = urllib.parse.urlsplit(url).path
+        for pattern, ttl in self.ttl_rules:
+            if pattern.match(path):
+                return (True, ttl)
+        return (False, 0)
+
+    def is_cacheable(self, url):
+        return self.find_rule(url)[0]
+
+    def load_entries(self):
+        if self.entries is None:
+            self.entries = self.read_index()
+        return self.entries
+
+    def read_index(self):
+        try:
+            if os.path.exists(self.index_path()):
+                with open(self.index_path(), mode='r') as f:
+                    return json.load(f)
+        except Exception as exception:
+            print(exception)
+            traceback.print_exc()
+
+        return {}
+
+    # the editor's engine and quickrun scripts share the index; what another
+    # process wrote since we read it is kept, the newer fetch of a url wins
+    def merge(self, entries):
+        merged = dict(entries)
+        for key in self.removed:
+            merged.pop(key, None)
+
+        for key, entry in self.entries.items():
+            other = merged.get(key)
+            if other is not None and other['fetched_at'] > entry['fetched_at']:
+                entry = other
+            if other is not None:
+                entry['accessed_at'] = max(entry['accessed_at'], other['accessed_at'])
+            merged[key] = entry
+
+        return merged
+
+    def schedule_flush(self):
+        with self.lock:
+            if self.flush_timer is not None:
+                return
+
+            self.flush_timer = threading.Timer(FLUSH_DELAY, self.flush)
+            self.flush_timer.daemon = True
+            self.flush_timer.start()
+
+    def flush(self):
+        with self.lock:
+            if self.flush_timer is not None:
+                self.flush_timer.cancel()
+                self.flush_timer = None
+
+            if not self.is_dirty:
+                return
+
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                with open(self.lock_path(), mode='a') as lock_file:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+                    entries = self.merge(self.read_index())
+                    tmp_path = '%s.%d.tmp' % (self.index_path(), os.getpid())
+                    with open(tmp_path, mode='w') as f:
+                        json.dump(entries, f)
+                    os.replace(tmp_path, self.index_path())
+
+                self.entries = entries
+                self.removed = set()
+                self.is_dirty = False
+            except Exception as exception:
+                print(exception)
+                traceback.print_exc()
+
+    def lookup(self, url):
+        with self.lock:
+            entry = self.load_entries().get(self.key(url))
+            if entry is None:
+                return None
+
+            if not os.path.exists(self.body_path(self.key(url))):
+                return None
+
+            entry['accessed_at'] = time.time()
+            self.is_dirty = True
+            entry = dict(entry)
+
+        self.schedule_flush()
+        return entry
+
+    def is_fresh(self, entry):
+        ttl = self.find_rule(entry['url'])[1]
+        if ttl is None:
+            return True
+        return time.time() - entry['fetched_at'] < ttl
+
+    def validators(self, entry):
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def response(self, entry):
+        with open(self.body_path(self.key(entry['url'])), mode='rb') as f:
+            body = f.read()
+
+        stats = {
+            'url': entry['url'],
+            'status': 200,
+            'bytes': 0,
+            'decoded_bytes': len(body),
+            'elapsed_time': 0.0,
+            'reused': True
+        }
+
+        headers = http.client.HTTPMessage()
+        return Response(entry['url'], 200, 'OK', headers, body, stats)
+
+    def store(self, url, headers, body):
+        key = self.key(url)
+        body_path = self.body_path(key)
+
+        try:
+            os.makedirs(os.path.dirname(body_path), exist_ok=True)
+            tmp_path = '%s.%d.tmp' % (body_path, os.getpid())
+            with open(tmp_path, mode='wb') as f:
+                f.write(body)
+            os.replace(tmp_path, body_path)
+        except Exception as exception:
+            print(exception)
+            traceback.print_exc()
+            return
+
+        now = time.time()
+        with self.lock:
+            self.load_entries()[key] = {
+                'url': url,
+                'etag': headers.get('ETag'),
+                'last_modified': headers.get('Last-Modified'),
+                'fetched_at': now,
+                'accessed_at': now,
+                'size': len(body)
+            }
+            self.is_dirty = True
+            self.evict()
+
+        self.schedule_flush()
+
+    def refresh(self, url):
+        with self.lock:
+            entry = self.load_entries().get(self.key(url))
+            if entry is not None:
+                entry['fetched_at'] = time.time()
+                entry['accessed_at'] = entry['fetched_at']
+                self.is_dirty = True
+
+        self.schedule_flush()
+
+    def evict(self):
+        entries = self.load_entries()
+        total_size = sum(entry['size'] for entry in entries.values())
+
+        if total_size <= self.max_size:
+            return
+
+        # least recently used first
+        keys = sorted(entries.keys(), key=lambda x: entries[x]['accessed_at'])
+        for key in keys:
+            if total_size <= self.max_size:
+                break
+
+            total_size -= entries[key]['size']
+            del entries[key]
+            self.removed.add(key)
+
+            try:
+                os.remove(self.body_path(key))
+            except OSError:
+                pass
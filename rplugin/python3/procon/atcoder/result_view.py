@@ -0,0 +1,168 @@
+# coding: utf-8
+
+import os
+import mmap
+
+CHUNK_SIZE = 1 << 20
+
+WINDOW_LINES = 20
+CONTEXT_LINES = 5
+MAX_LINE_WIDTH = 200
+
+
+def format_size(size):
+    for unit in ['B', 'KB', 'MB']:
+        if size < 1024:
+            return '%d %s' % (size, unit) if unit == 'B' else '%.1f %s' % (size, unit)
+        size /= 1024.0
+    return '%.1f GB' % size
+
+
+# ==============================================================================
+#
+# MappedFile
+#
+# ==============================================================================
+class MappedFile(object):
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.data = b''
+        self.size = 0
+        self.exists = False
+
+    def __enter__(self):
+        try:
+            self.file = open(self.path, mode='rb')
+        except OSError:
+            return self
+
+        self.exists = True
+        self.size = os.fstat(self.file.fileno()).st_size
+
+        # mmap refuses empty files
+        if self.size > 0:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        if self.file:
+            self.file.close()
+        return False
+
+    def line_count(self):
+        count = 0
+        for start in range(0, self.size, CHUNK_SIZE):
+            count += self.data[start:start + CHUNK_SIZE].count(b'\n')
+
+        if self.size > 0 and self.data[self.size - 1:self.size] != b'\n':
+            count += 1
+
+        return count
+
+    def line_offset(self, line):
+        # skip whole chunks by counting, then find the line inside one
+        remaining = line - 1
+        start = 0
+
+        while remaining > 0 and start < self.size:
+            chunk = self.data[start:start + CHUNK_SIZE]
+            newlines = chunk.count(b'\n')
+
+            if newlines < remaining:
+                remaining -= newlines
+                start += len(chunk)
+                continue
+
+            offset = -1
+            for _ in range(remaining):
+                offset = chunk.find(b'\n', offset + 1)
+            return start + offset + 1
+
+        return start if remaining == 0 else self.size
+
+    def lines(self, first, count, max_width=MAX_LINE_WIDTH):
+        offset = self.line_offset(first)
+        lines = []
+
+        while len(lines) < count and offset < self.size:
+            end = self.data.find(b'\n', offset)
+            end = self.size if end == -1 else end
+
+            text = self.data[offset:min(end, offset + max_width)]
+            text = text.decode('utf-8', 'replace').rstrip("\r")
+            if end - offset > max_width:
+                text += ' ... (+%s)' % format_size(end - offset - max_width)
+
+            lines.append((first + len(lines), text))
+            offset = end + 1
+
+        return lines
+
+
+# ==============================================================================
+#
+# ResultView
+#
+# ==============================================================================
+class ResultView(object):
+    def __init__(self, window_lines=WINDOW_LINES, context_lines=CONTEXT_LINES):
+        self.window_lines = window_lines
+        self.context_lines = context_lines
+
+    def first_line(self, focus_line):
+        if focus_line is None:
+            return 1
+        return max(1, focus_line - self.context_lines)
+
+    def show(self, title, path, focus_line=None):
+        with MappedFile(path) as mapped:
+            if not mapped.exists:
+                print('--- %s --- (missing)' % title)
+                return
+
+            line_count = mapped.line_count()
+            first = self.first_line(focus_line)
+            first = max(1, min(first, line_count - self.window_lines + 1))
+            lines = mapped.lines(first, self.window_lines)
+
+            summary = '%s, %d lines' % (format_size(mapped.size), line_count)
+            if first > 1 or len(lines) < line_count:
+                summary += ', showing %d-%d' % (first, first + len(lines) - 1)
+            print('--- %s --- (%s)' % (title, summary))
+
+            width = max(5, len(str(first + len(lines))))
+            if first > 1:
+                print('%*s | ... %d lines above' % (width + 1, '', first - 1))
+
+            for number, text in lines:
+                marker = '>' if number == focus_line else ' '
+                print('%s%*d | %s' % (marker, width, number, text))
+
+            below = line_count - (first + len(lines) - 1)
+            if below > 0:
+                print('%*s | ... %d lines below' % (width + 1, '', below))
+
+    # outputs open around the first mismatch; the input has no such line
+    # and opens at the top unless a line is asked for explicitly. the runner
+    # file of a case that did not run is left over from an earlier run, so
+    # it is not shown then
+    def show_sample_case(self, sample_case, compared=None, focus_line=None, not_run=None):
+        index = sample_case.index()
+
+        output_line = focus_line
+        if output_line is None and compared and not compared['ok']:
+            output_line = compared['line']
+
+        print('--------------------------------------')
+        self.show('sample input  (%d)' % index, sample_case.input_file_path(), focus_line)
+        self.show('sample output (%d)' % index, sample_case.output_file_path(), output_line)
+
+        if not_run:
+            print('--- runner output (%d) --- (not run: %s)' % (index, not_run))
+            return
+
+        self.show('runner output (%d)' % index, sample_case.runner_file_path(), output_line)
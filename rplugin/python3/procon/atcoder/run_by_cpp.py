@@ -1,15 +1,56 @@
 # coding: utf-8
 
 from atcoder import AtCoder, Contest, Problem
+from languages import create_language, extension_of
+from comparator import Comparator
+from executor import Executor, DEFAULT_TIME_LIMIT, DEFAULT_MEMORY_LIMIT, has_sanitizer
+from compile_cache import CompileError
+from result_view import ResultView
+from scratch import clean_scratch
+from tracing import span
+
+import tracing
 
 import os
 import sys
-import time
-import subprocess
+import shlex
+import argparse
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
 
 class Runner:
-    def __init__(self, source_path):
+    def __init__(self, source_path, jobs = 1, fail_fast = False, flags = [], abs_tol = 0.0, rel_tol = 0.0, atcoder = None,
+                 time_limit = DEFAULT_TIME_LIMIT, memory_limit = DEFAULT_MEMORY_LIMIT, python = None):
         self.source_path = source_path
+        self.atcoder = atcoder
+        self.jobs = max(1, jobs)
+        self.fail_fast = fail_fast
+        self.comparator = Comparator(abs_tol, rel_tol)
+        self.executor = Executor(time_limit = time_limit, memory_limit = memory_limit,
+                                 limit_address_space = not has_sanitizer(flags))
+
+        self.root_dir = os.path.dirname(os.path.dirname(source_path))
+        self.language_options = { 'flags': flags, 'python': python, 'jobs': self.jobs }
+        self.languages = {}
+
+    # languages are picked by extension, so a python generator can drive a
+    # c++ solution in the stress test (see StressTest.companion_path)
+    def language(self, source_path):
+        extension = extension_of(source_path)
+        if extension not in self.languages:
+            self.languages[extension] = create_language(source_path, self.root_dir, self.language_options)
+        return self.languages[extension]
+
+    def command(self, source_path, binary_path):
+        return self.language(source_path).command(source_path, binary_path)
+
+    # kills the compiler and the programs this runner started; a cancelled
+    # runner is done for good
+    def cancel(self):
+        for language in list(self.languages.values()):
+            language.cancel()
+        self.executor.cancel()
 
     def load(self):
         contest_dir = os.path.dirname(self.source_path)
@@ -18,7 +59,7 @@ class Runner:
         contest_key = os.path.basename(contest_dir)
         problem_key = os.path.splitext(os.path.basename(self.source_path))[0]
 
-        atcoder = AtCoder(root_dir).load()
+        atcoder = self.atcoder if self.atcoder else AtCoder(root_dir).load()
         contest = atcoder.find_contest(contest_key) or Contest(atcoder, { 'key': contest_key })
         contest.load()
 
@@ -28,8 +69,17 @@ class Runner:
         return problem
 
     def execute(self, test_index):
-        problem = self.load()
-        self.compile(self.source_path, problem.code.binary_path())
+        clean_scratch()
+
+        with span('runner.load'):
+            problem = self.load()
+
+        try:
+            self.compile(self.source_path, problem.code.binary_path(self.source_path))
+        except CompileError as exception:
+            print('compile: CE')
+            print(exception)
+            return
 
         sample_cases = problem.sample_cases
 
@@ -42,68 +92,171 @@ class Runner:
 
         print('======================================')
 
-        self.testrun(sample_cases)
-        self.show_results(sample_cases)
+        results = self.testrun(sample_cases)
+
+        with span('show_results'):
+            self.show_results(sample_cases, results)
+
+    def view(self, test_index, line):
+        problem = self.load()
+
+        sample_cases = list(filter(lambda x: x.index() == test_index, problem.sample_cases))
+        if len(sample_cases) == 0:
+            print('no sample_cases by index({})'.format(test_index))
+            return
+
+        ResultView().show_sample_case(sample_cases[0], focus_line = line)
 
     def compile(self, source_path, binary_path):
-        command = ['g++', source_path, '-o', binary_path]
-        # print('>> {}'.format(' '.join(command)), flush = True)
+        with span('compile'):
+            result = self.language(source_path).build(source_path, binary_path)
+
+        status = 'cache hit' if result['hit'] else 'cache miss'
+        status = status + ', pch' if result['pch'] else status
+        print('compile: {} ... {:.02f}s'.format(status, result['elapsed_time']), flush = True)
 
-        os.makedirs(os.path.dirname(binary_path), exist_ok = True)
-        return subprocess.run(command, stdout=subprocess.PIPE, check=True)
+        if result.get('messages'):
+            print(result['messages'].rstrip(), flush = True)
+
+        return result
 
     def testrun(self, sample_cases):
-        for sample_case in sample_cases:
-            self.testrun_impl(sample_case)
+        cancel_event = threading.Event()
+
+        with ThreadPoolExecutor(max_workers = self.jobs) as executor:
+            futures = [executor.submit(self.testrun_impl, sample_case, cancel_event) for sample_case in sample_cases]
+
+            # print in submission order, so the output does not depend on the job count
+            results = []
+            for sample_case, future in zip(sample_cases, futures):
+                if future.cancelled():
+                    result = { 'status': 'SKIP', 'elapsed_time': 0.0 }
+                else:
+                    result = future.result()
+
+                if self.fail_fast and result['status'] not in ['AC', 'SKIP']:
+                    cancel_event.set()
+                    for pending in futures:
+                        pending.cancel()
+
+                self.show_status(sample_case, result)
+                results.append(result)
+
+        return results
+
+    def testrun_impl(self, sample_case, cancel_event):
+        if cancel_event.is_set():
+            return { 'status': 'SKIP', 'elapsed_time': 0.0 }
 
-    def testrun_impl(self, sample_case):
-        print('{}: '.format(sample_case), end='', flush = True)
         try:
-            elapsed_time = self.execute_command(sample_case)
-            status = 'AC' if sample_case.diff() else 'WA'
-            status = status if elapsed_time <= 2.0 else 'TLE'
-            print('{} ... {:.02f}s'.format(status, elapsed_time))
+            with span('run.case', { 'index': sample_case.index() }):
+                result = self.execute_command(sample_case)
+
+            if result['status'] == 'OK':
+                with span('judge.compare', { 'index': sample_case.index() }):
+                    result['compared'] = sample_case.compare(self.comparator)
+                result['status'] = 'AC' if result['compared']['ok'] else 'WA'
         except Exception as exception:
-            print(exception)
-            print(sys.exc_info())
+            return { 'status': 'ERROR', 'elapsed_time': 0.0, 'error': exception }
+
+        if self.fail_fast and result['status'] != 'AC':
+            cancel_event.set()
+
+        result['elapsed_time'] = result['wall_time']
+        return result
+
+    def show_status(self, sample_case, result):
+        print('{}: '.format(sample_case), end='')
+
+        if result['status'] == 'ERROR':
+            print(result['error'])
+        elif result['status'] == 'SKIP':
+            print('SKIP (fail fast)')
+        else:
+            print('{} ... {:.02f}s (cpu {:.02f}s, {})'.format(
+                result['status'], result['wall_time'], result['cpu_time'], self.memory_summary(result)), end='')
+            print(self.failure_summary(result))
+
+        sys.stdout.flush()
 
+    def memory_summary(self, result):
+        megabytes = result['max_rss'] / (1024 * 1024)
+        if self.executor.is_rss_measured(result):
+            return '{:.1f}MB'.format(megabytes)
+        return '<={:.1f}MB'.format(megabytes)
+
+    def failure_summary(self, result):
+        if result['status'] in ['AC', 'WA']:
+            return self.mismatch_summary(result['compared'])
+
+        reason = self.executor.describe(result)
+        if result['status'] == 'TLE' and result['killed']:
+            reason = 'killed after {:.02f}s'.format(result['wall_time'])
+
+        return ' ({})'.format(reason) if reason else ''
+
+    def mismatch_summary(self, compared):
+        if compared['ok']:
+            return ''
+
+        actual = compared['actual'] if compared['actual'] is not None else 'EOF'
+        expected = compared['expected'] if compared['expected'] is not None else 'EOF'
+
+        return ' (line {}, column {}: expected {}, got {})'.format(
+                compared['line'], compared['column'], expected, actual)
+
+    # the program reads the sample file directly and writes to the runner
+    # file in the contest's scratch dir, which is on tmpfs when available
     def execute_command(self, sample_case):
-        binary_path = sample_case.problem.code.binary_path()
+        binary_path = sample_case.problem.code.binary_path(self.source_path)
         input_file_path  = sample_case.input_file_path()
         runner_file_path = sample_case.runner_file_path()
 
-        command = 'time %s <%s >%s' % (binary_path, input_file_path, runner_file_path)
-
-        t1 = time.time()
-        subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, shell=True)
-        t2 = time.time()
+        os.makedirs(os.path.dirname(runner_file_path), exist_ok = True)
 
-        return t2 - t1
+        language = self.language(self.source_path)
+        return language.execute(self.executor, self.source_path, binary_path, input_file_path, runner_file_path)
 
-    def show_results(self, sample_cases):
-        for sample_case in sample_cases:
-            res = sample_case.read_results()
+    # outputs are memory-mapped and shown as a window around the first
+    # mismatch; :ProTestView pages to other lines
+    def show_results(self, sample_cases, results):
+        view = ResultView()
 
-            print('--------------------------------------')
-            print('--- sample input  (%s) ---' % str(sample_case.index()))
-            print(res['input'])
-            print('--- sample output (%s) ---' % str(sample_case.index()))
-            print(res['output'])
-            print('--- runner output (%s) ---' % str(sample_case.index()))
-            print(res['runner'])
+        for sample_case, result in zip(sample_cases, results):
+            not_run = result['status'] if result['status'] in ['SKIP', 'ERROR'] else None
+            view.show_sample_case(sample_case, result.get('compared'), not_run = not_run)
 
-if __name__ == '__main__':
-    if len(sys.argv) <= 1:
-        raise Exception('please, input source_path argment!')
+def main(command):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('source_path')
+    parser.add_argument('test_index', nargs = '?', type = int, default = -1)
+    parser.add_argument('--view', type = int, metavar = 'LINE', help = 'show the files of test_index around LINE')
+    parser.add_argument('--jobs', type = int, default = 1)
+    parser.add_argument('--fail-fast', action = 'store_true')
+    parser.add_argument('--cxxflags', default = '')
+    parser.add_argument('--abs-tol', type = float, default = 0.0)
+    parser.add_argument('--rel-tol', type = float, default = 0.0)
+    parser.add_argument('--time-limit', type = float, default = DEFAULT_TIME_LIMIT)
+    parser.add_argument('--memory-limit', type = int, default = DEFAULT_MEMORY_LIMIT // (1024 * 1024), help = 'MiB')
+    parser.add_argument('--python', default = None, help = 'interpreter for .py sources (python3, pypy3, ...)')
+    args = parser.parse_args()
 
-    source_path = sys.argv[1]
+    source_path = args.source_path
 
     if not(os.path.exists(source_path)):
         raise Exception('not found: %s' % source_path)
 
-    test_index = -1
-    if len(sys.argv) >= 2:
-        test_index = int(sys.argv[2])
+    flags = shlex.split(args.cxxflags)
+    runner = Runner(source_path, jobs = args.jobs, fail_fast = args.fail_fast, flags = flags,
+                    abs_tol = args.abs_tol, rel_tol = args.rel_tol,
+                    time_limit = args.time_limit, memory_limit = args.memory_limit * 1024 * 1024,
+                    python = args.python)
+    if args.view is not None:
+        runner.view(args.test_index, args.view)
+    else:
+        runner.execute(args.test_index)
 
-    runner = Runner(source_path)
-    runner.execute(test_index)
+    tracing.finish(command)
+
+if __name__ == '__main__':
+    main('run_by_cpp')
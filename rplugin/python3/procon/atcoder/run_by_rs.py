@@ -0,0 +1,6 @@
+# coding: utf-8
+
+from run_by_cpp import main
+
+if __name__ == '__main__':
+    main('run_by_rs')
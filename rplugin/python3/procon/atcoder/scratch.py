@@ -0,0 +1,52 @@
+# coding: utf-8
+
+import os
+import time
+import hashlib
+
+SHM_DIR = '/dev/shm'
+SCRATCH_MAX_AGE = 24 * 60 * 60
+
+
+def scratch_root():
+    if not os.path.isdir(SHM_DIR) or not os.access(SHM_DIR, os.W_OK):
+        return None
+    return '%s/procon-%d' % (SHM_DIR, os.getuid())
+
+
+# runner outputs live in memory when /dev/shm is there; binaries stay on
+# disk because /dev/shm is often mounted noexec
+def scratch_dir(root_dir, name, fallback_dir):
+    root = scratch_root()
+    if root is None:
+        return fallback_dir
+
+    key = hashlib.sha1(os.path.abspath(root_dir).encode('utf-8')).hexdigest()
+    return '%s/%s/%s' % (root, key[0:12], name)
+
+
+# files are kept for a while so :ProTestView can still page through them.
+# a directory goes only once its own mtime is old as well: another run may
+# have just created it and not yet opened its runner file
+def clean_scratch(max_age=SCRATCH_MAX_AGE):
+    root = scratch_root()
+    if root is None or not os.path.isdir(root):
+        return
+
+    expired_at = time.time() - max_age
+
+    for top, dirs, files in os.walk(root, topdown=False):
+        for name in files:
+            path = os.path.join(top, name)
+            try:
+                if os.path.getmtime(path) < expired_at:
+                    os.remove(path)
+            except OSError:
+                pass
+
+        if top != root:
+            try:
+                if os.path.getmtime(top) < expired_at:
+                    os.rmdir(top)
+            except OSError:
+                pass
@@ -0,0 +1,274 @@
+# coding: utf-8
+
+import traceback
+
+import os
+import json
+import sqlite3
+import threading
+import contextlib
+
+from tracing import span
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS contests (
+    contest_key TEXT PRIMARY KEY,
+    name TEXT,
+    time TEXT,
+    params TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS contests_time ON contests (time);
+
+CREATE TABLE IF NOT EXISTS problems (
+    contest_key TEXT NOT NULL,
+    problem_key TEXT NOT NULL,
+    name TEXT,
+    score INTEGER,
+    params TEXT NOT NULL,
+    PRIMARY KEY (contest_key, problem_key)
+);
+CREATE INDEX IF NOT EXISTS problems_problem_key ON problems (problem_key);
+
+CREATE TABLE IF NOT EXISTS samples (
+    contest_key TEXT NOT NULL,
+    problem_key TEXT NOT NULL,
+    sample_index INTEGER NOT NULL,
+    input_size INTEGER,
+    output_size INTEGER,
+    input_hash TEXT,
+    output_hash TEXT,
+    input_mtime INTEGER,
+    output_mtime INTEGER,
+    PRIMARY KEY (contest_key, problem_key, sample_index)
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+'''
+
+SAMPLE_FIELDS = [
+    'input_size', 'output_size', 'input_hash', 'output_hash',
+    'input_mtime', 'output_mtime',
+]
+
+
+# ==============================================================================
+#
+# Store
+#
+# ==============================================================================
+class Store(object):
+    def __init__(self, path):
+        self.path = path
+        self.connection = None
+        self.lock = threading.RLock()
+
+    def connect(self):
+        if self.connection is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.connection = sqlite3.connect(
+                    self.path, check_same_thread=False)
+            self.connection.executescript(SCHEMA)
+
+        return self.connection
+
+    def close(self):
+        with self.lock:
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+
+    @contextlib.contextmanager
+    def transaction(self):
+        with span('store.transaction'), self.lock:
+            connection = self.connect()
+            with connection:
+                yield connection
+
+    def query(self, sql, args=()):
+        with span('store.query'), self.lock:
+            return self.connect().execute(sql, args).fetchall()
+
+    # one json.loads for the whole result: the decoder memoizes keys per
+    # call, so every row shares the same 'key', 'name', ... strings
+    def decode_all(self, texts):
+        return json.loads('[%s]' % ','.join(texts))
+
+    # --------------------------------------------------------------------------
+    #  meta
+    # --------------------------------------------------------------------------
+    def get_meta(self, key, default=None):
+        rows = self.query('SELECT value FROM meta WHERE key = ?', (key,))
+        return json.loads(rows[0][0]) if rows else default
+
+    def set_meta(self, key, value):
+        with self.transaction() as connection:
+            connection.execute(
+                    'INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                    (key, json.dumps(value)))
+
+    # --------------------------------------------------------------------------
+    #  contests
+    # --------------------------------------------------------------------------
+    def load_contests(self):
+        rows = self.query('SELECT params FROM contests ORDER BY time DESC')
+        return self.decode_all(row[0] for row in rows)
+
+    def load_contests_since(self, time):
+        rows = self.query(
+                'SELECT params FROM contests WHERE time >= ? ORDER BY time',
+                (time,))
+        return self.decode_all(row[0] for row in rows)
+
+    def find_contest(self, contest_key):
+        rows = self.query(
+                'SELECT params FROM contests WHERE contest_key = ?',
+                (contest_key,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def save_contests(self, params_list):
+        rows = [
+                (params['key'], params.get('name'), params.get('time'),
+                 json.dumps(params))
+                for params in params_list
+            ]
+
+        with self.transaction() as connection:
+            connection.executemany(
+                    'INSERT OR REPLACE INTO contests'
+                    ' (contest_key, name, time, params) VALUES (?, ?, ?, ?)',
+                    rows)
+
+    # --------------------------------------------------------------------------
+    #  problems
+    # --------------------------------------------------------------------------
+    def load_problems(self, contest_key):
+        rows = self.query(
+                'SELECT params FROM problems WHERE contest_key = ?'
+                ' ORDER BY problem_key', (contest_key,))
+        return self.decode_all(row[0] for row in rows)
+
+    def load_all_problems(self):
+        rows = self.query(
+                'SELECT contest_key, params FROM problems'
+                ' ORDER BY contest_key, problem_key')
+
+        problems = {}
+        params_list = self.decode_all(row[1] for row in rows)
+        for (contest_key, _), params in zip(rows, params_list):
+            problems.setdefault(contest_key, []).append(params)
+
+        return problems
+
+    def find_problem(self, contest_key, problem_key):
+        rows = self.query(
+                'SELECT params FROM problems'
+                ' WHERE contest_key = ? AND problem_key = ?',
+                (contest_key, problem_key))
+        return json.loads(rows[0][0]) if rows else None
+
+    def save_problems(self, contest_key, params_list):
+        rows = [
+                (contest_key, params['key'], params.get('name'),
+                 params.get('score'), json.dumps(params))
+                for params in params_list
+            ]
+
+        with self.transaction() as connection:
+            connection.execute(
+                    'DELETE FROM problems WHERE contest_key = ?',
+                    (contest_key,))
+            connection.executemany(
+                    'INSERT INTO problems'
+                    ' (contest_key, problem_key, name, score, params)'
+                    ' VALUES (?, ?, ?, ?, ?)', rows)
+
+    # --------------------------------------------------------------------------
+    #  samples
+    # --------------------------------------------------------------------------
+    def load_samples(self, contest_key, problem_key):
+        rows = self.query(
+                'SELECT sample_index, %s FROM samples'
+                ' WHERE contest_key = ? AND problem_key = ?'
+                ' ORDER BY sample_index' % ', '.join(SAMPLE_FIELDS),
+                (contest_key, problem_key))
+
+        samples = []
+        for row in rows:
+            sample = dict(zip(SAMPLE_FIELDS, row[1:]))
+            sample['index'] = row[0]
+            samples.append(sample)
+
+        return samples
+
+    def save_samples(self, contest_key, problem_key, samples):
+        rows = [
+                (contest_key, problem_key, sample['index']) +
+                tuple(sample.get(field) for field in SAMPLE_FIELDS)
+                for sample in samples
+            ]
+
+        with self.transaction() as connection:
+            connection.executemany(
+                    'INSERT OR REPLACE INTO samples'
+                    ' (contest_key, problem_key, sample_index, %s)'
+                    ' VALUES (?, ?, ?, %s)' % (
+                        ', '.join(SAMPLE_FIELDS),
+                        ', '.join('?' for _ in SAMPLE_FIELDS)), rows)
+
+    def delete_samples(self, contest_key, problem_key, indexes):
+        rows = [(contest_key, problem_key, index) for index in indexes]
+
+        with self.transaction() as connection:
+            connection.executemany(
+                    'DELETE FROM samples WHERE contest_key = ?'
+                    ' AND problem_key = ? AND sample_index = ?', rows)
+
+    # --------------------------------------------------------------------------
+    #  migration
+    # --------------------------------------------------------------------------
+    def migrate_from_json(self, root_dir):
+        if self.get_meta('migrated_from_json'):
+            return False
+
+        contests_path = '%s/contests.json' % root_dir
+        contest_params_list = self.read_json(contests_path, [])
+
+        problem_params_lists = {}
+        if os.path.isdir(root_dir):
+            for entry in os.scandir(root_dir):
+                problems_path = '%s/problems.json' % entry.path
+                if entry.is_dir() and os.path.exists(problems_path):
+                    problem_params_lists[entry.name] = self.read_json(
+                            problems_path, [])
+
+        self.save_contests(contest_params_list)
+        for contest_key, params_list in problem_params_lists.items():
+            self.save_problems(contest_key, params_list)
+
+        archive_state = self.read_json('%s/archive.json' % root_dir, None)
+        if archive_state is not None:
+            self.set_meta('archive_state', archive_state)
+
+        self.set_meta('migrated_from_json', True)
+
+        if contest_params_list or problem_params_lists:
+            print('migrate: %d contests, %d problem lists' % (
+                len(contest_params_list), len(problem_params_lists)))
+
+        return True
+
+    def read_json(self, path, default):
+        if not os.path.exists(path):
+            return default
+
+        try:
+            with open(path, mode='r') as f:
+                return json.load(f)
+        except Exception as exception:
+            print(exception)
+            traceback.print_exc()
+
+        return default
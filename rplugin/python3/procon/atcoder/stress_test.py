@@ -0,0 +1,264 @@
+# coding: utf-8
+
+from run_by_cpp import Runner
+from atcoder import SampleCase
+from compile_cache import CompileError
+from executor import Executor, DEFAULT_TIME_LIMIT, DEFAULT_MEMORY_LIMIT, DEFAULT_OUTPUT_LIMIT, has_sanitizer
+from comparator import Comparator
+from languages import all_extensions
+from tracing import span
+
+import tracing
+
+import os
+import time
+import shlex
+import argparse
+
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+BATCH_SIZE = 32
+MINIMIZE_ITERATIONS = 200
+
+COMPANIONS = {
+    'gen': 'prints one random input for the seed given as its first argument',
+    'brute': 'reads an input and prints the correct answer, however slowly'
+}
+
+
+# runs on a worker thread: seed -> generator -> brute force and solution,
+# returning the first (or, when minimizing, the shortest) failing case.
+# the programs are child processes, so the thread mostly waits on pipes;
+# data moves through them only, nothing is written to disk
+def run_seeds(commands, seeds, limits, tolerances, is_minimizing):
+    executor = Executor(*limits)
+    comparator = Comparator(*tolerances)
+
+    count = 0
+    failure = None
+
+    for seed in seeds:
+        count += 1
+
+        result = executor.execute_piped(commands['gen'] + [str(seed)], b'')
+        if result['status'] != 'OK':
+            return { 'count': count, 'error': 'generator {} on seed {}'.format(result['status'], seed) }
+
+        input_data = result['output']
+        if failure and len(input_data) >= len(failure['input']):
+            continue
+
+        result = executor.execute_piped(commands['brute'], input_data)
+        if result['status'] != 'OK':
+            return { 'count': count, 'error': 'brute force {} on seed {}'.format(result['status'], seed) }
+
+        expected_data = result['output']
+
+        result = executor.execute_piped(commands['solution'], input_data)
+        compared = { 'ok': True }
+        if result['status'] == 'OK':
+            compared = comparator.compare_bytes(result['output'], expected_data)
+            result['status'] = 'AC' if compared['ok'] else 'WA'
+
+        if result['status'] == 'AC':
+            continue
+
+        failure = { 'seed': seed, 'status': result['status'], 'compared': compared,
+                    'input': input_data, 'output': expected_data }
+
+        if not is_minimizing:
+            break
+
+    return { 'count': count, 'failure': failure }
+
+
+class StressTest:
+    def __init__(self, source_path, jobs = 0, iterations = 1000, seed = 1, flags = [], abs_tol = 0.0, rel_tol = 0.0,
+                 atcoder = None, time_limit = DEFAULT_TIME_LIMIT, memory_limit = DEFAULT_MEMORY_LIMIT, python = None):
+        self.source_path = source_path
+        self.jobs = jobs if jobs > 0 else (os.cpu_count() or 1)
+        self.iterations = iterations
+        self.seed = seed
+        self.limits = (time_limit, memory_limit, DEFAULT_OUTPUT_LIMIT, not has_sanitizer(flags))
+        self.tolerances = (abs_tol, rel_tol)
+        self.runner = Runner(source_path, flags = flags, abs_tol = abs_tol, rel_tol = rel_tol, atcoder = atcoder,
+                             time_limit = time_limit, memory_limit = memory_limit, python = python)
+
+    # a companion may be written in any language; one in the solution's own
+    # language wins, and its path is the one reported when none is found
+    def companion_path(self, suffix):
+        base, extension = os.path.splitext(self.source_path)
+        extensions = [extension[1:]] + [other for other in all_extensions() if other != extension[1:]]
+
+        for other in extensions:
+            path = '{}_{}.{}'.format(base, suffix, other)
+            if os.path.exists(path):
+                return path
+
+        return '{}_{}{}'.format(base, suffix, extension)
+
+    def execute(self):
+        sources = { name: self.companion_path(name) for name in COMPANIONS }
+        for name, path in sources.items():
+            if not os.path.exists(path):
+                print('not found: {} ({})'.format(path, COMPANIONS[name]))
+                return None
+
+        with span('runner.load'):
+            problem = self.runner.load()
+
+        tmp_dir = problem.contest.tmp_dir()
+        binaries = { name: '{}/{}_{}.out'.format(tmp_dir, problem.problem_key(), name) for name in COMPANIONS }
+
+        sources['solution'] = self.source_path
+        binaries['solution'] = problem.code.binary_path(self.source_path)
+
+        commands = {}
+        for name in ['gen', 'brute', 'solution']:
+            print('{}: '.format(os.path.basename(sources[name])), end = '')
+            try:
+                self.runner.compile(sources[name], binaries[name])
+            except CompileError as exception:
+                print('compile: CE')
+                print(exception)
+                return None
+            commands[name] = self.runner.command(sources[name], binaries[name])
+
+        print('======================================')
+        print('stress: {} iterations from seed {} on {} workers'.format(self.iterations, self.seed, self.jobs), flush = True)
+
+        failure = self.find_failure(commands)
+        return self.save(problem, failure) if failure else None
+
+    def find_failure(self, commands):
+        # threads, not processes: forking the editor host once per worker
+        # copies every thread's locks along with it
+        with ThreadPoolExecutor(max_workers = self.jobs) as pool:
+            started_at = time.perf_counter()
+            with span('stress.search'):
+                outcome = self.search(pool, commands, self.seed, self.iterations, False)
+            elapsed_time = time.perf_counter() - started_at
+
+            print('stress: {} iterations in {:.02f}s ({:.1f} it/s)'.format(
+                outcome['count'], elapsed_time, outcome['count'] / max(elapsed_time, 1e-9)))
+
+            if outcome.get('error'):
+                print('stress: {}'.format(outcome['error']))
+                return None
+
+            failure = outcome['failure']
+            if not failure:
+                print('stress: no counterexample')
+                return None
+
+            print('stress: {} on seed {}{}'.format(
+                failure['status'], failure['seed'], self.runner.mismatch_summary(failure['compared'])))
+
+            with span('stress.minimize'):
+                return self.minimize(pool, commands, failure)
+
+    # the generator decides the input, so the smallest counterexample is
+    # searched among further seeds instead of shrinking this one
+    def minimize(self, pool, commands, failure):
+        outcome = self.search(pool, commands, failure['seed'] + 1, MINIMIZE_ITERATIONS, True)
+
+        smaller = outcome.get('failure')
+        if smaller and len(smaller['input']) < len(failure['input']):
+            print('stress: minimized {} -> {} bytes (seed {})'.format(
+                len(failure['input']), len(smaller['input']), smaller['seed']))
+            return smaller
+
+        return failure
+
+    def search(self, pool, commands, seed, iterations, is_minimizing):
+        batches = [range(start, min(start + BATCH_SIZE, seed + iterations))
+                   for start in range(seed, seed + iterations, BATCH_SIZE)]
+        batches.reverse()
+
+        def submit():
+            return pool.submit(run_seeds, commands, batches.pop(),
+                               self.limits, self.tolerances, is_minimizing)
+
+        pending = set(submit() for _ in range(min(len(batches), self.jobs * 2)))
+        outcome = { 'count': 0, 'failure': None }
+
+        while pending:
+            done, pending = wait(pending, return_when = FIRST_COMPLETED)
+
+            for future in done:
+                if future.cancelled():
+                    continue
+
+                result = future.result()
+                outcome['count'] += result['count']
+
+                if result.get('error'):
+                    outcome['error'] = result['error']
+
+                failure = result.get('failure')
+                if failure and self.is_better(failure, outcome['failure'], is_minimizing):
+                    outcome['failure'] = failure
+
+            if outcome.get('error') or (outcome['failure'] and not is_minimizing):
+                for future in pending:
+                    future.cancel()
+                continue
+
+            while batches and len(pending) < self.jobs * 2:
+                pending.add(submit())
+
+        return outcome
+
+    def is_better(self, failure, best, is_minimizing):
+        if best is None:
+            return True
+        if is_minimizing:
+            return len(failure['input']) < len(best['input'])
+        return failure['seed'] < best['seed']
+
+    def save(self, problem, failure):
+        indexes = [sample_case.index() for sample_case in problem.sample_cases]
+        indexes.extend(SampleCase.scan_files(problem).keys())
+        index = max(indexes + [0]) + 1
+
+        params = {
+            'index': index,
+            'input': failure['input'].decode('utf-8', 'replace').rstrip("\n"),
+            'output': failure['output'].decode('utf-8', 'replace').rstrip("\n")
+        }
+
+        sample_case = SampleCase(problem, params)
+        sample_case.save()
+
+        problem.sample_cases.append(sample_case)
+        problem.save_sample_metadata()
+
+        print('stress: saved seed {} as {}'.format(failure['seed'], sample_case))
+        return sample_case
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('source_path')
+    parser.add_argument('--iterations', type = int, default = 1000)
+    parser.add_argument('--seed', type = int, default = 1)
+    parser.add_argument('--jobs', type = int, default = 0)
+    parser.add_argument('--cxxflags', default = '')
+    parser.add_argument('--abs-tol', type = float, default = 0.0)
+    parser.add_argument('--rel-tol', type = float, default = 0.0)
+    parser.add_argument('--time-limit', type = float, default = DEFAULT_TIME_LIMIT)
+    parser.add_argument('--memory-limit', type = int, default = DEFAULT_MEMORY_LIMIT // (1024 * 1024), help = 'MiB')
+    parser.add_argument('--python', default = None, help = 'interpreter for .py sources (python3, pypy3, ...)')
+    args = parser.parse_args()
+
+    source_path = args.source_path
+
+    if not(os.path.exists(source_path)):
+        raise Exception('not found: %s' % source_path)
+
+    stress_test = StressTest(source_path, jobs = args.jobs, iterations = args.iterations, seed = args.seed,
+                             flags = shlex.split(args.cxxflags), abs_tol = args.abs_tol, rel_tol = args.rel_tol,
+                             time_limit = args.time_limit, memory_limit = args.memory_limit * 1024 * 1024,
+                             python = args.python)
+    stress_test.execute()
+
+    tracing.finish('stress_test')
@@ -0,0 +1,173 @@
+# coding: utf-8
+
+import traceback
+import urllib.parse
+
+import time
+import os
+
+from languages import create_language
+from http_session import REDIRECT_STATUSES
+from judge_status import track
+from tracing import span
+
+# the site keeps one token per session; refetching it now and then costs
+# one page and covers a token rotated on the server side
+CSRF_TOKEN_TTL = 6 * 60 * 60
+CSRF_TOKEN_META_KEY = 'csrf_token'
+
+
+def task_of(source_path):
+    contest_key = os.path.basename(os.path.dirname(source_path))
+    problem_key = os.path.basename(source_path).split('.')[0]
+    return contest_key, '%s_%s' % (contest_key, problem_key)
+
+
+# ==============================================================================
+#
+# Submitter
+#
+# ==============================================================================
+class Submitter(object):
+    def __init__(self, atcoder):
+        self.atcoder = atcoder
+        self.api = atcoder.api
+        self.store = atcoder.store
+
+    # --------------------------------------------------------------------------
+    #  csrf token
+    # --------------------------------------------------------------------------
+    def cached_token(self):
+        entry = self.store.get_meta(CSRF_TOKEN_META_KEY)
+        if entry and entry['expires_at'] > time.time():
+            return entry['token']
+        return None
+
+    def save_token(self, token):
+        entry = {'token': token, 'expires_at': time.time() + CSRF_TOKEN_TTL}
+        self.store.set_meta(CSRF_TOKEN_META_KEY, entry)
+
+    def clear_token(self):
+        self.store.set_meta(CSRF_TOKEN_META_KEY, None)
+
+    # None when the page sends us to the login form instead
+    def fetch_token(self, url):
+        with self.api.open(url, use_cache=False) as res:
+            if self.is_login_url(res.url) and not self.is_login_url(url):
+                return None
+            token = self.api.extract_csrf_token(res.read())
+
+        if token:
+            self.save_token(token)
+        return token
+
+    def token(self, url):
+        return self.cached_token() or self.fetch_token(url)
+
+    def is_login_url(self, url):
+        return urllib.parse.urlsplit(url).path.rstrip('/') == '/login'
+
+    def location(self, res):
+        return urllib.parse.urljoin(res.url, res.headers.get('Location', ''))
+
+    # --------------------------------------------------------------------------
+    #  login
+    # --------------------------------------------------------------------------
+    def login(self, username, password):
+        url = self.api.get_login_url()
+
+        with span('submit.login'):
+            token = self.fetch_token(url)
+            if not token:
+                print('login: no csrf token on %s' % url)
+                return False
+
+            params = {'username': username, 'password': password, 'csrf_token': token}
+            with self.api.post_form(url, params) as res:
+                is_ok = res.status in REDIRECT_STATUSES and not self.is_login_url(self.location(res))
+
+        # a fresh session comes with a fresh token
+        self.clear_token()
+
+        if not is_ok:
+            print('login: failed for %s' % username)
+            return False
+
+        self.api.session.save_cookies()
+        print('login: ok (%s)' % username)
+        return True
+
+    # --------------------------------------------------------------------------
+    #  submit
+    # --------------------------------------------------------------------------
+    def submit(self, source_path, language_id):
+        contest_key, task_screen_name = task_of(source_path)
+        url = self.api.get_submit_url(contest_key)
+
+        with open(source_path, mode='r') as f:
+            source = f.read()
+
+        params = {
+            'data.TaskScreenName': task_screen_name,
+            'data.LanguageId': language_id,
+            'sourceCode': source
+        }
+
+        # with a cached token this is a single POST; a stale token sends us
+        # back to the form, then one more try with a fresh one
+        for _ in range(2):
+            token = self.token(url)
+            if token is None:
+                print('submit: not logged in, run :ProLogin first')
+                return None
+
+            params['csrf_token'] = token
+            with span('submit.post', {'task': params['data.TaskScreenName']}):
+                with self.api.post_form(url, params) as res:
+                    location = self.location(res)
+                    status = res.status
+
+            if status in REDIRECT_STATUSES and self.is_login_url(location):
+                self.clear_token()
+                print('submit: session expired, run :ProLogin again')
+                return None
+
+            if status in REDIRECT_STATUSES and '/submissions/me' in location:
+                self.api.session.save_cookies()
+                print('submit: %s (language %s) -> %s' % (
+                    params['data.TaskScreenName'], language_id, location))
+                return location
+
+            self.clear_token()
+
+        print('submit: rejected (%d) for %s' % (status, params['data.TaskScreenName']))
+        return None
+
+
+# follows the judge until the verdict unless options['track'] is False
+def submit(atcoder, source_path, options={}):
+    root_dir = atcoder.root_dir()
+    language_id = create_language(source_path, root_dir, options).submit_language_id()
+
+    location = None
+    try:
+        location = Submitter(atcoder).submit(source_path, language_id)
+    except Exception as exception:
+        print(exception)
+        traceback.print_exc()
+
+    if location and options.get('track', True):
+        contest_key, task_screen_name = task_of(source_path)
+        track(atcoder, contest_key, task_screen_name)
+
+    return location
+
+
+def login(atcoder, username, password):
+    try:
+        return Submitter(atcoder).login(username, password)
+    except Exception as exception:
+        print(exception)
+        traceback.print_exc()
+
+    return False
@@ -1,17 +1,38 @@
-from atcoder import AtCoder
+# coding: utf-8
 
+import argparse
+import getpass
 import os
 
+from atcoder import AtCoder
+from submission import submit, login
+
+import tracing
+
 if __name__ == '__main__':
-    source_path = os.path.expanduser('~/.procon/atcoder/abc128/a.cpp')
-    problem_key = os.path.basename(source_path).split('.')[0]
-    contest_dir = os.path.dirname(source_path)
-    root_dir = os.path.dirname(contest_dir)
+    parser = argparse.ArgumentParser()
+    parser.add_argument('source_path', nargs='?')
+    parser.add_argument('--root-dir', default=os.path.expanduser('~/.procon/atcoder'))
+    parser.add_argument('--login', action='store_true', help='log in before submitting')
+    parser.add_argument('--username', default=os.environ.get('PROCON_ATCODER_USERNAME'))
+    parser.add_argument('--language-id', type=int, default=None)
+    parser.add_argument('--python', default=None)
+    parser.add_argument('--no-track', action='store_true', help='do not wait for the verdict')
+    args = parser.parse_args()
+
+    root_dir = args.root_dir
+    if args.source_path:
+        root_dir = os.path.dirname(os.path.dirname(os.path.abspath(args.source_path)))
 
     atcoder = AtCoder(root_dir)
 
-    print(source_path)
-    print(contest_dir)
-    print(root_dir)
+    if args.login:
+        username = args.username or input('username: ')
+        password = os.environ.get('PROCON_ATCODER_PASSWORD') or getpass.getpass('password: ')
+        login(atcoder, username, password)
 
+    if args.source_path:
+        options = {'language_id': args.language_id, 'python': args.python, 'track': not args.no_track}
+        submit(atcoder, os.path.abspath(args.source_path), options)
 
+    tracing.finish('submit')
@@ -0,0 +1,241 @@
+# coding: utf-8
+
+from atcoder import AtCoder, Contest
+from run_by_cpp import Runner
+from executor import DEFAULT_TIME_LIMIT, DEFAULT_MEMORY_LIMIT
+from scratch import clean_scratch
+from tracing import span
+
+import tracing
+
+import os
+import sys
+import time
+import shlex
+import queue
+import argparse
+import itertools
+import threading
+import traceback
+
+# a ready run goes before a compile that has not started, so verdicts come
+# in while the rest compiles
+RUN_PRIORITY = 0
+COMPILE_PRIORITY = 1
+
+class TestAll:
+    def __init__(self, contest_dir, jobs = 0, flags = [], abs_tol = 0.0, rel_tol = 0.0, atcoder = None,
+                 time_limit = DEFAULT_TIME_LIMIT, memory_limit = DEFAULT_MEMORY_LIMIT, python = None):
+        self.contest_dir = contest_dir.rstrip('/')
+        self.atcoder = atcoder
+        self.jobs = jobs if jobs > 0 else (os.cpu_count() or 1)
+        # nothing is cancelled in a batch run, every case gets its verdict
+        self.cancel_event = threading.Event()
+        self.options = { 'jobs': self.jobs, 'flags': flags, 'abs_tol': abs_tol, 'rel_tol': rel_tol,
+                         'time_limit': time_limit, 'memory_limit': memory_limit, 'python': python }
+
+    def load(self):
+        root_dir    = os.path.dirname(self.contest_dir)
+        contest_key = os.path.basename(self.contest_dir)
+
+        atcoder = self.atcoder if self.atcoder else AtCoder(root_dir).load()
+        self.atcoder = atcoder
+
+        contest = atcoder.find_contest(contest_key) or Contest(atcoder, { 'key': contest_key })
+        contest.load()
+
+        return contest
+
+    # problems with a non-empty source; samples come from the local cache
+    # only, a batch run before submitting should not wait on the network
+    def discover(self, contest):
+        entries = []
+
+        for problem in sorted(contest.problems, key = lambda x: x.problem_key()):
+            source_path = problem.code.solution_path()
+            if source_path is None:
+                continue
+
+            problem.sample_cases = problem.load_sample_case_from_cache()
+
+            runner = Runner(source_path, atcoder = self.atcoder, **self.options)
+            entries.append({ 'problem': problem, 'source_path': source_path, 'runner': runner,
+                             'compile': None, 'results': {} })
+
+        return entries
+
+    def execute(self):
+        clean_scratch()
+
+        with span('runner.load'):
+            contest = self.load()
+            entries = self.discover(contest)
+
+        if len(entries) == 0:
+            print('no sources in {}'.format(self.contest_dir))
+            return None
+
+        started_at = time.time()
+
+        # one set of workers for compiles and runs; a compile that finishes
+        # queues its runs ahead of the compiles still waiting
+        self.tasks = queue.PriorityQueue()
+        self.sequence = itertools.count()
+
+        for entry in entries:
+            self.schedule(COMPILE_PRIORITY, self.compile_and_schedule, entry)
+
+        workers = [threading.Thread(target = self.work) for _ in range(self.jobs)]
+        for worker in workers:
+            worker.start()
+
+        # a compile queues its runs before it is marked done, so the queue
+        # only drains once every run is finished
+        self.tasks.join()
+
+        for worker in workers:
+            self.tasks.put((COMPILE_PRIORITY + 1, next(self.sequence), None, None))
+        for worker in workers:
+            worker.join()
+
+        elapsed_time = time.time() - started_at
+
+        with span('show_results'):
+            self.show_matrix(entries)
+            self.show_failures(entries)
+            self.show_summary(entries, elapsed_time)
+
+        return entries
+
+    def schedule(self, priority, function, entry, *args):
+        self.tasks.put((priority, next(self.sequence), function, (entry,) + args))
+
+    def work(self):
+        while True:
+            _, _, function, args = self.tasks.get()
+            if function is None:
+                return
+
+            try:
+                function(*args)
+            except Exception as exception:
+                print(exception)
+                traceback.print_exc()
+            finally:
+                self.tasks.task_done()
+
+    def compile_and_schedule(self, entry):
+        entry['compile'] = self.compile(entry)
+        if entry['compile']['status'] != 'OK':
+            return
+
+        for sample_case in entry['problem'].sample_cases:
+            self.schedule(RUN_PRIORITY, self.run, entry, sample_case)
+
+    def compile(self, entry):
+        runner = entry['runner']
+        source_path = entry['source_path']
+        binary_path = entry['problem'].code.binary_path(source_path)
+
+        try:
+            with span('compile', { 'problem': entry['problem'].problem_key() }):
+                result = runner.language(source_path).build(source_path, binary_path)
+            result['status'] = 'OK'
+        except Exception as exception:
+            result = { 'status': 'CE', 'error': exception, 'elapsed_time': 0.0 }
+
+        return result
+
+    def run(self, entry, sample_case):
+        result = entry['runner'].testrun_impl(sample_case, self.cancel_event)
+        entry['results'][sample_case.index()] = result
+        return result
+
+    def compile_cell(self, entry):
+        result = entry['compile']
+        if result['status'] != 'OK':
+            return 'CE'
+        return '{} {:.02f}s'.format('hit' if result['hit'] else 'miss', result['elapsed_time'])
+
+    def case_cell(self, result):
+        if result['status'] == 'ERROR':
+            return 'ERROR'
+        return '{} {:.02f}s'.format(result['status'], result['elapsed_time'])
+
+    def show_matrix(self, entries):
+        indexes = sorted(set(sample_case.index() for entry in entries for sample_case in entry['problem'].sample_cases))
+
+        header = ['problem', 'source', 'compile'] + [str(index) for index in indexes]
+        rows = []
+        for entry in entries:
+            row = [entry['problem'].problem_key(), os.path.basename(entry['source_path']), self.compile_cell(entry)]
+            for index in indexes:
+                result = entry['results'].get(index)
+                row.append(self.case_cell(result) if result else '-')
+            rows.append(row)
+
+        widths = [max(len(row[column]) for row in [header] + rows) for column in range(len(header))]
+
+        print('======================================')
+        for row in [header] + rows:
+            print('  '.join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip())
+        sys.stdout.flush()
+
+    def show_failures(self, entries):
+        lines = []
+
+        for entry in entries:
+            runner = entry['runner']
+            problem_key = entry['problem'].problem_key()
+
+            if entry['compile']['status'] != 'OK':
+                lines.append('{}: CE'.format(problem_key))
+                lines.append(str(entry['compile']['error']))
+                continue
+
+            for index, result in sorted(entry['results'].items()):
+                if result['status'] == 'AC':
+                    continue
+                if result['status'] == 'ERROR':
+                    lines.append('{}/{}: {}'.format(problem_key, index, result['error']))
+                else:
+                    lines.append('{}/{}: {}{}'.format(problem_key, index, result['status'], runner.failure_summary(result)))
+
+        if lines:
+            print('--------------------------------------')
+            for line in lines:
+                print(line)
+
+    def show_summary(self, entries, elapsed_time):
+        results = [result for entry in entries for result in entry['results'].values()]
+        accepted = len([result for result in results if result['status'] == 'AC'])
+        problems = len([entry for entry in entries
+                        if entry['compile']['status'] == 'OK' and entry['results']
+                        and all(result['status'] == 'AC' for result in entry['results'].values())])
+
+        print('--------------------------------------')
+        print('{}/{} problems, {}/{} cases AC ... {:.02f}s (jobs {})'.format(
+            problems, len(entries), accepted, len(results), elapsed_time, self.jobs))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('contest_dir')
+    parser.add_argument('--jobs', type = int, default = 0)
+    parser.add_argument('--cxxflags', default = '')
+    parser.add_argument('--abs-tol', type = float, default = 0.0)
+    parser.add_argument('--rel-tol', type = float, default = 0.0)
+    parser.add_argument('--time-limit', type = float, default = DEFAULT_TIME_LIMIT)
+    parser.add_argument('--memory-limit', type = int, default = DEFAULT_MEMORY_LIMIT // (1024 * 1024), help = 'MiB')
+    parser.add_argument('--python', default = None, help = 'interpreter for .py sources (python3, pypy3, ...)')
+    args = parser.parse_args()
+
+    if not(os.path.isdir(args.contest_dir)):
+        raise Exception('not found: %s' % args.contest_dir)
+
+    test_all = TestAll(args.contest_dir, jobs = args.jobs, flags = shlex.split(args.cxxflags),
+                       abs_tol = args.abs_tol, rel_tol = args.rel_tol,
+                       time_limit = args.time_limit, memory_limit = args.memory_limit * 1024 * 1024,
+                       python = args.python)
+    test_all.execute()
+
+    tracing.finish('test_all')
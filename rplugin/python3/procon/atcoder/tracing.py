@@ -0,0 +1,151 @@
+# coding: utf-8
+
+import traceback
+
+import os
+import json
+import time
+import threading
+
+
+# ==============================================================================
+#
+# spans
+#
+# ==============================================================================
+class NullSpan(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class Span(object):
+    __slots__ = ('tracer', 'name', 'args', 'started_at')
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.started_at = 0.0
+
+    def __enter__(self):
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        ended_at = time.perf_counter()
+        self.tracer.record(self.name, self.started_at, ended_at, self.args)
+        return False
+
+
+# ==============================================================================
+#
+# Tracer
+#
+# ==============================================================================
+class Tracer(object):
+    def __init__(self):
+        self.is_enabled = False
+        self.origin = time.perf_counter()
+        self.events = []
+        self.lock = threading.Lock()
+
+    def enable(self):
+        self.is_enabled = True
+
+    def disable(self):
+        self.is_enabled = False
+
+    def span(self, name, args=None):
+        if not self.is_enabled:
+            return NULL_SPAN
+        return Span(self, name, args)
+
+    def record(self, name, started_at, ended_at, args):
+        event = {
+            'name': name,
+            'cat': 'procon',
+            'ph': 'X',
+            'ts': (started_at - self.origin) * 1e6,
+            'dur': (ended_at - started_at) * 1e6,
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+        }
+
+        if args:
+            event['args'] = args
+
+        with self.lock:
+            self.events.append(event)
+
+    def mark(self):
+        with self.lock:
+            return len(self.events)
+
+    def events_since(self, mark):
+        with self.lock:
+            return self.events[mark:]
+
+    def chrome_trace(self, events):
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def summary(self, events):
+        stages = {}
+        for event in events:
+            stage = stages.setdefault(event['name'], [0, 0.0, 0.0])
+            stage[0] += 1
+            stage[1] += event['dur']
+            stage[2] = max(stage[2], event['dur'])
+
+        rows = sorted(stages.items(), key=lambda x: x[1][1], reverse=True)
+
+        lines = ['%-28s %8s %12s %12s %12s' % (
+            'stage', 'count', 'total', 'mean', 'max')]
+        for name, (count, total, longest) in rows:
+            lines.append('%-28s %8d %10.2fms %10.2fms %10.2fms' % (
+                name, count, total / 1000, total / count / 1000, longest / 1000))
+
+        return "\n".join(lines)
+
+    def dump(self, trace_dir, command, mark=0):
+        events = self.events_since(mark)
+        stamp = time.strftime('%Y%m%d-%H%M%S')
+        trace_path = '%s/%s-%s-%d.json' % (trace_dir, command, stamp, os.getpid())
+
+        try:
+            os.makedirs(trace_dir, exist_ok=True)
+            with open(trace_path, mode='w') as f:
+                json.dump(self.chrome_trace(events), f)
+        except Exception as exception:
+            print(exception)
+            traceback.print_exc()
+            return None
+
+        print('--- trace: %s ---' % trace_path)
+        print(self.summary(events))
+        return trace_path
+
+
+TRACER = Tracer()
+
+if os.environ.get('PROCON_TRACE'):
+    TRACER.enable()
+
+
+def span(name, args=None):
+    return TRACER.span(name, args)
+
+
+def trace_dir():
+    return os.environ.get('PROCON_TRACE')
+
+
+def finish(command, mark=0):
+    if TRACER.is_enabled and trace_dir():
+        return TRACER.dump(trace_dir(), command, mark)
+    return None
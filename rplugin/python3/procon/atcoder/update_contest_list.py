@@ -2,12 +2,21 @@
 
 from atcoder import AtCoder
 
+import tracing
+
 import sys
 import os
 
+
+def update_contest_list(atcoder):
+    atcoder.sync_contests_from_website()
+
+
 if __name__ == '__main__':
     if len(sys.argv) <= 1:
         raise Exception('please, input root_dir to args!')
 
     atcoder = AtCoder(os.path.abspath(sys.argv[1]))
-    atcoder.update(is_force=True)
+    update_contest_list(atcoder)
+
+    tracing.finish('update_contest_list')
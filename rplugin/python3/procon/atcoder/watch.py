@@ -0,0 +1,347 @@
+# coding: utf-8
+
+import os
+import time
+import shlex
+import struct
+import select
+import ctypes
+import ctypes.util
+import argparse
+import threading
+import traceback
+
+from concurrent.futures import ThreadPoolExecutor
+
+from atcoder import AtCoder, Contest
+from languages import all_extensions
+from run_by_cpp import Runner
+from executor import DEFAULT_TIME_LIMIT, DEFAULT_MEMORY_LIMIT
+from tracing import span
+
+import tracing
+
+# one save is a burst of events (write and close, or a rename over the
+# old file); they are folded into one cycle started this long after the last
+DEBOUNCE_TIME = 0.05
+
+# how often the loop looks at the stop flag while nothing happens
+IDLE_TIMEOUT = 0.5
+
+POLL_INTERVAL = 0.2
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+
+EVENT_HEADER = struct.Struct('iIII')
+EVENT_BUFFER_SIZE = 64 * 1024
+
+
+# ==============================================================================
+#
+# watchers
+#
+# ==============================================================================
+class InotifyWatcher(object):
+    name = 'inotify'
+
+    def __init__(self, path):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+
+        # editors either rewrite the file in place or rename a new one over it
+        if libc.inotify_add_watch(self.fd, path.encode('utf-8'), IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, 'inotify_add_watch failed: %s' % path)
+
+        self.poller = select.poll()
+        self.poller.register(self.fd, select.POLLIN)
+
+    # names of the files written since the last call
+    def wait(self, timeout):
+        names = set()
+        if not self.poller.poll(timeout * 1000):
+            return names
+
+        try:
+            data = os.read(self.fd, EVENT_BUFFER_SIZE)
+        except BlockingIOError:
+            return names
+
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            _, _, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+
+            if name:
+                names.add(name.decode('utf-8', 'replace'))
+
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher(object):
+    name = 'polling'
+
+    def __init__(self, path):
+        self.path = path
+        self.stats = self.scan()
+
+    def scan(self):
+        stats = {}
+        for entry in os.scandir(self.path):
+            if entry.is_file():
+                stat = entry.stat()
+                stats[entry.name] = (stat.st_mtime_ns, stat.st_size)
+        return stats
+
+    def wait(self, timeout):
+        deadline = time.time() + timeout
+
+        while True:
+            stats = self.scan()
+            names = set(name for name, stat in stats.items() if self.stats.get(name) != stat)
+            self.stats = stats
+
+            remaining = deadline - time.time()
+            if names or remaining <= 0:
+                return names
+
+            time.sleep(min(POLL_INTERVAL, remaining))
+
+    def close(self):
+        pass
+
+
+def create_watcher(path):
+    try:
+        return InotifyWatcher(path)
+    except (OSError, AttributeError) as exception:
+        print('watch: no inotify ({}), polling every {}s'.format(exception, POLL_INTERVAL))
+        return PollingWatcher(path)
+
+
+# ==============================================================================
+#
+# Cycle
+#
+# ==============================================================================
+class Cycle(object):
+    def __init__(self, problem, source_path, runner, saved_at, previous=None):
+        self.problem = problem
+        self.source_path = source_path
+        self.runner = runner
+        self.saved_at = saved_at
+        self.previous = previous
+
+        self.cancel_event = threading.Event()
+        self.done_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+        self.runner.cancel()
+
+    def is_cancelled(self):
+        return self.cancel_event.is_set()
+
+    def execute(self):
+        try:
+            return self.execute_impl()
+        finally:
+            self.done_event.set()
+
+    # everything is printed from this thread, so inside the editor the
+    # output follows the job; a cancelled cycle goes quiet at once
+    def execute_impl(self):
+        runner = self.runner
+        name = os.path.basename(self.source_path)
+        binary_path = self.problem.code.binary_path(self.source_path)
+
+        if self.is_cancelled():
+            return None
+
+        try:
+            with span('compile', {'problem': self.problem.problem_key()}):
+                compiled = runner.language(self.source_path).build(self.source_path, binary_path)
+        except Exception as exception:
+            if not self.is_cancelled():
+                print('{}: CE ({})'.format(name, exception), flush=True)
+            return None
+
+        # the runs of the cancelled cycle write to the same files
+        if self.previous:
+            self.previous.done_event.wait()
+            self.previous = None
+
+        if self.is_cancelled():
+            return None
+
+        status = 'cache hit' if compiled['hit'] else 'cache miss'
+        print('======================================')
+        print('{}: compile: {} ... {:.02f}s'.format(name, status, compiled['elapsed_time']), flush=True)
+        if compiled.get('messages'):
+            print(compiled['messages'].rstrip(), flush=True)
+
+        sample_cases = self.problem.load_sample_case_from_cache()
+
+        results = []
+        with ThreadPoolExecutor(max_workers=runner.jobs) as pool:
+            futures = [pool.submit(runner.testrun_impl, sample_case, self.cancel_event) for sample_case in sample_cases]
+
+            for sample_case, future in zip(sample_cases, futures):
+                result = future.result()
+                if self.is_cancelled():
+                    return None
+
+                runner.show_status(sample_case, result)
+                results.append(result)
+
+        accepted = len([result for result in results if result['status'] == 'AC'])
+        print('{}: {}/{} AC ... {:.02f}s after save'.format(
+            name, accepted, len(results), time.time() - self.saved_at), flush=True)
+
+        return results
+
+
+# ==============================================================================
+#
+# Watch
+#
+# ==============================================================================
+class Watch(object):
+    def __init__(self, contest_dir, atcoder=None, dispatch=None, jobs=1, flags=[], abs_tol=0.0, rel_tol=0.0,
+                 time_limit=DEFAULT_TIME_LIMIT, memory_limit=DEFAULT_MEMORY_LIMIT, python=None):
+        self.contest_dir = contest_dir.rstrip('/')
+        self.atcoder = atcoder
+        self.dispatch = dispatch
+        self.options = {'jobs': jobs, 'flags': flags, 'abs_tol': abs_tol, 'rel_tol': rel_tol,
+                        'time_limit': time_limit, 'memory_limit': memory_limit, 'python': python}
+
+        self.lock = threading.Lock()
+        self.cycles = {}
+        self.pool = None
+        self.stop_event = threading.Event()
+
+    def load(self):
+        root_dir = os.path.dirname(self.contest_dir)
+        contest_key = os.path.basename(self.contest_dir)
+
+        if self.atcoder is None:
+            self.atcoder = AtCoder(root_dir).load()
+
+        contest = self.atcoder.find_contest(contest_key) or Contest(self.atcoder, {'key': contest_key})
+        contest.load()
+
+        return contest
+
+    def run(self):
+        contest = self.load()
+        watch_dir = contest.root_dir()
+        watcher = create_watcher(watch_dir)
+
+        # without an editor to hand cycles to, they get a pool of their own;
+        # one worker per problem is the most that can be busy at once
+        if self.dispatch is None:
+            self.pool = ThreadPoolExecutor(max_workers=max(1, len(contest.problems)))
+
+        print('watch: {} ({})'.format(watch_dir, watcher.name), flush=True)
+
+        pending = {}
+        try:
+            while not self.stop_event.is_set():
+                now = time.time()
+                due_at = min([entry['due_at'] for entry in pending.values()] + [now + IDLE_TIMEOUT])
+
+                for name in watcher.wait(max(0.0, due_at - now)):
+                    problem = self.problem_of(contest, name)
+                    if problem is None:
+                        continue
+
+                    key = problem.problem_key()
+                    saved_at = pending[key]['saved_at'] if key in pending else time.time()
+                    pending[key] = {'problem': problem, 'source_path': '%s/%s' % (watch_dir, name),
+                                    'saved_at': saved_at, 'due_at': time.time() + DEBOUNCE_TIME}
+
+                now = time.time()
+                for key, entry in list(pending.items()):
+                    if entry['due_at'] <= now:
+                        del pending[key]
+                        self.start(entry)
+        finally:
+            watcher.close()
+            self.cancel_all()
+            if self.pool:
+                self.pool.shutdown()
+
+        print('watch: stopped')
+
+    # generators and brute-force solutions live next to the sources, but
+    # only a file named after a problem is a solution
+    def problem_of(self, contest, name):
+        problem_key, extension = os.path.splitext(name)
+        if extension[1:] not in all_extensions():
+            return None
+        return contest.find_problem(problem_key)
+
+    def start(self, entry):
+        problem = entry['problem']
+        runner = Runner(entry['source_path'], atcoder=self.atcoder, **self.options)
+
+        with self.lock:
+            previous = self.cycles.get(problem.problem_key())
+            cycle = Cycle(problem, entry['source_path'], runner, entry['saved_at'], previous)
+            self.cycles[problem.problem_key()] = cycle
+
+        if previous:
+            previous.cancel()
+
+        try:
+            if self.dispatch:
+                self.dispatch(cycle)
+            else:
+                self.pool.submit(cycle.execute)
+        except Exception as exception:
+            print(exception)
+            traceback.print_exc()
+
+    def cancel_all(self):
+        with self.lock:
+            cycles = list(self.cycles.values())
+
+        for cycle in cycles:
+            cycle.cancel()
+
+    def stop(self):
+        self.stop_event.set()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('contest_dir')
+    parser.add_argument('--jobs', type=int, default=1)
+    parser.add_argument('--cxxflags', default='')
+    parser.add_argument('--abs-tol', type=float, default=0.0)
+    parser.add_argument('--rel-tol', type=float, default=0.0)
+    parser.add_argument('--python', default=None)
+    args = parser.parse_args()
+
+    if not(os.path.isdir(args.contest_dir)):
+        raise Exception('not found: %s' % args.contest_dir)
+
+    watch = Watch(args.contest_dir, jobs=args.jobs, flags=shlex.split(args.cxxflags),
+                  abs_tol=args.abs_tol, rel_tol=args.rel_tol, python=args.python)
+    try:
+        watch.run()
+    except KeyboardInterrupt:
+        watch.stop()
+
+    tracing.finish('watch')
@@ -0,0 +1,232 @@
+# coding: utf-8
+
+import io
+import os
+import sys
+import threading
+import traceback
+import importlib
+
+from concurrent.futures import ThreadPoolExecutor
+
+RESULT_BUFFER_NAME = '[procon]'
+
+
+# ==============================================================================
+#
+# ResultBuffer
+#
+# ==============================================================================
+class ResultBuffer(object):
+    def __init__(self, nvim, filetype):
+        self.nvim = nvim
+        self.filetype = filetype
+
+        self.buffer = None
+        self.lock = threading.Lock()
+        self.partial = ''
+        self.pending_lines = []
+        self.is_scheduled = False
+        self.is_empty = True
+
+    # must be called on the main thread
+    def open(self):
+        nvim = self.nvim
+        current_window = nvim.current.window
+
+        buffers = [b for b in nvim.buffers if b.name.endswith(RESULT_BUFFER_NAME)]
+        self.buffer = buffers[0] if buffers else None
+
+        if self.buffer and nvim.call('bufwinnr', self.buffer.number) != -1:
+            nvim.command('%dwincmd w' % nvim.call('bufwinnr', self.buffer.number))
+        elif self.buffer:
+            nvim.command('botright 15split')
+            nvim.command('buffer %d' % self.buffer.number)
+        else:
+            nvim.command('botright 15new')
+            self.buffer = nvim.current.buffer
+            self.buffer.name = RESULT_BUFFER_NAME
+
+            for option in ['buftype=nofile', 'bufhidden=hide', 'noswapfile']:
+                nvim.command('setlocal %s' % option)
+
+        nvim.command('setlocal filetype=%s' % self.filetype)
+        self.buffer[:] = []
+
+        nvim.current.window = current_window
+        return self
+
+    def write(self, text):
+        with self.lock:
+            lines = (self.partial + text).split("\n")
+            self.partial = lines.pop()
+            self.pending_lines.extend(lines)
+
+            if not self.pending_lines or self.is_scheduled:
+                return len(text)
+
+            self.is_scheduled = True
+
+        self.nvim.async_call(self.flush_pending)
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        with self.lock:
+            if self.partial:
+                self.pending_lines.append(self.partial)
+                self.partial = ''
+
+            if not self.pending_lines or self.is_scheduled:
+                return
+
+            self.is_scheduled = True
+
+        self.nvim.async_call(self.flush_pending)
+
+    # runs on the main thread through async_call, coalescing every line
+    # written since the last flush into one buffer update
+    def flush_pending(self):
+        with self.lock:
+            lines = self.pending_lines
+            self.pending_lines = []
+            self.is_scheduled = False
+
+        if not lines:
+            return
+
+        if self.is_empty:
+            self.buffer[:] = lines
+            self.is_empty = False
+        else:
+            self.buffer.append(lines)
+
+        window_number = self.nvim.call('bufwinid', self.buffer.number)
+        if window_number != -1:
+            self.nvim.call('win_execute', window_number, 'normal! G')
+
+
+# ==============================================================================
+#
+# OutputRouter
+#
+# ==============================================================================
+class OutputRouter(io.TextIOBase):
+    def __init__(self, fallback):
+        self.fallback = fallback
+        self.local = threading.local()
+
+        self.lock = threading.Lock()
+        self.outputs = []
+
+    def bind(self, output):
+        self.local.output = output
+        with self.lock:
+            self.outputs.append(output)
+
+    def unbind(self, output):
+        self.local.output = None
+        with self.lock:
+            self.outputs.remove(output)
+
+    def target(self):
+        output = getattr(self.local, 'output', None)
+        if output:
+            return output
+
+        # helper threads of a job (fetch pools, test pools) are not bound;
+        # they belong to the job when only one is running
+        with self.lock:
+            if len(self.outputs) == 1:
+                return self.outputs[0]
+
+        return self.fallback
+
+    def write(self, text):
+        return self.target().write(text)
+
+    def flush(self):
+        self.target().flush()
+
+    def writable(self):
+        return True
+
+
+# ==============================================================================
+#
+# Engine
+#
+# ==============================================================================
+class Engine(object):
+    def __init__(self, nvim, max_workers=4):
+        self.nvim = nvim
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+        self.lock = threading.Lock()
+        self.models = {}
+        self.modules = {}
+
+        # tracebacks go to stderr, so both streams follow the running job
+        self.router = OutputRouter(sys.stderr)
+        sys.stdout = self.router
+        sys.stderr = self.router
+
+    def platform_module(self, platform, name):
+        key = (platform, name)
+        if key not in self.modules:
+            base_dir = os.path.dirname(os.path.abspath(__file__))
+            platform_dir = '%s/%s' % (base_dir, platform)
+
+            if platform_dir not in sys.path:
+                sys.path.append(platform_dir)
+
+            self.modules[key] = importlib.import_module(name)
+
+        return self.modules[key]
+
+    def atcoder(self, root_dir):
+        with self.lock:
+            if root_dir not in self.models:
+                module = self.platform_module('atcoder', 'atcoder')
+                self.models[root_dir] = module.AtCoder(root_dir).load()
+
+            return self.models[root_dir]
+
+    def submit(self, filetype, function, *args):
+        output = ResultBuffer(self.nvim, filetype).open()
+        return self.executor.submit(self.run, output, function, args)
+
+    # jobs that live for minutes or hours (a watch loop, a prewarm waiting
+    # for the start) get a thread of their own, so the pool stays free for
+    # short ones
+    def spawn(self, filetype, function, *args):
+        output = ResultBuffer(self.nvim, filetype).open()
+        thread = threading.Thread(target=self.run, args=(output, function, args), daemon=True)
+        thread.start()
+        return thread
+
+    def run(self, output, function, args):
+        self.router.bind(output)
+        mark = self.trace_mark()
+
+        try:
+            function(*args)
+        except Exception:
+            traceback.print_exc(file=output)
+        finally:
+            self.finish_trace(function.__name__, mark)
+            self.router.unbind(output)
+            output.close()
+
+    # the tracer lives next to the platform modules and is only there once a
+    # job has imported one of them; PROCON_TRACE turns it on
+    def trace_mark(self):
+        tracing = sys.modules.get('tracing')
+        return tracing.TRACER.mark() if tracing else 0
+
+    def finish_trace(self, command, mark):
+        tracing = sys.modules.get('tracing')
+        if tracing:
+            tracing.finish(command, mark)
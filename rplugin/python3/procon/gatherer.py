@@ -0,0 +1,50 @@
+# coding: utf-8
+
+import queue
+import threading
+import traceback
+
+
+# ==============================================================================
+#
+# Gatherer
+#
+# ==============================================================================
+class Gatherer(object):
+    def __init__(self, target, *args):
+        self.target = target
+        self.args = args
+
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def run(self):
+        try:
+            self.target(self.emit, *self.args)
+        except Exception as exception:
+            print(exception)
+            traceback.print_exc()
+
+    def emit(self, candidates):
+        if candidates:
+            self.queue.put(candidates)
+
+    def drain(self, timeout=0.0):
+        candidates = []
+
+        try:
+            candidates.extend(self.queue.get(timeout=timeout) if timeout else
+                              self.queue.get_nowait())
+            while True:
+                candidates.extend(self.queue.get_nowait())
+        except queue.Empty:
+            pass
+
+        return candidates
+
+    def is_done(self):
+        return not self.thread.is_alive() and self.queue.empty()
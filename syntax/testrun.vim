@@ -4,6 +4,10 @@
 syntax keyword testrunAC AC
 syntax keyword testrunWA WA
 syntax keyword testrunTLE TLE
+syntax keyword testrunMLE MLE
+syntax keyword testrunRE RE
+syntax keyword testrunOLE OLE
+syntax keyword testrunSKIP SKIP
 " syntax match testrunSampleCase /SampleCase([^)]*)/
 syntax match testrunEqualLine /====[=]*/
 syntax match testrunNormalLine /----[-]*/
@@ -11,5 +15,9 @@ syntax match testrunNormalLine /----[-]*/
 highlight link testrunAC Statement
 highlight link testrunWA DiffDelete
 highlight link testrunTLE Search
+highlight link testrunMLE Search
+highlight link testrunRE DiffDelete
+highlight link testrunOLE Search
+highlight link testrunSKIP Comment
 highlight link testrunEqualLine Comment
 highlight link testrunNormalLine Comment
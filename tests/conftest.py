@@ -0,0 +1,104 @@
+# coding: utf-8
+
+import os
+import sys
+import threading
+import http.server
+import urllib.parse
+
+import pytest
+
+# the plugin modules import each other as siblings, as the scripts run there
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'rplugin', 'python3', 'procon', 'atcoder'))
+
+
+# ==============================================================================
+#
+# Handler
+#
+# ==============================================================================
+class Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length)
+
+    def send(self, status, body=b'', headers={}):
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+# a local server for the handler class; yields its base url
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(handler_class):
+        server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), handler_class)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return 'http://127.0.0.1:%d' % server.server_address[1]
+
+    yield start
+
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+# ==============================================================================
+#
+# FakeSite
+#
+# ==============================================================================
+class FakeSite(object):
+    def __init__(self, respond):
+        self.respond = respond
+        self.url = None
+
+        # (method, path) of every request, without the query
+        self.requests = []
+
+
+# a stand-in for the judge: respond(request) returns (status[, body[, headers]])
+# for a dict with method, path, query, form and headers; tests keep their own
+# state in the closure
+@pytest.fixture
+def fake_site(serve):
+    def start(respond):
+        site = FakeSite(respond)
+
+        class SiteHandler(Handler):
+            def do_GET(self):
+                self.dispatch(b'')
+
+            def do_POST(self):
+                self.dispatch(self.read_body())
+
+            def dispatch(self, body):
+                parts = urllib.parse.urlsplit(self.path)
+                site.requests.append((self.command, parts.path))
+
+                request = {
+                    'method': self.command,
+                    'path': parts.path,
+                    'query': urllib.parse.parse_qs(parts.query),
+                    'form': dict(urllib.parse.parse_qsl(body.decode('utf-8'))),
+                    'headers': self.headers
+                }
+                response = tuple(site.respond(request))
+                self.send(*(response + (b'', {})[len(response) - 1:]))
+
+        site.url = serve(SiteHandler)
+        return site
+
+    return start
@@ -0,0 +1,77 @@
+# coding: utf-8
+
+import pytest
+
+from atcoder import AtCoder
+
+LAST_PAGE = 20
+
+
+def contest(number):
+    return {
+        'key': 'abc%04d' % number,
+        'name': 'ABC %d' % number,
+        'time': '%04d-01-01 21:00:00' % number
+    }
+
+
+# an archive of 20 pages of 10 contests, newest first, that records the
+# pages asked for
+@pytest.fixture
+def archive(monkeypatch, tmp_path):
+    pages = {page: [contest(1000 - (page - 1) * 10 - i) for i in range(10)] for page in range(1, LAST_PAGE + 1)}
+    fetched = []
+
+    def get_archive_page(page):
+        fetched.append(page)
+        return {'contests': pages.get(page, []), 'last_page': LAST_PAGE}
+
+    atcoder = AtCoder(str(tmp_path / 'atcoder'))
+    monkeypatch.setattr(atcoder.api, 'get_contest_params_list', lambda: [])
+    monkeypatch.setattr(atcoder.api, 'get_contest_archive_page', get_archive_page)
+    return atcoder, pages, fetched
+
+
+def test_first_sync_crawls_every_page(archive):
+    atcoder, _, fetched = archive
+
+    contests = atcoder.sync_contests_from_website()
+
+    assert sorted(fetched) == list(range(1, LAST_PAGE + 1))
+    assert len(contests) == LAST_PAGE * 10
+    assert contests[0].key() == 'abc1000'
+    assert atcoder.load_archive_state() == {'complete': True, 'last_page': LAST_PAGE}
+
+
+def test_update_stops_at_the_first_known_page(archive):
+    atcoder, pages, fetched = archive
+    atcoder.sync_contests_from_website()
+
+    # twelve new contests push the first page over two pages
+    new_contests = [contest(number) for number in range(1012, 1000, -1)]
+    pages[1], pages[2] = new_contests[:10], new_contests[10:] + pages[1][:8]
+    del fetched[:]
+
+    contests = atcoder.sync_contests_from_website()
+
+    assert fetched == [1, 2]
+    assert len(contests) == LAST_PAGE * 10 + 12
+    assert contests[0].key() == 'abc1012'
+
+
+def test_failed_crawl_is_finished_by_the_next_sync(archive):
+    atcoder, pages, fetched = archive
+    lost = pages.pop(5)
+
+    atcoder.sync_contests_from_website()
+    assert atcoder.load_archive_state() == {}
+
+    # page 1 is known, but the archive was never complete, so it goes on
+    pages[5] = lost
+    del fetched[:]
+
+    contests = atcoder.sync_contests_from_website()
+
+    assert sorted(fetched) == list(range(1, LAST_PAGE + 1))
+    assert len(contests) == LAST_PAGE * 10
+    assert atcoder.load_archive_state()['complete']
@@ -0,0 +1,72 @@
+# coding: utf-8
+
+import pytest
+
+import comparator
+from comparator import Comparator
+
+
+def test_whitespace_does_not_matter():
+    assert Comparator().compare_bytes(b'1 2\n3\n', b'1  2 3')['ok']
+
+
+def test_mismatch_is_located_by_line_and_column():
+    result = Comparator().compare_bytes(b'1 2\n3 40\n', b'1 2\n3 4\n')
+
+    assert not result['ok']
+    assert (result['index'], result['actual'], result['expected']) == (3, '40', '4')
+    assert (result['line'], result['column']) == (2, 3)
+
+
+def test_missing_and_extra_tokens_are_eof():
+    short = Comparator().compare_bytes(b'1\n', b'1\n2\n')
+    assert (short['actual'], short['expected'], short['line']) == (None, '2', 2)
+
+    extra = Comparator().compare_bytes(b'1\n2\n', b'1\n')
+    assert (extra['actual'], extra['expected'], extra['line']) == ('2', None, 2)
+
+
+@pytest.mark.parametrize('abs_tol, rel_tol, actual, ok', [
+    (0.0, 0.0, b'0.3333', False),
+    (1e-3, 0.0, b'0.3333', True),
+    (1e-5, 0.0, b'0.3333', False),
+    (0.0, 1e-3, b'0.3333', True),
+    (1e-3, 0.0, b'abc', False),
+])
+def test_tolerance(abs_tol, rel_tol, actual, ok):
+    assert Comparator(abs_tol, rel_tol).compare_bytes(actual, b'0.333333')['ok'] == ok
+
+
+def test_tokens_are_compared_across_chunks(monkeypatch):
+    monkeypatch.setattr(comparator, 'CHUNK_SIZE', 7)
+
+    expected = b''.join(b'%d\n' % value for value in range(1000))
+    actual = expected.replace(b'\n567\n', b'\n576\n')
+
+    stream = comparator.read_token_batches
+    monkeypatch.setattr(comparator, 'read_token_batches', lambda f: stream(f, chunk_size=5))
+
+    result = Comparator().compare_bytes(actual, expected)
+    assert (result['actual'], result['expected']) == ('576', '567')
+    assert (result['line'], result['column']) == (568, 1)
+
+
+def test_files_are_compared(tmp_path):
+    actual = tmp_path / 'actual'
+    expected = tmp_path / 'expected'
+    actual.write_bytes(b'Yes\nNo\n')
+    expected.write_bytes(b'Yes\nYes\n')
+
+    result = Comparator().compare_files(str(actual), str(expected))
+    assert (result['line'], result['column'], result['actual']) == (2, 1, 'No')
+
+
+def test_vectorized_path_agrees_with_the_scalar_one():
+    pytest.importorskip('numpy')
+
+    expected = [b'%.6f' % (value / 7) for value in range(comparator.NUMPY_THRESHOLD * 2)]
+    actual = list(expected)
+    actual[5000] = b'1e9'
+
+    result = Comparator(1e-6, 0.0).compare_bytes(b' '.join(actual), b' '.join(expected))
+    assert result['index'] == 5000
@@ -0,0 +1,97 @@
+# coding: utf-8
+
+import os
+import shutil
+
+import pytest
+
+from concurrent.futures import CancelledError
+
+from compile_cache import CompileCache, CompileError
+
+pytestmark = pytest.mark.skipif(shutil.which('g++') is None, reason='g++ is not available')
+
+SOURCE = '#include <cstdio>\nint main() { std::puts("%s"); }\n'
+
+
+@pytest.fixture
+def source(tmp_path):
+    def write(text, name='a.cpp'):
+        path = str(tmp_path / name)
+        with open(path, mode='w') as f:
+            f.write(text)
+        return path
+
+    return write
+
+
+def test_second_compile_is_a_hit(tmp_path, source):
+    cache = CompileCache(str(tmp_path / 'pch'), flags=['-O0'])
+    source_path = source(SOURCE % 'a')
+    binary_path = str(tmp_path / 'bin' / 'a')
+
+    assert not cache.compile(source_path, binary_path)['hit']
+    assert cache.compile(source_path, binary_path)['hit']
+
+    # a changed source or a lost binary is built again
+    source(SOURCE % 'b')
+    assert not cache.compile(source_path, binary_path)['hit']
+
+    os.remove(binary_path)
+    assert not cache.compile(source_path, binary_path)['hit']
+
+
+def test_key_covers_the_source_and_the_flags(tmp_path, source):
+    first = source(SOURCE % 'a', 'a.cpp')
+    second = source(SOURCE % 'b', 'b.cpp')
+
+    cache = CompileCache(str(tmp_path / 'pch'), flags=['-O2'])
+    other = CompileCache(str(tmp_path / 'pch'), flags=['-O2', '-DLOCAL'])
+
+    assert cache.source_key(first) == cache.source_key(first)
+    assert cache.source_key(first) != cache.source_key(second)
+    assert cache.source_key(first) != other.source_key(first)
+    assert cache.pch_dir() != other.pch_dir()
+
+
+def test_compile_error_carries_the_diagnostics(tmp_path, source):
+    cache = CompileCache(str(tmp_path / 'pch'), flags=['-O0'])
+    binary_path = str(tmp_path / 'bin' / 'a')
+
+    with pytest.raises(CompileError) as error:
+        cache.compile(source('int main() { return x; }\n'), binary_path)
+
+    assert 'was not declared' in str(error.value)
+
+    # a failed build leaves no key, so it is never taken for a hit
+    assert not os.path.exists(cache.key_path(binary_path))
+
+
+def test_warnings_are_returned(tmp_path, source):
+    cache = CompileCache(str(tmp_path / 'pch'), flags=['-O0', '-Wall'])
+    result = cache.compile(source('int main() { int x; return 0; }\n'), str(tmp_path / 'bin' / 'a'))
+
+    assert 'unused variable' in result['messages']
+
+
+def test_precompiled_header_is_built_once(tmp_path, source):
+    cache = CompileCache(str(tmp_path / 'pch'), flags=['-O0'])
+    source_path = source('#include <bits/stdc++.h>\nint main() { std::vector<int> v; }\n')
+
+    result = cache.compile(source_path, str(tmp_path / 'bin' / 'a'))
+    if not result['pch']:
+        pytest.skip('the compiler cannot build bits/stdc++.h')
+
+    assert oct(os.stat(cache.pch_path()).st_mode & 0o777) == '0o644'
+    assert not cache.prepare_pch()
+
+    # sources without the header never wait for it
+    assert not cache.compile(source(SOURCE % 'a', 'b.cpp'), str(tmp_path / 'bin' / 'b'))['pch']
+
+
+def test_cancel_kills_the_compiler(tmp_path, source):
+    cache = CompileCache(str(tmp_path / 'pch'), flags=['-O0'])
+    cache.cancel()
+
+    with pytest.raises(CancelledError):
+        cache.compile(source(SOURCE % 'a'), str(tmp_path / 'bin' / 'a'))
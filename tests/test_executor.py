@@ -0,0 +1,131 @@
+# coding: utf-8
+
+import os
+import sys
+import shutil
+import threading
+
+import pytest
+
+from executor import Executor, has_sanitizer
+
+# one script for every verdict, picked by its first argument
+PROGRAM = r'''
+import os, sys, time
+mode = sys.argv[1]
+if mode == 'ok':
+    a, b = map(int, sys.stdin.read().split())
+    print(a + b)
+elif mode == 'cpu':
+    while True:
+        pass
+elif mode == 'sleep':
+    time.sleep(60)
+elif mode == 'memory':
+    block = bytearray(400 << 20)
+    for index in range(0, len(block), 4096):
+        block[index] = 1
+elif mode == 'exit':
+    sys.stderr.write('bad input\n')
+    sys.exit(3)
+'''
+
+
+@pytest.fixture
+def program(tmp_path):
+    path = tmp_path / 'program.py'
+    path.write_text(PROGRAM)
+
+    input_path = tmp_path / 'input'
+    input_path.write_bytes(b'1 2\n')
+
+    def run(mode, executor=None, command=None):
+        executor = executor or Executor(time_limit=0.5, memory_limit=256 << 20, output_limit=1 << 20)
+        output_path = str(tmp_path / 'output')
+        command = command or [sys.executable, str(path), mode]
+        result = executor.execute(command, str(input_path), output_path)
+        with open(output_path, mode='rb') as f:
+            result['output'] = f.read()
+        return result
+
+    return run
+
+
+def test_accepted_run_is_measured(program):
+    result = program('ok')
+
+    assert result['status'] == 'OK'
+    assert result['output'] == b'3\n'
+    assert result['exit_code'] == 0 and result['signal'] is None
+    assert result['wall_time'] > 0 and result['max_rss'] > 0
+
+
+def test_cpu_limit_is_tle(program):
+    result = program('cpu')
+    assert result['status'] == 'TLE'
+
+
+def test_wall_limit_kills_a_sleeping_program(program):
+    result = program('sleep')
+
+    assert result['status'] == 'TLE'
+    assert result['killed']
+
+
+def test_memory_limit_is_mle(program):
+    result = program('memory')
+    assert result['status'] == 'MLE'
+
+
+def test_nonzero_exit_is_re_with_stderr(program):
+    result = program('exit')
+
+    assert result['status'] == 'RE'
+    assert result['exit_code'] == 3
+    assert 'bad input' in result['stderr']
+
+
+# python ignores SIGXFSZ, so the writer has to be a native program
+def test_output_limit_is_ole(program):
+    yes = shutil.which('yes')
+    if yes is None:
+        pytest.skip('yes is not available')
+
+    result = program('output', command=[yes])
+
+    assert result['status'] == 'OLE'
+    assert len(result['output']) <= 1 << 20
+
+
+def test_missing_program_raises(tmp_path):
+    (tmp_path / 'input').write_bytes(b'')
+
+    with pytest.raises(OSError):
+        Executor().execute([str(tmp_path / 'missing')], str(tmp_path / 'input'), str(tmp_path / 'output'))
+
+
+def test_piped_run_keeps_output_in_memory():
+    result = Executor().execute_piped([sys.executable, '-c', 'import sys; print(sys.stdin.read()[::-1])'], b'abc')
+
+    assert result['status'] == 'OK'
+    assert result['output'] == b'cba\n'
+
+
+def test_cancel_kills_running_programs(program):
+    executor = Executor(time_limit=30.0)
+    timer = threading.Timer(0.5, executor.cancel)
+    timer.start()
+
+    result = program('sleep', executor)
+    timer.join()
+
+    assert result['status'] == 'RE'
+    assert result['wall_time'] < 5
+
+
+def test_sanitizer_builds_skip_the_address_space_limit():
+    assert has_sanitizer(['-O2', '-fsanitize=address,undefined'])
+    assert not has_sanitizer(['-O2', '-g'])
+
+    limits = [limit for limit, _ in Executor(limit_address_space=False).limits()]
+    assert os.name != 'posix' or len(limits) == 3
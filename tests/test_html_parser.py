@@ -0,0 +1,97 @@
+# coding: utf-8
+
+import io
+
+import pytest
+
+from html_parser import AtCoderHTMLParser
+
+TASK_PAGE = '''
+<span class="lang-ja">
+<p>配点 : <var>300</var> 点</p>
+<p>高橋君は &lt;ABC&gt; が好きです。</p>
+<div class="part"><h3>入力例 1</h3><pre>3
+1 2 3
+</pre></div>
+<div class="part"><h3>出力例 1</h3><pre>6
+</pre></div>
+</span>
+<span class="lang-en">
+<p>Score : <var>300</var> points</p>
+<div class="part"><h3>Sample Input 1</h3><pre>3
+1 2 3
+</pre></div>
+<div class="part"><h3>Sample Output 1</h3><pre>6
+</pre></div>
+<div class="part"><h3>Sample Input 2</h3><pre>2
+&lt;a&gt; <var>b</var>
+</pre></div>
+<div class="part"><h3>Sample Output 2</h3><pre>-1
+</pre></div>
+</span>
+'''
+
+TASK_LIST = '''
+<tr><td><a href="/contests/abc100/tasks/abc100_a">A</a></td>
+<td><a href="/contests/abc100/tasks/abc100_a">Happy Birthday!</a></td></tr>
+<tr><td><a href="/contests/abc100/tasks/abc100_b">B</a></td>
+<td><a href="/contests/abc100/tasks/abc100_b">Ringo&#39;s Favorite Numbers</a></td></tr>
+<a href="/contests/abc100/tasks">Tasks</a>
+'''
+
+ARCHIVE_PAGE = '''
+<tr><td><time class="fixtime">2018-06-23 21:00:00+0900</time></td>
+<td><a href="/contests/abc101">AtCoder Beginner Contest 101</a></td></tr>
+<tr><td><time class="fixtime">2018-06-16 21:00:00+0900</time></td>
+<td><a href="/contests/abc100">AtCoder Beginner Contest 100</a></td></tr>
+<a href="/contests/abc099">no time, not a row</a>
+<ul class="pagination"><li><a href="/contests/archive?lang=ja&amp;page=2">2</a></li>
+<li><a href="/contests/archive?page=13">13</a></li></ul>
+'''
+
+
+def test_task_page_samples_and_score():
+    parser = AtCoderHTMLParser().feed_text(TASK_PAGE)
+
+    assert parser.score == 300
+    assert parser.sample_cases == {
+        1: {'index': 1, 'input': '3\n1 2 3', 'output': '6'},
+        2: {'index': 2, 'input': '2\n<a> b', 'output': '-1'},
+    }
+
+
+def test_task_list():
+    parser = AtCoderHTMLParser().feed_text(TASK_LIST)
+
+    # the later link of a row carries the name
+    assert parser.tasks == {'abc100_a': 'Happy Birthday!', 'abc100_b': 'Ringo\'s Favorite Numbers'}
+
+
+def test_archive_page_contests_and_last_page():
+    parser = AtCoderHTMLParser().feed_text(ARCHIVE_PAGE)
+
+    assert parser.contests == [
+        {'time': '2018-06-23 21:00:00', 'key': 'abc101', 'name': 'AtCoder Beginner Contest 101'},
+        {'time': '2018-06-16 21:00:00', 'key': 'abc100', 'name': 'AtCoder Beginner Contest 100'},
+    ]
+    assert parser.last_page == 13
+
+
+def test_page_without_score():
+    parser = AtCoderHTMLParser().feed_text('<p>Nothing to see here.</p>')
+
+    assert parser.score is None
+    assert parser.sample_cases == {}
+
+
+# chunks split tags, entities and multibyte characters anywhere
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 64, 1 << 16])
+def test_stream_matches_text(chunk_size):
+    expected = AtCoderHTMLParser().feed_text(TASK_PAGE + TASK_LIST + ARCHIVE_PAGE)
+    parser = AtCoderHTMLParser().feed_stream(
+            io.BytesIO((TASK_PAGE + TASK_LIST + ARCHIVE_PAGE).encode('utf-8')), chunk_size=chunk_size)
+
+    assert parser.sample_cases == expected.sample_cases
+    assert parser.tasks == expected.tasks
+    assert parser.contests == expected.contests
+    assert (parser.score, parser.last_page) == (expected.score, expected.last_page)
@@ -0,0 +1,87 @@
+# coding: utf-8
+
+import gzip
+import http.client
+
+import pytest
+
+from conftest import Handler
+from http_session import Session
+
+
+def test_connection_is_kept_alive(serve):
+    peers = []
+
+    class Echo(Handler):
+        def do_GET(self):
+            peers.append(self.client_address)
+            self.send(200, b'ok')
+
+    url = serve(Echo) + '/'
+    session = Session()
+
+    assert session.request(url).read() == b'ok'
+    assert session.request(url).read() == b'ok'
+
+    assert peers[0] == peers[1]
+    assert [stats['reused'] for stats in session.history] == [False, True]
+
+
+def test_gzip_body_is_decoded(serve):
+    class Compressed(Handler):
+        def do_GET(self):
+            self.send(200, gzip.compress(b'x' * 1000), {'Content-Encoding': 'gzip'})
+
+    session = Session()
+    res = session.request(serve(Compressed) + '/')
+
+    assert res.read() == b'x' * 1000
+    assert res.stats['bytes'] < res.stats['decoded_bytes']
+
+
+# the server answers, then drops the connection without saying so, the way
+# an idle keep-alive connection times out on the server side
+class Dropping(Handler):
+    hits = []
+
+    def handle_one_request(self):
+        super().handle_one_request()
+        self.close_connection = True
+
+    def do_GET(self):
+        self.hits.append('GET')
+        self.send(200, b'ok')
+
+
+def test_get_is_retried_on_a_dropped_connection(serve):
+    Dropping.hits = []
+    url = serve(Dropping) + '/'
+    session = Session()
+
+    session.request(url)
+    assert session.request(url).read() == b'ok'
+
+    assert Dropping.hits == ['GET', 'GET']
+    assert [stats['reused'] for stats in session.history] == [False, False]
+
+
+def test_post_that_reached_the_server_is_not_sent_again(serve):
+    posts = []
+
+    # reads the post, then hangs up without an answer
+    class Swallowing(Handler):
+        def do_GET(self):
+            self.send(200, b'ok')
+
+        def do_POST(self):
+            posts.append(self.read_body())
+            self.close_connection = True
+
+    url = serve(Swallowing) + '/'
+    session = Session()
+    session.request(url)
+
+    with pytest.raises(http.client.RemoteDisconnected):
+        session.request(url, 'POST', body=b'data')
+
+    assert posts == [b'data']
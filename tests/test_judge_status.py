@@ -0,0 +1,112 @@
+# coding: utf-8
+
+import json
+
+import pytest
+
+from api import API
+
+import judge_status
+
+VERDICT_CELLS = "<td class='text-right'>15 ms</td><td class='text-right'>3648 KB</td>"
+
+
+# each submission waits twice, is judged in three steps, then gets its verdict
+def judge(verdicts):
+    state = {'polls': {}, 'requests': []}
+
+    def respond(request):
+        ids = request['query'].get('sids[]', [])
+        state['requests'].append(sorted(ids))
+
+        result = {}
+        for sid in ids:
+            count = state['polls'][sid] = state['polls'].get(sid, 0) + 1
+            if count <= 2:
+                label, cells = 'WJ', ''
+            elif count <= 5:
+                label, cells = '%d/3' % (count - 2), ''
+            else:
+                label, cells = verdicts[int(sid)], VERDICT_CELLS
+
+            cell = "<td class='text-center'><span class='label label-default'>%s</span></td>" % label
+            result[sid] = {'Html': cell + cells, 'Score': '100' if label == 'AC' else '0'}
+
+        return (200, json.dumps({'Result': result}).encode('utf-8'), {'Content-Type': 'application/json'})
+
+    return respond, state
+
+
+def open_tracker(site):
+    return judge_status.StatusTracker(API(site.url, rate=1000.0, burst=1000))
+
+
+@pytest.fixture(autouse=True)
+def fast_intervals(monkeypatch):
+    monkeypatch.setattr(judge_status, 'WAITING_INTERVAL', 0.01)
+    monkeypatch.setattr(judge_status, 'JUDGING_INTERVAL', 0.02)
+    monkeypatch.setattr(judge_status, 'MAX_INTERVAL', 0.05)
+    monkeypatch.setattr(judge_status, 'COALESCE_WINDOW', 0.05)
+    monkeypatch.setattr(judge_status, 'ERROR_INTERVAL', 0.01)
+
+
+def test_polls_until_the_verdict(fake_site, capsys):
+    respond, state = judge({1001: 'AC'})
+    tracker = open_tracker(fake_site(respond))
+
+    tracker.add('abc100', 'abc100_a', 1001)
+    assert tracker.run()
+
+    assert state['polls'] == {'1001': 6}
+    assert not tracker.pending and not tracker.is_running
+
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[-1].startswith('abc100_a #1001: AC 15 ms 3648 KB (score 100)')
+
+
+def test_submissions_of_a_contest_share_a_request(fake_site):
+    respond, state = judge({1001: 'AC', 1002: 'WA'})
+    tracker = open_tracker(fake_site(respond))
+
+    tracker.add('abc100', 'abc100_a', 1001)
+    tracker.add('abc100', 'abc100_b', 1002)
+    assert tracker.run()
+
+    assert state['requests'] == [['1001', '1002']] * 6
+
+
+def test_gives_up_after_repeated_errors(fake_site, capsys):
+    site = fake_site(lambda request: (403,))
+    tracker = open_tracker(site)
+
+    tracker.add('abc100', 'abc100_a', 1001)
+    assert tracker.run()
+
+    assert len(site.requests) == judge_status.MAX_ERRORS
+    assert 'gave up after %d failed polls' % judge_status.MAX_ERRORS in capsys.readouterr().out
+
+
+def test_gives_up_at_the_timeout_while_failing(fake_site, monkeypatch):
+    monkeypatch.setattr(judge_status, 'TRACK_TIMEOUT', 0.0)
+    tracker = open_tracker(fake_site(lambda request: (200, b'<html>not json</html>')))
+
+    tracker.add('abc100', 'abc100_a', 1001)
+
+    assert tracker.run()
+    assert not tracker.pending
+
+
+def test_interval_backs_off_while_judging():
+    entry = {'status': '1/3', 'interval': judge_status.WAITING_INTERVAL}
+
+    intervals = []
+    for _ in range(5):
+        entry['interval'] = judge_status.StatusTracker(None).next_interval(entry, None)
+        intervals.append(entry['interval'])
+
+    assert intervals[0] == judge_status.JUDGING_INTERVAL
+    assert intervals == sorted(intervals)
+    assert intervals[-1] == judge_status.MAX_INTERVAL
+
+    # the judge's suggestion is a lower bound
+    assert judge_status.StatusTracker(None).next_interval({'status': 'WJ', 'interval': 0.01}, 0.5) == 0.5
@@ -0,0 +1,58 @@
+# coding: utf-8
+
+import os
+import sys
+
+import pytest
+
+from compile_cache import CompileError
+from languages import CppLanguage, PythonLanguage, RustLanguage, create_language, all_extensions
+
+
+def test_languages_are_found_by_extension(tmp_path):
+    root_dir = str(tmp_path)
+
+    assert isinstance(create_language('/x/a.cpp', root_dir), CppLanguage)
+    assert isinstance(create_language('/x/a.rs', root_dir), RustLanguage)
+    assert isinstance(create_language('/x/a.py', root_dir), PythonLanguage)
+    assert all_extensions()[0] == 'cpp'
+
+    with pytest.raises(Exception):
+        create_language('/x/a.txt', root_dir)
+
+
+def test_pypy_submits_as_pypy(tmp_path):
+    assert PythonLanguage(str(tmp_path)).submit_language_id() == PythonLanguage.language_id
+    assert PythonLanguage(str(tmp_path), {'python': 'pypy3'}).submit_language_id() == PythonLanguage.pypy_language_id
+    assert PythonLanguage(str(tmp_path), {'python': 'pypy3', 'language_id': 1}).submit_language_id() == 1
+
+
+def test_syntax_error_is_a_compile_error(tmp_path):
+    source_path = str(tmp_path / 'a.py')
+    with open(source_path, mode='w') as f:
+        f.write('print(1\n')
+
+    language = PythonLanguage(str(tmp_path), {'python': sys.executable})
+    with pytest.raises(CompileError) as error:
+        language.check_syntax(source_path)
+
+    assert 'SyntaxError' in str(error.value)
+    assert error.value.cmd == [sys.executable, source_path]
+
+
+# a wrapper that logs its calls shows which interpreter checked the source
+def test_syntax_is_checked_by_the_selected_interpreter(tmp_path):
+    log_path = str(tmp_path / 'log')
+    interpreter = str(tmp_path / 'python-wrapper')
+    with open(interpreter, mode='w') as f:
+        f.write('#!/bin/sh\necho called >> %s\nexec %s "$@"\n' % (log_path, sys.executable))
+    os.chmod(interpreter, 0o755)
+
+    source_path = str(tmp_path / 'a.py')
+    with open(source_path, mode='w') as f:
+        f.write('match 1:\n    case _:\n        pass\n')
+
+    PythonLanguage(str(tmp_path), {'python': interpreter}).check_syntax(source_path)
+
+    with open(log_path, mode='r') as f:
+        assert f.read() == 'called\n'
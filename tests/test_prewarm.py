@@ -0,0 +1,62 @@
+# coding: utf-8
+
+import pytest
+
+from atcoder import AtCoder
+
+import prewarm
+
+TASK_LIST = ''.join(
+        "<a href='/contests/abc999/tasks/abc999_%s'>%s - Problem</a>" % (key, key.upper()) for key in 'abc')
+
+
+# before the start the tasks page answers 404, then redirects to the
+# contest top page, then lists the tasks
+def opening(closed_polls):
+    state = {'polls': 0}
+
+    def respond(request):
+        if request['path'] == '/contests/abc999':
+            return (200, b'<html>not started</html>')
+
+        state['polls'] += 1
+        if state['polls'] <= closed_polls // 2:
+            return (404,)
+        if state['polls'] <= closed_polls:
+            return (302, b'', {'Location': '/contests/abc999'})
+        return (200, TASK_LIST.encode('utf-8'))
+
+    return respond, state
+
+
+@pytest.fixture(autouse=True)
+def fast_polls(monkeypatch):
+    monkeypatch.setattr(prewarm, 'POLL_INTERVAL', 0.01)
+    monkeypatch.setattr(prewarm, 'POLL_MAX_INTERVAL', 0.02)
+
+
+def open_contest(site, tmp_path):
+    atcoder = AtCoder(str(tmp_path / 'atcoder'), {'rate': 1000.0, 'burst': 1000})
+    atcoder.api.base_url = site.url
+    return atcoder, atcoder.find_or_create_contest('abc999')
+
+
+def test_polls_until_the_tasks_open(fake_site, tmp_path):
+    respond, state = opening(closed_polls=4)
+    atcoder, contest = open_contest(fake_site(respond), tmp_path)
+
+    params_list = prewarm.Prewarm(atcoder, 'abc999').poll_tasks(contest)
+
+    assert [params['key'] for params in params_list] == ['a', 'b', 'c']
+    assert state['polls'] == 5
+
+    # neither the closed page nor the open one is left in the cache
+    assert atcoder.api.cache.lookup(atcoder.api.get_task_url('abc999')) is None
+
+
+def test_gives_up_after_the_timeout(fake_site, tmp_path):
+    respond, state = opening(closed_polls=1000)
+    atcoder, contest = open_contest(fake_site(respond), tmp_path)
+
+    assert prewarm.Prewarm(atcoder, 'abc999', timeout=0.2).poll_tasks(contest) == []
+    assert state['polls'] > 1
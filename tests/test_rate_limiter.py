@@ -0,0 +1,73 @@
+# coding: utf-8
+
+import threading
+
+import rate_limiter
+from rate_limiter import RateLimiter
+
+
+# ==============================================================================
+#
+# FakeClock
+#
+# ==============================================================================
+class FakeClock(object):
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def use_clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter.time, 'monotonic', clock.monotonic)
+    monkeypatch.setattr(rate_limiter.time, 'sleep', clock.sleep)
+    return clock
+
+
+def test_burst_then_rate(monkeypatch):
+    clock = use_clock(monkeypatch)
+    limiter = RateLimiter(rate=2.0, burst=3)
+
+    assert [limiter.try_acquire() for _ in range(3)] == [0.0] * 3
+    assert limiter.try_acquire() == 0.5
+
+    clock.sleep(0.5)
+    assert limiter.try_acquire() == 0.0
+
+
+def test_idle_time_refills_up_to_the_burst(monkeypatch):
+    clock = use_clock(monkeypatch)
+    limiter = RateLimiter(rate=1.0, burst=2)
+    limiter.acquire()
+    limiter.acquire()
+
+    clock.sleep(60)
+    assert [limiter.try_acquire() for _ in range(2)] == [0.0, 0.0]
+    assert limiter.try_acquire() > 0.0
+
+
+def test_acquire_waits_for_a_token(monkeypatch):
+    clock = use_clock(monkeypatch)
+    limiter = RateLimiter(rate=4.0, burst=1)
+
+    assert limiter.acquire() == 0.0
+    assert limiter.acquire() == 0.25
+    assert clock.now == 100.25
+
+
+def test_threads_share_the_tokens():
+    limiter = RateLimiter(rate=0.001, burst=5)
+    results = []
+
+    threads = [threading.Thread(target=lambda: results.append(limiter.try_acquire())) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results.count(0.0) == 5
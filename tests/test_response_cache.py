@@ -0,0 +1,118 @@
+# coding: utf-8
+
+import os
+
+from conftest import Handler
+from api import API
+from response_cache import ResponseCache
+
+
+class Tagged(Handler):
+    requests = []
+    etag = '"v1"'
+    body = b'first'
+
+    def do_GET(self):
+        self.requests.append((self.path, self.headers.get('If-None-Match')))
+
+        if self.headers.get('If-None-Match') == self.etag:
+            self.send(304)
+        else:
+            self.send(200, self.body, {'ETag': self.etag})
+
+
+def open_api(base_url, cache):
+    return API(base_url, rate=1000.0, burst=1000, cache=cache)
+
+
+def serve_tagged(serve):
+    Tagged.requests = []
+    Tagged.etag = '"v1"'
+    Tagged.body = b'first'
+    return serve(Tagged)
+
+
+def test_fresh_entry_is_served_without_a_request(serve, tmp_path):
+    api = open_api(serve_tagged(serve), ResponseCache(str(tmp_path), ttl_rules=[(r'^/page$', None)]))
+    url = api.base_url + '/page'
+
+    assert api.open(url).read() == b'first'
+    assert api.open(url).read() == b'first'
+
+    assert Tagged.requests == [('/page', None)]
+
+
+def test_stale_entry_is_revalidated(serve, tmp_path):
+    api = open_api(serve_tagged(serve), ResponseCache(str(tmp_path), ttl_rules=[(r'^/page$', 0)]))
+    url = api.base_url + '/page'
+
+    api.open(url).read()
+    assert api.open(url).read() == b'first'
+
+    Tagged.etag = '"v2"'
+    Tagged.body = b'second'
+    assert api.open(url).read() == b'second'
+    assert api.open(url).read() == b'second'
+
+    assert Tagged.requests == [('/page', None), ('/page', '"v1"'), ('/page', '"v1"'), ('/page', '"v2"')]
+
+
+def test_uncached_url_is_always_fetched(serve, tmp_path):
+    api = open_api(serve_tagged(serve), ResponseCache(str(tmp_path), ttl_rules=[(r'^/page$', None)]))
+
+    api.open(api.base_url + '/other').read()
+    api.open(api.base_url + '/other').read()
+
+    assert Tagged.requests == [('/other', None), ('/other', None)]
+
+
+def test_stores_share_one_index_write(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    for index in range(10):
+        cache.store('https://atcoder.jp/contests/abc%03d/tasks' % index, {}, b'tasks')
+
+    assert not os.path.exists(cache.index_path())
+
+    cache.flush()
+    assert cache.flush_timer is None
+
+    loaded = ResponseCache(str(tmp_path))
+    assert loaded.lookup('https://atcoder.jp/contests/abc009/tasks') is not None
+
+
+def test_lookup_schedules_a_flush(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    cache.store('https://atcoder.jp/contests/abc001/tasks', {}, b'tasks')
+    cache.flush()
+
+    assert cache.lookup('https://atcoder.jp/contests/abc001/tasks') is not None
+    assert cache.is_dirty and cache.flush_timer is not None
+    cache.flush()
+
+
+def test_processes_sharing_an_index_keep_each_others_entries(tmp_path):
+    engine = ResponseCache(str(tmp_path))
+    script = ResponseCache(str(tmp_path))
+
+    engine.store('https://atcoder.jp/contests/abc001/tasks', {}, b'one')
+    script.store('https://atcoder.jp/contests/abc002/tasks', {}, b'two')
+    engine.flush()
+    script.flush()
+
+    loaded = ResponseCache(str(tmp_path))
+    assert loaded.lookup('https://atcoder.jp/contests/abc001/tasks') is not None
+    assert loaded.lookup('https://atcoder.jp/contests/abc002/tasks') is not None
+
+
+def test_evicted_entries_stay_out_of_the_merged_index(tmp_path):
+    other = ResponseCache(str(tmp_path))
+    other.store('https://atcoder.jp/contests/abc001/tasks', {}, b'x' * 10)
+    other.flush()
+
+    cache = ResponseCache(str(tmp_path), max_size=15)
+    cache.lookup('https://atcoder.jp/contests/abc001/tasks')
+    cache.store('https://atcoder.jp/contests/abc002/tasks', {}, b'y' * 10)
+    cache.flush()
+
+    loaded = ResponseCache(str(tmp_path))
+    assert set(entry['url'] for entry in loaded.load_entries().values()) == {'https://atcoder.jp/contests/abc002/tasks'}
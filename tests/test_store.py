@@ -0,0 +1,103 @@
+# coding: utf-8
+
+import os
+import json
+
+import pytest
+
+from atcoder import AtCoder
+from store import Store
+
+CONTESTS = [
+    {'key': 'abc100', 'name': 'ABC 100', 'time': '2018-06-16 21:00:00+0900'},
+    {'key': 'abc101', 'name': 'ABC 101', 'time': '2018-06-23 21:00:00+0900'},
+]
+
+PROBLEMS = [
+    {'key': 'a', 'name': 'Happy Birthday!', 'score': 100},
+    {'key': 'b', 'name': 'Ringo\'s Favorite Numbers', 'score': 200},
+]
+
+
+# the layout before the store: a contest list at the root and a problem
+# list in every contest directory
+@pytest.fixture
+def legacy_dir(tmp_path):
+    root_dir = str(tmp_path / 'atcoder')
+    os.makedirs(root_dir + '/abc100')
+    os.makedirs(root_dir + '/abc101')
+
+    def write(path, params):
+        with open(root_dir + path, mode='w') as f:
+            json.dump(params, f)
+
+    write('/contests.json', CONTESTS)
+    write('/abc100/problems.json', PROBLEMS)
+    write('/archive.json', {'page': 3})
+    return root_dir
+
+
+def test_json_cache_is_migrated_on_load(legacy_dir):
+    atcoder = AtCoder(legacy_dir).load()
+
+    assert [contest.key() for contest in atcoder.contests] == ['abc101', 'abc100']
+    assert [problem.score() for problem in atcoder.find_contest('abc100').problems] == [100, 200]
+    assert atcoder.find_contest('abc101').problems == []
+    assert atcoder.find_problem('abc100', 'b').name() == 'Ringo\'s Favorite Numbers'
+    assert atcoder.store.get_meta('archive_state') == {'page': 3}
+
+
+def test_migration_runs_once(legacy_dir):
+    store = Store(legacy_dir + '/procon.sqlite3')
+    assert store.migrate_from_json(legacy_dir)
+
+    # later edits to the json files are not read again
+    with open(legacy_dir + '/contests.json', mode='w') as f:
+        json.dump([{'key': 'abc999', 'name': 'ABC 999', 'time': '2030-01-01 21:00:00+0900'}], f)
+
+    assert not store.migrate_from_json(legacy_dir)
+    store.close()
+
+    reopened = Store(legacy_dir + '/procon.sqlite3')
+    assert not reopened.migrate_from_json(legacy_dir)
+    assert [params['key'] for params in reopened.load_contests()] == ['abc101', 'abc100']
+
+
+def test_broken_json_is_skipped(legacy_dir):
+    with open(legacy_dir + '/abc100/problems.json', mode='w') as f:
+        f.write('[{"key": ')
+
+    atcoder = AtCoder(legacy_dir).load()
+
+    assert len(atcoder.contests) == 2
+    assert atcoder.find_contest('abc100').problems == []
+
+
+def test_empty_root_dir_is_migrated(tmp_path):
+    store = Store(str(tmp_path / 'atcoder' / 'procon.sqlite3'))
+
+    assert store.migrate_from_json(str(tmp_path / 'atcoder'))
+    assert store.load_contests() == []
+
+
+def test_problems_and_samples_round_trip(tmp_path):
+    store = Store(str(tmp_path / 'procon.sqlite3'))
+    store.save_contests(CONTESTS)
+    store.save_problems('abc100', PROBLEMS)
+
+    # a new list replaces the old one
+    store.save_problems('abc100', PROBLEMS[:1])
+    assert store.load_problems('abc100') == PROBLEMS[:1]
+    assert store.find_problem('abc100', 'b') is None
+
+    assert [params['key'] for params in store.load_contests_since('2018-06-20')] == ['abc101']
+
+    samples = [{'index': index, 'input_size': index, 'input_hash': 'h%d' % index} for index in range(1, 4)]
+    store.save_samples('abc100', 'a', samples)
+    store.delete_samples('abc100', 'a', [2])
+
+    loaded = store.load_samples('abc100', 'a')
+    assert [(sample['index'], sample['input_hash'], sample['output_hash']) for sample in loaded] == [
+        (1, 'h1', None),
+        (3, 'h3', None),
+    ]
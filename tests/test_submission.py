@@ -0,0 +1,130 @@
+# coding: utf-8
+
+import os
+
+import pytest
+
+from atcoder import AtCoder
+
+import submission
+
+SESSION_ID = 'session-1'
+
+
+# a judge with one account: the login form and the submit form carry the
+# session's csrf token, and a post with another token goes back to the form
+def judge():
+    state = {'user': None, 'token': 'token+1/=', 'submissions': []}
+
+    def form():
+        return ('<input type="hidden" name="csrf_token" value="%s"/>' % state['token']).encode('utf-8')
+
+    def respond(request):
+        is_logged_in = state['user'] is not None and SESSION_ID in request['headers'].get('Cookie', '')
+        path = request['path']
+
+        if request['method'] == 'GET':
+            if path == '/login':
+                return (200, form(), {'Set-Cookie': 'REVEL_SESSION=%s; Path=/' % SESSION_ID})
+            if path.endswith('/submit') and not is_logged_in:
+                return (302, b'', {'Location': '/login'})
+            if path.endswith('/submit'):
+                return (200, form())
+            return (200, b'ok')
+
+        params = request['form']
+        if path == '/login':
+            if params.get('csrf_token') == state['token'] and params.get('password') == 'password':
+                state['user'] = params['username']
+                return (302, b'', {'Location': '/home'})
+            return (302, b'', {'Location': '/login'})
+
+        if not is_logged_in:
+            return (302, b'', {'Location': '/login'})
+        if params.get('csrf_token') != state['token']:
+            return (302, b'', {'Location': path})
+
+        state['submissions'].append(params)
+        return (302, b'', {'Location': '/contests/abc100/submissions/me'})
+
+    return respond, state
+
+
+@pytest.fixture
+def site(fake_site, tmp_path):
+    respond, state = judge()
+    judge_site = fake_site(respond)
+
+    root_dir = str(tmp_path / 'atcoder')
+    os.makedirs(root_dir + '/abc100')
+    with open(root_dir + '/abc100/a.cpp', mode='w') as f:
+        f.write('int main() {}\n')
+
+    def model():
+        atcoder = AtCoder(root_dir, {'rate': 1000.0, 'burst': 1000})
+        atcoder.api.base_url = judge_site.url
+        return atcoder
+
+    return model, judge_site, state, root_dir + '/abc100/a.cpp'
+
+
+def submit(atcoder, source_path):
+    return submission.submit(atcoder, source_path, {'track': False})
+
+
+def test_login_with_a_wrong_password_fails(site):
+    model, _, state, _ = site
+
+    assert not submission.login(model(), 'user', 'wrong')
+    assert state['user'] is None
+
+
+def test_cached_token_makes_a_single_post(site):
+    model, judge_site, state, source_path = site
+    assert submission.login(model(), 'user', 'password')
+
+    # the cookies and the token outlive the model, as across editor restarts
+    atcoder = model()
+    judge_site.requests = []
+
+    assert submit(atcoder, source_path).endswith('/contests/abc100/submissions/me')
+    assert submit(atcoder, source_path).endswith('/contests/abc100/submissions/me')
+
+    assert judge_site.requests == [
+        ('GET', '/contests/abc100/submit'),
+        ('POST', '/contests/abc100/submit'),
+        ('POST', '/contests/abc100/submit'),
+    ]
+    assert [form['data.TaskScreenName'] for form in state['submissions']] == ['abc100_a', 'abc100_a']
+    assert oct(os.stat(atcoder.cookie_path()).st_mode & 0o777) == '0o600'
+
+
+def test_stale_token_is_refetched_once(site):
+    model, judge_site, state, source_path = site
+    atcoder = model()
+    assert submission.login(atcoder, 'user', 'password')
+    assert submit(atcoder, source_path)
+
+    state['token'] = 'token-2'
+    judge_site.requests = []
+
+    assert submit(atcoder, source_path)
+    assert judge_site.requests == [
+        ('POST', '/contests/abc100/submit'),
+        ('GET', '/contests/abc100/submit'),
+        ('POST', '/contests/abc100/submit'),
+    ]
+    assert state['submissions'][-1]['csrf_token'] == 'token-2'
+
+
+def test_expired_session_is_not_retried(site):
+    model, judge_site, state, source_path = site
+    atcoder = model()
+    assert submission.login(atcoder, 'user', 'password')
+    assert submit(atcoder, source_path)
+
+    state['user'] = None
+    judge_site.requests = []
+
+    assert submit(atcoder, source_path) is None
+    assert judge_site.requests == [('POST', '/contests/abc100/submit')]
@@ -0,0 +1,77 @@
+# coding: utf-8
+
+import os
+import queue
+import itertools
+
+from atcoder import AtCoder
+
+import test_all
+
+
+# ==============================================================================
+#
+# FakeProblem
+#
+# ==============================================================================
+class FakeProblem(object):
+    def __init__(self, key, sample_count):
+        self.key = key
+        self.sample_cases = ['%s%d' % (key, index) for index in range(1, sample_count + 1)]
+
+
+# one worker takes the tasks in order and logs them
+def run_batch(monkeypatch, entries, failed_keys=()):
+    batch = test_all.TestAll('/tmp/atcoder/abc100', jobs=1)
+    log = []
+
+    def compile(entry):
+        log.append('compile ' + entry['problem'].key)
+        return {'status': 'CE' if entry['problem'].key in failed_keys else 'OK'}
+
+    monkeypatch.setattr(batch, 'compile', compile)
+    monkeypatch.setattr(batch, 'run', lambda entry, sample_case: log.append('run ' + sample_case))
+
+    batch.tasks = queue.PriorityQueue()
+    batch.sequence = itertools.count()
+    for entry in entries:
+        batch.schedule(test_all.COMPILE_PRIORITY, batch.compile_and_schedule, entry)
+    batch.tasks.put((test_all.COMPILE_PRIORITY + 1, next(batch.sequence), None, None))
+
+    batch.work()
+    return log
+
+
+def test_runs_go_before_the_waiting_compiles(monkeypatch):
+    entries = [{'problem': FakeProblem(key, 2)} for key in 'abc']
+
+    assert run_batch(monkeypatch, entries) == [
+        'compile a', 'run a1', 'run a2',
+        'compile b', 'run b1', 'run b2',
+        'compile c', 'run c1', 'run c2',
+    ]
+
+
+def test_failed_compile_does_not_stop_the_batch(monkeypatch):
+    entries = [{'problem': FakeProblem(key, 1)} for key in 'ab']
+
+    assert run_batch(monkeypatch, entries, failed_keys=['a']) == ['compile a', 'compile b', 'run b1']
+
+
+def test_discover_takes_any_non_empty_source(tmp_path):
+    root_dir = str(tmp_path / 'atcoder')
+    atcoder = AtCoder(root_dir)
+    atcoder.store.save_contests([{'key': 'abc100', 'name': 'ABC 100', 'time': '2018-06-16 21:00:00'}])
+    atcoder.store.save_problems('abc100', [{'key': key, 'name': key.upper()} for key in 'abc'])
+
+    os.makedirs(root_dir + '/abc100')
+    sources = {'a.cpp': 'int main() {}\n', 'b.cpp': '', 'b.py': 'print(1)\n'}
+    for name, text in sources.items():
+        with open(root_dir + '/abc100/' + name, mode='w') as f:
+            f.write(text)
+
+    batch = test_all.TestAll(root_dir + '/abc100', atcoder=atcoder.load())
+    entries = batch.discover(batch.load())
+
+    assert [os.path.basename(entry['source_path']) for entry in entries] == ['a.cpp', 'b.py']
+    assert all(entry['problem'].sample_cases == [] for entry in entries)